@@ -0,0 +1,300 @@
+"""
+End-to-end cost of agent turns through the whole graph.
+
+Drives `flo.astream` through representative scenarios with scripted models that answer
+instantly, so the time measured is the framework's own: routing, handoffs, middleware,
+tools, checkpointing. Reports per scenario the median turn time, its share per model
+call and the checkpoint bytes a turn writes, then the handoff chain on threads with
+growing histories. Checkpoints, user data and the store live in a temporary directory,
+so the run is offline and leaves no files behind.
+
+Results are compared against `benchmarks/baselines/agent_turns.json`; the run fails
+when a time is more than `--tolerance` times its baseline or a turn writes more than
+`BYTES_TOLERANCE` times the baseline checkpoint bytes. Record a new baseline with
+`--update-baseline`.
+
+    uv run python -m benchmarks.agent_turns
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from typing import NamedTuple
+
+# Deterministic routing and no summarization: the classifier never kicks in and the
+# histories below fit the context budget, so every round runs the same script
+os.environ.setdefault("FLO_ROUTER_MIN_SAMPLES", str(sys.maxsize))
+os.environ.setdefault("FLO_CONTEXT_TOKEN_BUDGET", str(10**9))
+
+from benchmarks.fakes import install_fake_prompts  # noqa: E402
+
+models = install_fake_prompts()
+
+from langchain_core.messages import AIMessage, HumanMessage  # noqa: E402
+
+import src.config.users  # noqa: E402
+from src.agents import flo  # noqa: E402
+from src.agents.router import intent_router  # noqa: E402
+from src.config.checkpoint import SQLiteSaver  # noqa: E402
+from src.config.store import SQLiteStore  # noqa: E402
+from src.config.users import current_user  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines", "agent_turns.json")
+# Checkpoint sizes barely vary between runs, only ids and timestamps differ
+BYTES_TOLERANCE = 1.1
+HISTORY_SIZES = [10, 100, 1000]
+USER_ID = "bench"
+
+
+class Scenario(NamedTuple):
+    """A user message and the script each model follows to answer it"""
+
+    message: str
+    scripts: dict[str, list[AIMessage]]
+
+
+def call(name: str, **args) -> AIMessage:
+    return AIMessage(
+        content="", tool_calls=[{"name": name, "args": args, "id": "scripted"}]
+    )
+
+
+SCENARIOS = {
+    # Routed straight to the quant by the keyword rules
+    "expense_log": Scenario(
+        "I spent 12 on coffee today",
+        {
+            "QUANT": [
+                call(
+                    "write_transaction",
+                    timestamp="2025-01-15 08:30:00",
+                    amount="12",
+                    currency="USD",
+                    type="expense",
+                    description="Coffee",
+                    category="Food",
+                    subcategory="Coffee",
+                    notes=None,
+                ),
+                AIMessage(content="Logged 12 USD for coffee."),
+            ]
+        },
+    ),
+    # Root agent -> quant -> back to the root agent -> steward
+    "handoff_chain": Scenario(
+        "Hi, can you help me sort out my money?",
+        {
+            "FLO": [
+                call("transfer_to_agent", agent_name="quant"),
+                call("transfer_to_agent", agent_name="steward"),
+            ],
+            "QUANT": [call("transfer_to_agent", agent_name="root_agent")],
+            "STEWARD": [AIMessage(content="Happy to help, what are you planning?")],
+        },
+    ),
+    # Root agent -> three specialists in parallel -> root agent merges their answers
+    "health_check": Scenario(
+        "Give me a full financial health check",
+        {
+            "FLO": [
+                call(
+                    "consult_specialists",
+                    questions={
+                        "quant": "How is the user's spending this month?",
+                        "capitalist": "What is the user's net worth?",
+                        "steward": "Which wishlist items can the user afford?",
+                    },
+                ),
+                AIMessage(content="Overall your finances are in good shape."),
+            ],
+            "QUANT": [AIMessage(content="Spending is within budget.")],
+            "CAPITALIST": [
+                call("calculate_networth"),
+                AIMessage(content="Net worth is 0 USD."),
+            ],
+            "STEWARD": [AIMessage(content="Nothing on the wishlist yet.")],
+        },
+    ),
+    "can_i_afford": Scenario(
+        "Can I afford a 900 laptop?",
+        {
+            "STEWARD": [
+                call("assess_affordability", amount="900", category="Electronics"),
+                AIMessage(content="Not this month, your budget is already stretched."),
+            ]
+        },
+    ),
+    "net_worth": Scenario(
+        "What is my net worth?",
+        {
+            "CAPITALIST": [
+                call("calculate_networth"),
+                AIMessage(content="Your net worth is 0 USD."),
+            ]
+        },
+    ),
+}
+
+
+def checkpoint_bytes(saver: SQLiteSaver) -> int:
+    """Bytes of checkpoints, channel blobs and pending writes stored"""
+    with saver.lock:
+        return saver.conn.execute(
+            "SELECT "
+            "(SELECT COALESCE(SUM(LENGTH(checkpoint) + LENGTH(metadata)), 0) "
+            "FROM checkpoints) + "
+            "(SELECT COALESCE(SUM(LENGTH(blob)), 0) FROM blobs) + "
+            "(SELECT COALESCE(SUM(LENGTH(value)), 0) FROM writes)"
+        ).fetchone()[0]
+
+
+def build_history(size: int) -> list:
+    messages = []
+    for index in range(size // 2):
+        messages.append(HumanMessage(content=f"How much did I spend on day {index}?"))
+        messages.append(AIMessage(content=f"You spent {index} USD that day."))
+    return messages
+
+
+async def run_turn(scenario: Scenario, thread_id: str) -> tuple[float, int]:
+    """Time of one turn and the number of model calls it made"""
+    for name, model in models.items():
+        model.set_script(scenario.scripts.get(name, []))
+
+    start = time.perf_counter()
+    async for _ in flo.astream(
+        {"messages": [HumanMessage(content=scenario.message)], "user_id": USER_ID},
+        {"configurable": {"thread_id": thread_id}},
+        stream_mode=["messages", "custom"],
+        subgraphs=True,
+    ):
+        pass
+    elapsed = time.perf_counter() - start
+
+    return elapsed, sum(model.calls for model in models.values())
+
+
+async def measure(
+    scenario: Scenario, rounds: int, saver: SQLiteSaver, history: int = 0
+) -> dict:
+    timings, written = [], []
+    for _ in range(rounds):
+        config = {"configurable": {"thread_id": str(uuid.uuid4())}}
+        if history:
+            await flo.aupdate_state(
+                config, {"messages": build_history(history)}, as_node="root_agent"
+            )
+
+        before = checkpoint_bytes(saver)
+        elapsed, model_calls = await run_turn(
+            scenario, config["configurable"]["thread_id"]
+        )
+        written.append(checkpoint_bytes(saver) - before)
+        timings.append(elapsed)
+
+    median = statistics.median(timings) * 1000
+    return {
+        "turn_ms": round(median, 3),
+        "per_model_call_ms": round(median / max(model_calls, 1), 3),
+        "model_calls": model_calls,
+        "checkpoint_bytes": int(statistics.median(written)),
+    }
+
+
+async def run(rounds: int, saver: SQLiteSaver) -> dict:
+    # Warm up imports, prompt rendering and the database files
+    for scenario in SCENARIOS.values():
+        await measure(scenario, 1, saver)
+
+    results = {
+        name: await measure(scenario, rounds, saver)
+        for name, scenario in SCENARIOS.items()
+    }
+    for size in HISTORY_SIZES:
+        results[f"handoff_chain@{size}"] = await measure(
+            SCENARIOS["handoff_chain"], rounds, saver, history=size
+        )
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Describe every metric that regressed past its tolerance"""
+    failures = []
+    for name, row in results.items():
+        expected = baseline.get(name)
+        if not expected:
+            continue
+        if row["turn_ms"] > expected["turn_ms"] * tolerance:
+            failures.append(
+                f"{name}: turn took {row['turn_ms']:.1f} ms, "
+                f"baseline {expected['turn_ms']:.1f} ms"
+            )
+        if row["checkpoint_bytes"] > expected["checkpoint_bytes"] * BYTES_TOLERANCE:
+            failures.append(
+                f"{name}: turn wrote {row['checkpoint_bytes']} checkpoint bytes, "
+                f"baseline {expected['checkpoint_bytes']}"
+            )
+        if row["model_calls"] != expected["model_calls"]:
+            failures.append(
+                f"{name}: {row['model_calls']} model calls, "
+                f"baseline {expected['model_calls']}"
+            )
+    return failures
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--tolerance", type=float, default=2.0)
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    saver = SQLiteSaver(os.path.join(directory, "checkpoints.db"))
+    flo.checkpointer = saver
+    flo.store = SQLiteStore(os.path.join(directory, "store.db"))
+    src.config.users.USERS_DIR = directory
+    intent_router.log_path = os.path.join(directory, "routing.jsonl")
+    current_user.set(USER_ID)
+
+    results = asyncio.run(run(args.rounds, saver))
+
+    print(
+        f"{'scenario':<22} {'turn (ms)':>10} {'per call (ms)':>14} "
+        f"{'model calls':>12} {'ckpt bytes':>11}"
+    )
+    for name, row in results.items():
+        print(
+            f"{name:<22} {row['turn_ms']:>10.2f} {row['per_model_call_ms']:>14.2f} "
+            f"{row['model_calls']:>12} {row['checkpoint_bytes']:>11}"
+        )
+
+    if args.update_baseline:
+        os.makedirs(os.path.dirname(BASELINE_PATH), exist_ok=True)
+        with open(BASELINE_PATH, "w") as file:
+            json.dump(results, file, indent=4)
+        print(f"\nBaseline written to {BASELINE_PATH}")
+        return 0
+
+    if not os.path.exists(BASELINE_PATH):
+        print("\nNo baseline yet, record one with --update-baseline")
+        return 0
+
+    with open(BASELINE_PATH, "r") as file:
+        failures = compare(results, json.load(file), args.tolerance)
+    if failures:
+        print("\nFAIL:\n  " + "\n  ".join(failures))
+        return 1
+
+    print("\nOK: no regression against the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
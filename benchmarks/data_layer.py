@@ -0,0 +1,177 @@
+"""
+Latency and memory of the data-layer tools as the user's data grows.
+
+For each scale, fills a scratch user database with `benchmarks.datagen` (that many
+transactions, liabilities, investments and wishlist items) and calls the functions
+behind the read tools directly. Reports p50/p99 latency and the peak memory a call
+allocates, measured on a separate call under tracemalloc so it does not skew timings.
+
+Results are compared against `benchmarks/baselines/data_layer.json`; the run fails
+when a p50 latency is more than `--tolerance` times its baseline or a peak memory more
+than `MEMORY_TOLERANCE` times. Record a new baseline with `--update-baseline`.
+
+    uv run python -m benchmarks.data_layer --scales 10000 100000 1000000
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.fakes import install_fake_prompts
+
+install_fake_prompts()
+
+from langchain_core.runnables.config import var_child_runnable_config  # noqa: E402
+from langgraph._internal._constants import CONFIG_KEY_RUNTIME  # noqa: E402
+from langgraph.runtime import Runtime  # noqa: E402
+
+import src.agents  # noqa: E402, F401
+import src.config.users  # noqa: E402
+from benchmarks.datagen import generate  # noqa: E402
+from src.config.users import current_user, user_dir  # noqa: E402
+from src.tools.capitalist import calculate_networth, get_user_liabilities  # noqa: E402
+from src.tools.quant import read_transactions  # noqa: E402
+from src.tools.steward import get_user_wishlist  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines", "data_layer.json")
+MEMORY_TOLERANCE = 1.5
+DEFAULT_SCALES = [10_000, 100_000]
+
+CASES = {
+    "read_transactions": lambda: read_transactions.func(),
+    "read_transactions_filtered": lambda: read_transactions.func(
+        transaction_type="expense", category="food", search_term="coffee", limit=50
+    ),
+    "get_user_liabilities": lambda: get_user_liabilities.func(),
+    "calculate_networth": lambda: calculate_networth.func(),
+    "get_user_wishlist": lambda: get_user_wishlist.func(status="active"),
+}
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def measure(func, rounds: int, max_seconds: float) -> dict:
+    """
+    Latency over up to `rounds` calls (at least one) and the peak memory of one more,
+    made after the first so one-time caches are not counted.
+    """
+    timings = []
+    peak = None
+    deadline = time.perf_counter() + max_seconds
+    while len(timings) < rounds and (not timings or time.perf_counter() < deadline):
+        start = time.perf_counter()
+        result = func()
+        timings.append((time.perf_counter() - start) * 1000)
+        if result.get("status") != "success":
+            raise RuntimeError(result.get("error_message"))
+
+        if peak is None:
+            tracemalloc.start()
+            func()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+    return {
+        "calls": len(timings),
+        "p50_ms": round(statistics.median(timings), 3),
+        "p99_ms": round(percentile(timings, 0.99), 3),
+        "peak_kb": round(peak / 1024, 1),
+    }
+
+
+def run(scales: list[int], rounds: int, max_seconds: float, seed: int) -> dict:
+    results = {}
+    for scale in scales:
+        # Every scale is its own user, so each gets its own database and engine
+        user_id = f"scale{scale}"
+        current_user.set(user_id)
+        start = time.perf_counter()
+        generate(os.path.join(user_dir(user_id), "userdata.db"), scale, seed)
+        print(f"Generated {scale} rows per table in {time.perf_counter() - start:.1f}s")
+
+        for name, func in CASES.items():
+            results[f"{name}@{scale}"] = measure(func, rounds, max_seconds)
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Describe every metric that regressed past its tolerance"""
+    failures = []
+    for name, row in results.items():
+        expected = baseline.get(name)
+        if not expected:
+            continue
+        if row["p50_ms"] > expected["p50_ms"] * tolerance:
+            failures.append(
+                f"{name}: p50 {row['p50_ms']:.1f} ms, baseline {expected['p50_ms']:.1f} ms"
+            )
+        if row["peak_kb"] > expected["peak_kb"] * MEMORY_TOLERANCE:
+            failures.append(
+                f"{name}: peak {row['peak_kb']:.0f} KB, "
+                f"baseline {expected['peak_kb']:.0f} KB"
+            )
+    return failures
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scales", type=int, nargs="+", default=DEFAULT_SCALES)
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument(
+        "--max-seconds", type=float, default=20, help="time budget per tool and scale"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--tolerance", type=float, default=2.0)
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    src.config.users.USERS_DIR = tempfile.mkdtemp()
+    # The tools report progress on the graph's stream, which is not there when they
+    # are called directly
+    var_child_runnable_config.set(
+        {"configurable": {CONFIG_KEY_RUNTIME: Runtime(stream_writer=lambda _: None)}}
+    )
+
+    results = run(args.scales, args.rounds, args.max_seconds, args.seed)
+
+    print(
+        f"\n{'tool@rows':<36} {'calls':>6} {'p50 (ms)':>10} {'p99 (ms)':>10} "
+        f"{'peak (KB)':>10}"
+    )
+    for name, row in results.items():
+        print(
+            f"{name:<36} {row['calls']:>6} {row['p50_ms']:>10.2f} "
+            f"{row['p99_ms']:>10.2f} {row['peak_kb']:>10.1f}"
+        )
+
+    if args.update_baseline:
+        os.makedirs(os.path.dirname(BASELINE_PATH), exist_ok=True)
+        with open(BASELINE_PATH, "w") as file:
+            json.dump(results, file, indent=4)
+        print(f"\nBaseline written to {BASELINE_PATH}")
+        return 0
+
+    if not os.path.exists(BASELINE_PATH):
+        print("\nNo baseline yet, record one with --update-baseline")
+        return 0
+
+    with open(BASELINE_PATH, "r") as file:
+        failures = compare(results, json.load(file), args.tolerance)
+    if failures:
+        print("\nFAIL:\n  " + "\n  ".join(failures))
+        return 1
+
+    print("\nOK: no regression against the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,270 @@
+"""
+Seeded generator of synthetic user data.
+
+Fills a scratch `userdata.db` with realistic transactions, liabilities (debts,
+installments, subscriptions), investments (assets, fixed deposits) and wishlist items.
+The same seed and scale always give the same rows, so benchmark runs compare.
+
+    uv run python -m benchmarks.datagen /tmp/userdata.db --rows 100000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, func, insert, select
+
+from src.config.database import Base, initialize_db
+from src.database import (
+    Asset,
+    Debt,
+    FixedDeposit,
+    Installment,
+    Investment,
+    Liability,
+    Subscription,
+    Transaction,
+    Wishlist,
+)
+
+BATCH_SIZE = 10_000
+# Transactions span this many days before `NOW`
+HISTORY_DAYS = 3 * 365
+NOW = datetime(2025, 1, 1)
+
+# Category -> (subcategories, typical amount in USD)
+EXPENSE_CATEGORIES = {
+    "food": (["groceries", "coffee", "restaurants", "delivery"], 25),
+    "transport": (["fuel", "taxi", "public transport", "parking"], 20),
+    "housing": (["rent", "utilities", "repairs"], 400),
+    "shopping": (["clothes", "electronics", "home"], 60),
+    "entertainment": (["movies", "games", "concerts", "streaming"], 30),
+    "health": (["pharmacy", "doctor", "gym"], 45),
+}
+INCOME_CATEGORIES = {
+    "salary": (["monthly salary", "bonus"], 3000),
+    "freelance": (["project", "consulting"], 600),
+    "investment": (["dividends", "interest"], 80),
+}
+MERCHANTS = ["Corner Shop", "City Market", "Metro", "Online Store", "Cafe Luna", "Mall"]
+SYMBOLS = ["AAPL", "MSFT", "VOO", "BTC", "ETH", "NVDA", "GOOGL", "BND"]
+SUBSCRIPTIONS = ["Netflix", "Spotify", "Cloud Storage", "Gym", "News", "VPN"]
+WISHLIST_ITEMS = ["Laptop", "Headphones", "Bike", "Sofa", "Camera", "Watch", "Trip"]
+
+
+def _amount(rng: random.Random, typical: float) -> float:
+    """Amounts are log-normal around their typical value, like real spending"""
+    return round(typical * rng.lognormvariate(0, 0.6), 2)
+
+
+def _timestamp(rng: random.Random) -> datetime:
+    return NOW - timedelta(seconds=rng.randrange(HISTORY_DAYS * 24 * 3600))
+
+
+def transactions(rng: random.Random, count: int):
+    for _ in range(count):
+        income = rng.random() < 0.15
+        categories = INCOME_CATEGORIES if income else EXPENSE_CATEGORIES
+        category = rng.choice(list(categories))
+        subcategories, typical = categories[category]
+        subcategory = rng.choice(subcategories)
+        yield {
+            "timestamp": _timestamp(rng),
+            "amount": _amount(rng, typical),
+            "currency": "USD",
+            "type": "income" if income else "expense",
+            "description": f"{subcategory.capitalize()} at {rng.choice(MERCHANTS)}",
+            "category": category,
+            "subcategory": subcategory,
+            "notes": rng.choice([None, None, None, "recurring", "shared with partner"]),
+        }
+
+
+def liabilities(rng: random.Random, count: int):
+    """Rows for the liabilities table and the detail table each one points to"""
+    for _ in range(count):
+        kind = rng.choice(["debt", "installment", "subscription"])
+        if kind == "debt":
+            total = _amount(rng, 5000)
+            name = rng.choice(["Credit Card", "Car Loan", "Student Loan", "Mortgage"])
+            detail = {
+                "total_amount": total,
+                "amount_paid": round(total * rng.random(), 2),
+                "interest_rate": round(rng.uniform(0.01, 0.25), 4),
+                "min_monthly_payment": round(total * 0.03, 2),
+                "payment_due_day": rng.randint(1, 28),
+                "due_date": NOW + timedelta(days=rng.randrange(3650)),
+            }
+        elif kind == "installment":
+            months = rng.choice([3, 6, 12, 24])
+            price = _amount(rng, 800)
+            name = f"{rng.choice(WISHLIST_ITEMS)} installments"
+            detail = {
+                "original_price": price,
+                "monthly_payment": round(price / months, 2),
+                "total_installments": months,
+                "installments_paid": rng.randrange(months),
+                "payment_due_day": rng.randint(1, 28),
+            }
+        else:
+            name = rng.choice(SUBSCRIPTIONS)
+            detail = {
+                "monthly_cost": _amount(rng, 12),
+                "billing_cycle": rng.choice(["monthly", "monthly", "yearly"]),
+                "next_billing_date": NOW + timedelta(days=rng.randrange(30)),
+                "last_usage_days": rng.randrange(90),
+            }
+        yield kind, detail, {
+            "name": name,
+            "liability_type": kind,
+            "notes": None,
+        }
+
+
+def investments(rng: random.Random, count: int):
+    """Rows for the investments table and the asset or fixed deposit behind each"""
+    for _ in range(count):
+        if rng.random() < 0.7:
+            symbol = rng.choice(SYMBOLS)
+            price = _amount(rng, 150)
+            kind = "asset"
+            detail = {
+                "symbol": symbol,
+                "quantity": round(rng.uniform(0.1, 50), 8),
+                "average_buy_price_usd": price,
+                "average_buy_price_user_currency": price,
+                "current_market_price": round(price * rng.uniform(0.7, 1.5), 2),
+            }
+            name = symbol
+        else:
+            start = _timestamp(rng)
+            kind = "fixed_deposit"
+            detail = {
+                "principal_amount": _amount(rng, 2000),
+                "interest_rate": round(rng.uniform(0.01, 0.06), 4),
+                "start_date": start,
+                "maturity_date": start + timedelta(days=rng.choice([180, 365, 730])),
+                "is_active": rng.random() < 0.8,
+            }
+            name = "Fixed deposit"
+        yield kind, detail, {
+            "name": name,
+            "investment_type": kind,
+            "currency": "USD",
+            "notes": None,
+        }
+
+
+def wishlist(rng: random.Random, count: int):
+    for _ in range(count):
+        yield {
+            "item_name": rng.choice(WISHLIST_ITEMS),
+            "estimated_price": _amount(rng, 300),
+            "urgency": rng.choice(["low", "medium", "high"]),
+            "priority": rng.choice(["low", "medium", "high"]),
+            "type": rng.choice(["need", "want"]),
+            "status": rng.choice(["active", "active", "purchased", "dropped"]),
+            "notes": None,
+        }
+
+
+def _insert(conn, table, rows) -> None:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == BATCH_SIZE:
+            conn.execute(insert(table), batch)
+            batch = []
+    if batch:
+        conn.execute(insert(table), batch)
+
+
+def _insert_linked(conn, details: dict, parent, rows) -> None:
+    """Insert parent rows and the detail rows of several tables they reference"""
+    batches = {kind: [] for kind in details}
+    last_ids = dict.fromkeys(details, 0)
+    parents = []
+
+    def flush():
+        for kind, batch in batches.items():
+            if batch:
+                conn.execute(insert(details[kind]), batch)
+                batch.clear()
+        if parents:
+            conn.execute(insert(parent), parents)
+            parents.clear()
+
+    for kind, detail, row in rows:
+        last_ids[kind] += 1
+        batches[kind].append({"id": last_ids[kind], **detail})
+        parents.append({**row, "reference_id": last_ids[kind]})
+        if len(parents) == BATCH_SIZE:
+            flush()
+    flush()
+
+
+def generate(path: str, rows: int, seed: int = 0) -> dict[str, int]:
+    """
+    Create `path` with `rows` transactions, liabilities, investments and wishlist
+    items each. An existing file is replaced.
+
+    Returns:
+        dict: Rows written per table.
+    """
+    if os.path.exists(path):
+        os.remove(path)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    rng = random.Random(seed)
+    engine = create_engine(f"sqlite:///{path}")
+    initialize_db(engine)
+
+    with engine.begin() as conn:
+        _insert(conn, Transaction.__table__, transactions(rng, rows))
+        _insert_linked(
+            conn,
+            {
+                "debt": Debt.__table__,
+                "installment": Installment.__table__,
+                "subscription": Subscription.__table__,
+            },
+            Liability.__table__,
+            liabilities(rng, rows),
+        )
+        _insert_linked(
+            conn,
+            {"asset": Asset.__table__, "fixed_deposit": FixedDeposit.__table__},
+            Investment.__table__,
+            investments(rng, rows),
+        )
+        _insert(conn, Wishlist.__table__, wishlist(rng, rows))
+
+        counts = {
+            table.name: conn.execute(select(func.count()).select_from(table)).scalar()
+            for table in Base.metadata.sorted_tables
+        }
+
+    engine.dispose()
+    return counts
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("path", help="Database file to create")
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    counts = generate(args.path, args.rows, args.seed)
+    for table, count in counts.items():
+        print(f"{table:<16} {count:>9}")
+    print(f"\nWritten to {args.path} in {time.perf_counter() - start:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
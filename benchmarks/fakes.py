@@ -0,0 +1,98 @@
+import sys
+import types
+import uuid
+from typing import Any
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import RunnableBinding
+
+AGENT_PROMPTS = {
+    "FLO": "flo/flo",
+    "CAPITALIST": "flo/capitalist-agent",
+    "QUANT": "flo/quant-agent",
+    "STEWARD": "flo/steward",
+    "STRATEGIST": "flo/strategist-agent",
+}
+
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Offline chat model that replays a fixed list of responses, one per call.
+    The script wraps around once exhausted.
+    """
+
+    name: str = "scripted"
+    script: list[AIMessage] = []
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> "ScriptedChatModel":
+        return self
+
+    def set_script(self, script: list[AIMessage]) -> None:
+        self.script = script
+        self.calls = 0
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: Any = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        if self.script:
+            template = self.script[self.calls % len(self.script)]
+        else:
+            template = AIMessage(content="ok")
+        self.calls += 1
+
+        message = template.model_copy(
+            update={
+                "id": str(uuid.uuid4()),
+                "tool_calls": [
+                    {**call, "id": f"call_{uuid.uuid4().hex[:12]}"}
+                    for call in template.tool_calls
+                ],
+            }
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+def install_fake_prompts() -> dict[str, ScriptedChatModel]:
+    """
+    Replace the LangSmith-pulled prompts in `src.config.agents` with offline stand-ins.
+    Must run before anything under `src.agents` or `src.tools` is imported.
+
+    Returns:
+        dict: The scripted model behind each agent, keyed by prompt name (FLO, QUANT, ...).
+    """
+    module = types.ModuleType("src.config.agents")
+    models = {}
+
+    for name, prompt in AGENT_PROMPTS.items():
+        models[name] = ScriptedChatModel(name=prompt)
+        setattr(
+            module,
+            name,
+            types.SimpleNamespace(
+                first=ChatPromptTemplate.from_messages(
+                    [
+                        (
+                            "system",
+                            f"You are {prompt}. User: {{user_name}}, "
+                            "language: {user_language}, currency: {user_currency}.",
+                        )
+                    ]
+                ),
+                last=RunnableBinding(bound=models[name], kwargs={}),
+            ),
+        )
+
+    sys.modules["src.config.agents"] = module
+    return models
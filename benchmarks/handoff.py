@@ -0,0 +1,140 @@
+"""
+Per-handoff cost versus conversation length.
+
+Calls `transfer_to_agent` on histories of increasing size and applies its update
+through the `add_messages` reducer, the way the graph does. The time spent in the
+handoff and the size of the update it writes must stay flat as the history grows;
+the run fails when the largest history is more than `--max-ratio` times slower than
+the smallest one, or when its update is larger.
+
+    uv run python -m benchmarks.handoff
+"""
+
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.fakes import install_fake_prompts
+
+install_fake_prompts()
+
+from langchain_core.messages import AIMessage, HumanMessage  # noqa: E402
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer  # noqa: E402
+from langgraph.graph import add_messages  # noqa: E402
+
+import src.agents  # noqa: E402, F401
+from src.agents.router import intent_router  # noqa: E402
+from src.agents.state import State  # noqa: E402
+from src.tools import handoff_to_agent  # noqa: E402
+
+# Keep the benchmark's handoffs out of the real routing log
+intent_router.log_path = os.path.join(tempfile.mkdtemp(), "routing.jsonl")
+
+HISTORY_SIZES = [10, 100, 1000, 5000]
+
+
+def build_history(size: int) -> list:
+    messages = []
+    for index in range(size // 2):
+        messages.append(
+            HumanMessage(content=f"I spent {index} on coffee", id=f"h{index}")
+        )
+        messages.append(AIMessage(content=f"Recorded expense {index}.", id=f"a{index}"))
+    messages.append(HumanMessage(content="Can I afford a laptop?", id="last"))
+    messages.append(
+        AIMessage(
+            content="",
+            id="handoff",
+            tool_calls=[
+                {
+                    "name": "transfer_to_agent",
+                    "args": {"agent_name": "steward"},
+                    "id": "call_handoff",
+                }
+            ],
+        )
+    )
+    return messages
+
+
+def timed(func, rounds: int) -> float:
+    """Best wall time of `func` in microseconds, the least noisy estimate"""
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    return min(timings) * 1e6
+
+
+def measure(size: int, rounds: int) -> dict:
+    history = build_history(size)
+    state = State(messages=history, active_agent="root")
+    command = handoff_to_agent.func(
+        agent_name="steward", state=state, tool_call_id="call_handoff"
+    )
+
+    handoff = timed(
+        lambda: handoff_to_agent.func(
+            agent_name="steward", state=state, tool_call_id="call_handoff"
+        ),
+        rounds,
+    )
+    # Merging is O(history) for any update, so it is reported but not gated on
+    merge = timed(lambda: add_messages(history, command.update["messages"]), rounds)
+
+    return {
+        "history": size,
+        "handoff_us": handoff,
+        "merge_us": merge,
+        "update_messages": len(command.update["messages"]),
+        "update_bytes": len(
+            JsonPlusSerializer().dumps_typed(command.update["messages"])[1]
+        ),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--max-ratio", type=float, default=3.0)
+    args = parser.parse_args()
+
+    # Collector pauses scale with the number of live messages, not with the handoff
+    results = []
+    for size in HISTORY_SIZES:
+        gc.collect()
+        gc.disable()
+        results.append(measure(size, args.rounds))
+        gc.enable()
+
+    print(
+        f"{'history':>8} {'handoff (us)':>13} {'update msgs':>12} "
+        f"{'update bytes':>13} {'merge (us)':>11}"
+    )
+    for row in results:
+        print(
+            f"{row['history']:>8} {row['handoff_us']:>13.1f} "
+            f"{row['update_messages']:>12} {row['update_bytes']:>13} "
+            f"{row['merge_us']:>11.1f}"
+        )
+
+    first, last = results[0], results[-1]
+    ratio = last["handoff_us"] / first["handoff_us"]
+    print(
+        f"\nHandoff cost ratio {last['history']} vs {first['history']} messages: {ratio:.2f}x"
+    )
+    if ratio > args.max_ratio or last["update_bytes"] > first["update_bytes"]:
+        print("FAIL: handoff cost grows with history")
+        return 1
+
+    print("OK: handoff cost is flat")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
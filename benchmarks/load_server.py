@@ -0,0 +1,141 @@
+"""
+Turns per second served by the WebSocket server.
+
+Drives `server.app` in-process through the ASGI interface with many simulated users,
+each holding its own connection and thread, against scripted models that answer after
+`--model-latency` milliseconds. Checkpoints are kept in memory and user data and traces
+in a temporary directory, so the run leaves no files behind.
+
+    uv run python -m benchmarks.load_server --users 50 --turns 5
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from benchmarks.fakes import ScriptedChatModel, install_fake_prompts
+
+models = install_fake_prompts()
+
+from langchain_core.messages import AIMessage  # noqa: E402
+from langgraph.checkpoint.memory import InMemorySaver  # noqa: E402
+
+import server  # noqa: E402
+import src.config.users  # noqa: E402
+from src.config.tracing import tracer  # noqa: E402
+
+QUESTION = "What is my balance?"
+
+
+class Client:
+    """One simulated user, talking to the app through ASGI receive/send"""
+
+    def __init__(self, user_id: str) -> None:
+        self.scope = {
+            "type": "websocket",
+            "path": "/ws",
+            "query_string": f"user_id={user_id}&thread=load".encode(),
+        }
+        self.to_server: asyncio.Queue[dict] = asyncio.Queue()
+        self.from_server: asyncio.Queue[dict] = asyncio.Queue()
+
+    async def receive(self) -> dict:
+        return await self.to_server.get()
+
+    async def send(self, event: dict) -> None:
+        await self.from_server.put(event)
+
+    async def turn(self, content: str) -> float:
+        start = time.perf_counter()
+        await self.to_server.put(
+            {
+                "type": "websocket.receive",
+                "text": json.dumps({"type": "message", "content": content}),
+            }
+        )
+        while True:
+            event = json.loads((await self.from_server.get())["text"])
+            if event["type"] in ("done", "error", "cancelled"):
+                if event["type"] == "error":
+                    raise RuntimeError(event["error_message"])
+                return time.perf_counter() - start
+
+    async def session(self, turns: int) -> list[float]:
+        connection = asyncio.create_task(
+            server.app(self.scope, self.receive, self.send)
+        )
+        await self.to_server.put({"type": "websocket.connect"})
+        assert (await self.from_server.get())["type"] == "websocket.accept"
+
+        latencies = [await self.turn(QUESTION) for _ in range(turns)]
+
+        await self.to_server.put({"type": "websocket.disconnect"})
+        await connection
+        return latencies
+
+
+def add_latency(seconds: float) -> None:
+    """Make every scripted model call take `seconds`, like a remote model would"""
+
+    async def agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(seconds)
+        return self._generate(messages, stop, run_manager, **kwargs)
+
+    ScriptedChatModel._agenerate = agenerate
+
+
+async def run(users: int, turns: int) -> tuple[float, list[float]]:
+    clients = [Client(f"user{index}") for index in range(users)]
+    start = time.perf_counter()
+    sessions = await asyncio.gather(*(client.session(turns) for client in clients))
+    return time.perf_counter() - start, [value for row in sessions for value in row]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--model-latency", type=float, default=50, help="ms")
+    parser.add_argument("--max-turns", type=int, default=server.SERVER_MAX_TURNS)
+    args = parser.parse_args()
+
+    models["QUANT"].set_script(
+        [
+            AIMessage(
+                content="",
+                tool_calls=[{"name": "check_balance", "args": {}, "id": "balance"}],
+            ),
+            AIMessage(content="Your balance looks healthy."),
+        ]
+    )
+    add_latency(args.model_latency / 1000)
+    server.flo.checkpointer = InMemorySaver()
+    src.config.users.USERS_DIR = tempfile.mkdtemp()
+    tracer.path = os.path.join(src.config.users.USERS_DIR, "traces.jsonl")
+    server.turn_slots = asyncio.Semaphore(args.max_turns)
+
+    wall, latencies = asyncio.run(run(args.users, args.turns))
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+
+    print(
+        f"{args.users} users x {args.turns} turns, {args.max_turns} concurrent turns, "
+        f"{args.model_latency:.0f} ms per model call"
+    )
+    print(
+        f"Turns/s: {len(latencies) / wall:.1f} ({len(latencies)} turns in {wall:.2f}s)"
+    )
+    print(
+        f"Turn latency: p50 {statistics.median(latencies) * 1000:.0f} ms, "
+        f"p99 {p99 * 1000:.0f} ms"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
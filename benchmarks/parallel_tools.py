@@ -0,0 +1,212 @@
+"""
+Latency of model responses that make several tool calls at once.
+
+Scripted specialists answer with one response holding several tool calls, run against
+a user database filled by `benchmarks.datagen`. Each scenario is timed with the calls
+run one at a time (`TOOL_CONCURRENCY = 1`) and concurrently, as the agents run them,
+and the median step time of both and the speedup are reported. The models answer
+instantly, so the time measured is the tools' and the graph's.
+
+The local tools mostly run Python code, which holds the GIL, so they gain little from
+overlapping. `--tool-latency-ms` adds a wait to every tool call, as tools backed by a
+remote database or API would have, to show what overlapping saves there.
+
+    uv run python -m benchmarks.parallel_tools --rows 2000 --tool-latency-ms 50
+"""
+
+import argparse
+import asyncio
+import functools
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from typing import NamedTuple
+
+# Deterministic routing and no summarization, see benchmarks.agent_turns
+os.environ.setdefault("FLO_ROUTER_MIN_SAMPLES", str(sys.maxsize))
+os.environ.setdefault("FLO_CONTEXT_TOKEN_BUDGET", str(10**9))
+
+from benchmarks.fakes import install_fake_prompts  # noqa: E402
+
+models = install_fake_prompts()
+
+from langchain_core.messages import AIMessage, HumanMessage  # noqa: E402
+
+import src.agents.middleware.scheduler as scheduler  # noqa: E402
+import src.config.users  # noqa: E402
+from benchmarks.datagen import generate  # noqa: E402
+from src.agents import flo  # noqa: E402
+from src.agents.router import intent_router  # noqa: E402
+from src.config.checkpoint import SQLiteSaver  # noqa: E402
+from src.config.store import SQLiteStore  # noqa: E402
+from src.config.users import current_user, user_dir  # noqa: E402
+
+USER_ID = "bench"
+
+
+class Scenario(NamedTuple):
+    """The specialist that answers, and the tool calls of its response"""
+
+    agent: str
+    calls: list[tuple[str, dict]]
+
+
+SCENARIOS = {
+    # The steward checking the whole picture before advising on a purchase
+    "steward_reads": Scenario(
+        "steward",
+        [
+            ("check_balance", {}),
+            ("check_budget", {}),
+            ("get_user_liabilities", {}),
+            ("get_user_wishlist", {"status": "active"}),
+            ("read_transactions", {"transaction_type": "expense", "limit": 100}),
+        ],
+    ),
+    "capitalist_reads": Scenario(
+        "capitalist",
+        [
+            ("get_user_liabilities", {}),
+            ("get_user_investments", {}),
+            ("calculate_networth", {}),
+        ],
+    ),
+    # Writes to the same data run in order, the reads around them still overlap
+    "quant_mixed": Scenario(
+        "quant",
+        [
+            ("read_transactions", {"category": "food", "limit": 100}),
+            ("get_avg_income", {}),
+            (
+                "write_transaction",
+                {
+                    "timestamp": "2025-01-15 08:30:00",
+                    "amount": "12",
+                    "currency": "USD",
+                    "type": "expense",
+                    "description": "Coffee",
+                    "category": "Food",
+                    "subcategory": "Coffee",
+                    "notes": None,
+                },
+            ),
+            ("update_balance", {"amount": -12}),
+            ("check_budget", {}),
+        ],
+    ),
+}
+
+
+def add_latency(seconds: float) -> None:
+    """Make every tool of the specialists wait `seconds` before it runs"""
+    from src.agents.capitalist import capitalist
+    from src.agents.quant import quant
+    from src.agents.steward import steward
+
+    for agent in (capitalist, quant, steward):
+        for tool in agent.nodes["tools"].bound.tools_by_name.values():
+            if tool.func is None or hasattr(tool.func, "latency"):
+                continue
+
+            @functools.wraps(tool.func)
+            def slow(*args, _func=tool.func, **kwargs):
+                time.sleep(seconds)
+                return _func(*args, **kwargs)
+
+            slow.latency = seconds
+            tool.func = slow
+
+
+def response(calls: list[tuple[str, dict]]) -> AIMessage:
+    return AIMessage(
+        content="",
+        tool_calls=[
+            {"name": name, "args": args, "id": f"call_{index}"}
+            for index, (name, args) in enumerate(calls)
+        ],
+    )
+
+
+async def run_step(scenario: Scenario) -> float:
+    """Time of one turn in which the specialist makes all the calls in one response"""
+    models[scenario.agent.upper()].set_script(
+        [response(scenario.calls), AIMessage(content="Done.")]
+    )
+    config = {"configurable": {"thread_id": str(uuid.uuid4())}}
+    await flo.aupdate_state(
+        config,
+        {"messages": [AIMessage(content="Hi!")], "active_agent": scenario.agent},
+        as_node="root_agent",
+    )
+
+    start = time.perf_counter()
+    async for _ in flo.astream(
+        {"messages": [HumanMessage(content="Go")], "user_id": USER_ID},
+        config,
+        stream_mode=["custom"],
+        subgraphs=True,
+    ):
+        pass
+    return time.perf_counter() - start
+
+
+async def measure(scenario: Scenario, rounds: int, concurrency: int) -> float:
+    scheduler.TOOL_CONCURRENCY = concurrency
+    await run_step(scenario)
+    timings = [await run_step(scenario) for _ in range(rounds)]
+    return statistics.median(timings) * 1000
+
+
+async def run(rounds: int, concurrency: int) -> dict:
+    results = {}
+    for name, scenario in SCENARIOS.items():
+        serial = await measure(scenario, rounds, 1)
+        concurrent = await measure(scenario, rounds, concurrency)
+        results[name] = {
+            "calls": len(scenario.calls),
+            "serial_ms": round(serial, 3),
+            "concurrent_ms": round(concurrent, 3),
+            "speedup": round(serial / concurrent, 2),
+        }
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=2000, help="rows per table")
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=scheduler.TOOL_CONCURRENCY)
+    parser.add_argument(
+        "--tool-latency-ms", type=float, default=0, help="wait added to every tool call"
+    )
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    flo.checkpointer = SQLiteSaver(os.path.join(directory, "checkpoints.db"))
+    flo.store = SQLiteStore(os.path.join(directory, "store.db"))
+    src.config.users.USERS_DIR = directory
+    intent_router.log_path = os.path.join(directory, "routing.jsonl")
+    current_user.set(USER_ID)
+    generate(os.path.join(user_dir(USER_ID), "userdata.db"), args.rows)
+    if args.tool_latency_ms:
+        add_latency(args.tool_latency_ms / 1000)
+
+    results = asyncio.run(run(args.rounds, args.concurrency))
+
+    print(
+        f"\n{'scenario':<18} {'calls':>6} {'serial (ms)':>12} "
+        f"{'concurrent (ms)':>16} {'speedup':>8}"
+    )
+    for name, row in results.items():
+        print(
+            f"{name:<18} {row['calls']:>6} {row['serial_ms']:>12.1f} "
+            f"{row['concurrent_ms']:>16.1f} {row['speedup']:>7.2f}x"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""
+Tool schema tokens sent to each specialist's model, with and without tool selection.
+
+Sample requests are handed to each specialist, whose scripted model answers at once.
+For every model call, `ToolSelectionMiddleware` counts the schema tokens of all the
+agent's tools and of the tools it selected for the request; the means per agent and
+per request are reported. Tokens are estimated from the length of the JSON schemas.
+
+    uv run python -m benchmarks.tool_selection
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import uuid
+
+# Deterministic routing and no summarization, see benchmarks.agent_turns
+os.environ.setdefault("FLO_ROUTER_MIN_SAMPLES", str(sys.maxsize))
+os.environ.setdefault("FLO_CONTEXT_TOKEN_BUDGET", str(10**9))
+
+from benchmarks.fakes import install_fake_prompts  # noqa: E402
+
+models = install_fake_prompts()
+
+from langchain_core.messages import AIMessage, HumanMessage  # noqa: E402
+
+import src.config.users  # noqa: E402
+from src.agents import flo  # noqa: E402
+from src.agents.middleware import tool_selection  # noqa: E402
+from src.agents.router import intent_router  # noqa: E402
+from src.config.checkpoint import SQLiteSaver  # noqa: E402
+from src.config.store import SQLiteStore  # noqa: E402
+from src.config.users import current_user  # noqa: E402
+
+USER_ID = "bench"
+
+REQUESTS = {
+    "quant": [
+        "I spent $5 on coffee this morning",
+        "What's my balance?",
+        "Show my transactions from last week",
+        "Set my food budget to 300",
+    ],
+    "capitalist": [
+        "I took a car loan of 20000 at 6%",
+        "I bought 10 shares of VTI",
+        "What's my net worth?",
+        "Add my Netflix subscription, 15 a month",
+    ],
+    "steward": [
+        "Add a new laptop to my wishlist",
+        "Can I afford a $1200 phone?",
+        "Show my wishlist",
+    ],
+    "strategist": [
+        "I want to save 10000 for a trip next year",
+        "How are my goals going?",
+        "Help me plan for retirement",
+    ],
+}
+
+
+async def run_turn(agent: str, request: str) -> dict:
+    """Schema tokens of the model call answering `request` in `agent`"""
+    models[agent.upper()].set_script([AIMessage(content="Done.")])
+    config = {"configurable": {"thread_id": str(uuid.uuid4())}}
+    await flo.aupdate_state(
+        config,
+        {"messages": [AIMessage(content="Hi!")], "active_agent": agent},
+        as_node="root_agent",
+    )
+
+    before = dict(tool_selection.agents[agent])
+    await flo.ainvoke(
+        {"messages": [HumanMessage(content=request)], "user_id": USER_ID}, config
+    )
+    after = tool_selection.agents[agent]
+    return {key: after[key] - before[key] for key in after}
+
+
+async def run() -> list[tuple[str, str, dict]]:
+    return [
+        (agent, request, await run_turn(agent, request))
+        for agent, requests in REQUESTS.items()
+        for request in requests
+    ]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    flo.checkpointer = SQLiteSaver(os.path.join(directory, "checkpoints.db"))
+    flo.store = SQLiteStore(os.path.join(directory, "store.db"))
+    src.config.users.USERS_DIR = directory
+    intent_router.log_path = os.path.join(directory, "routing.jsonl")
+    current_user.set(USER_ID)
+
+    results = asyncio.run(run())
+
+    print(f"\n{'agent':<11} {'request':<44} {'tools':>9} {'tokens':>13}")
+    for agent, request, row in results:
+        print(
+            f"{agent:<11} {request[:44]:<44} "
+            f"{row['selected']:>4}/{row['tools']:<4} {row['sent']:>6}/{row['tokens']:<6}"
+        )
+
+    print(f"\n{'agent':<11} {'calls':>6} {'tools':>11} {'tokens':>15} {'saved':>7}")
+    for agent, row in tool_selection.report().items():
+        print(
+            f"{agent:<11} {row['calls']:>6} {row['selected']:>5}/{row['tools']:<5} "
+            f"{row['sent']:>7}/{row['tokens']:<7} {row['saved']:>6.0%}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
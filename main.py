@@ -1,18 +1,31 @@
+import argparse
 import asyncio
-import json
 import logging
 import os
+import signal
+import sys
 import uuid
 from dotenv import load_dotenv
-from langchain_core.messages import AIMessageChunk, HumanMessage
+from langchain_core.globals import set_llm_cache
+from langchain_core.messages import AIMessage, HumanMessage
 
-from src.agents import flo
+from src.agents import flo, repair_thread
+from src.config.cache import LLM_CACHE_ENABLED, llm_cache
+from src.config.checkpoint import checkpointer
 from src.config.database import engine, initialize_db
-from src.config.directory import DB_PATH, MEMORY_DIR
+from src.config.directory import DB_PATH
+from src.config.logging import log_context, setup_logging
+from src.config.profiling import profiler
+from src.config.tracing import Trace, tracer
+from src.config.usage import USAGE_FIELDS, thread_totals
+from src.config.users import load_profile
 
 load_dotenv()
 logger = logging.getLogger(__name__)
 
+# Seconds between flushes of streamed text to the terminal
+RENDER_INTERVAL = 0.05
+
 
 # Database Setup
 def setup_database():
@@ -29,39 +42,283 @@ def setup_database():
         logger.info("Database already exists. Skipping initialization.")
 
 
-async def call_agent_async(message: str, profile: dict, thread_id: str):
+class StdinReader:
+    """
+    Read user input without blocking the event loop.
+
+    Lines are read by an event loop reader callback when stdin has data, so no thread is
+    parked in `input()`. Where the loop cannot watch stdin (e.g. Windows), a worker
+    thread reads lines instead.
+    """
+
+    def __init__(self) -> None:
+        self.lines: asyncio.Queue[str | None] = asyncio.Queue()
+        self.buffer = b""
+        self.fd = sys.stdin.fileno()
+        self.loop = asyncio.get_running_loop()
+        try:
+            self.loop.add_reader(self.fd, self._on_readable)
+            self.watching = True
+        except (NotImplementedError, ValueError, PermissionError):
+            self.watching = False
+
+    def _on_readable(self) -> None:
+        data = os.read(self.fd, 4096)
+        if not data:
+            self.close()
+            if self.buffer:
+                self.lines.put_nowait(self.buffer.decode())
+            self.lines.put_nowait(None)
+            return
+
+        *lines, self.buffer = (self.buffer + data).split(b"\n")
+        for line in lines:
+            self.lines.put_nowait(line.decode())
+
+    async def readline(self, prompt: str = "") -> str | None:
+        """Next line without its newline, or None once stdin is closed"""
+        print(prompt, end="", flush=True)
+        if not self.watching:
+            line = await asyncio.to_thread(sys.stdin.readline)
+            return line.rstrip("\n") if line else None
+
+        return await self.lines.get()
+
+    def close(self) -> None:
+        if self.watching:
+            self.loop.remove_reader(self.fd)
+            self.watching = False
+
+
+class StreamPrinter:
+    """
+    Collect streamed text and write it to the terminal a few times per second.
+
+    Text that arrives between flushes is written by a timer, so the tail of an answer
+    never waits for the next chunk.
+    """
+
+    def __init__(self, interval: float = RENDER_INTERVAL) -> None:
+        self.interval = interval
+        self.parts: list[str] = []
+        self.loop = asyncio.get_running_loop()
+        self.flushed_at = 0.0
+        self.timer: asyncio.TimerHandle | None = None
+
+    def write(self, text: str) -> None:
+        self.parts.append(text)
+        wait = self.flushed_at + self.interval - self.loop.time()
+        if wait <= 0:
+            self.flush()
+        elif self.timer is None:
+            self.timer = self.loop.call_later(wait, self.flush)
+
+    def line(self, text: str) -> None:
+        self.write(f"{text}\n")
+
+    def flush(self) -> None:
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        if self.parts:
+            sys.stdout.write("".join(self.parts))
+            self.parts.clear()
+        sys.stdout.flush()
+        self.flushed_at = self.loop.time()
+
+
+def print_breakdown(trace: Trace) -> None:
+    """Print where a turn spent its time, from its trace"""
+    rows = trace.breakdown()
+    print(f"\n[trace {trace.trace_id}] {rows.pop('total')['ms']:.0f} ms")
+    for name, row in rows.items():
+        line = f"  {name:<8}{row['ms']:>9.1f} ms"
+        if row["count"]:
+            line += f"  x{row['count']}"
+        if "first_token_ms" in row:
+            line += f"  (first token {row['first_token_ms']:.0f} ms)"
+        if row.get("rows"):
+            line += f"  ({row['rows']} rows)"
+        print(line)
+
+
+async def print_usage(config: dict) -> None:
+    """Print the tokens and estimated cost of the thread, per agent"""
+    snapshot = await flo.aget_state(config)
+    usage = snapshot.values.get("usage") or {}
+    if not usage:
+        print("No model usage recorded on this thread yet.")
+        return
+
+    print(
+        f"{'agent':<12} {'calls':>6} {'input':>9} {'cached':>9} {'output':>9} "
+        f"{'cost (USD)':>11}"
+    )
+    for agent, counters in [*usage.items(), ("total", thread_totals(usage))]:
+        calls, input_tokens, output_tokens, cached, cost = (
+            counters.get(field, 0) for field in USAGE_FIELDS
+        )
+        print(
+            f"{agent:<12} {calls:>6} {input_tokens:>9} {cached:>9} "
+            f"{output_tokens:>9} {cost:>11.4f}"
+        )
+
+
+async def call_agent_async(
+    message: str,
+    profile: dict,
+    thread_id: str,
+    trace: bool = False,
+    token_budget: int | None = None,
+):
+    printer = StreamPrinter()
+    with (
+        log_context(thread_id) as turn_id,
+        profiler.turn(turn_id),
+        tracer.turn(**{"flo.thread_id": thread_id}) as turn_trace,
+    ):
+        try:
+            await stream_turn(message, profile, thread_id, printer, token_budget)
+        finally:
+            printer.flush()
+    if trace and turn_trace:
+        print_breakdown(turn_trace)
+
+
+async def stream_turn(
+    message: str,
+    profile: dict,
+    thread_id: str,
+    printer: StreamPrinter,
+    token_budget: int | None = None,
+):
     async for node, stream_mode, chunk in flo.astream(
         {"messages": [HumanMessage(content=message)], **profile},
-        {"configurable": {"thread_id": thread_id}},
+        {
+            "configurable": {"thread_id": thread_id, "token_budget": token_budget},
+            "callbacks": tracer.callbacks(),
+        },
         stream_mode=["messages", "custom"],
         subgraphs=True,
     ):
         if stream_mode == "custom":
-            print(chunk)
+            # Spans are shown as a breakdown at the end of the turn with --trace, usage
+            # with /usage
+            if not (isinstance(chunk, dict) and ("span" in chunk or "usage" in chunk)):
+                printer.line(str(chunk))
         else:
             msg = chunk[0]
-            if isinstance(msg, AIMessageChunk) and msg.content and not msg.tool_calls:
-                print(msg.content, end="", flush=True)
+            # Cached answers arrive as one whole message instead of chunks
+            if isinstance(msg, AIMessage) and msg.content and not msg.tool_calls:
+                printer.write(msg.text)
 
 
-async def main():
-    thread_id = str(uuid.uuid4())
+def parse_args():
+    parser = argparse.ArgumentParser(description="Flo: Financial Life Orchestrator")
+    parser.add_argument(
+        "--thread",
+        help="Resume a conversation thread by name (a new thread is started if omitted)",
+    )
+    parser.add_argument(
+        "--list-threads",
+        action="store_true",
+        help="List the saved conversation threads and exit",
+    )
+    parser.add_argument(
+        "--trace",
+        action="store_true",
+        help="Print where each turn spent its time (routing, model, tools, SQLite)",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Write a CPU profile (folded stacks) and the memory growth of each turn "
+        "to logs/profiles",
+    )
+    parser.add_argument(
+        "--token-budget",
+        type=int,
+        help="Tokens the thread may use before Flo stops answering "
+        "(default FLO_THREAD_TOKEN_BUDGET, 0 for no limit)",
+    )
+    return parser.parse_args()
 
-    with open(os.path.join(MEMORY_DIR, "semantic", "profile.json"), "r") as file:
-        data = json.load(file)
 
-    while True:
-        user_input = input("User: ")
+async def main(
+    thread_id: str | None = None, trace: bool = False, token_budget: int | None = None
+):
+    thread_id = thread_id or str(uuid.uuid4())
+    compaction = asyncio.create_task(checkpointer.run_compaction())
+    print(f"Thread: {thread_id} (resume with --thread {thread_id})\n")
 
-        if user_input.lower() in ["exit", "quit", "q"]:
-            print("Flo: See You Later!")
-            break
+    data = await asyncio.to_thread(load_profile)
 
-        print("Flo: ", end="")
-        await call_agent_async(user_input, data["profile"], thread_id)
-        print("\n")
+    loop = asyncio.get_running_loop()
+    stdin = StdinReader()
+    turn: asyncio.Task | None = None
+
+    def interrupt():
+        # Ctrl-C stops the answer in progress, or leaves when there is none
+        if turn and not turn.done():
+            turn.cancel()
+        else:
+            stdin.lines.put_nowait(None)
+
+    try:
+        loop.add_signal_handler(signal.SIGINT, interrupt)
+    except NotImplementedError:
+        pass
+
+    try:
+        while True:
+            user_input = await stdin.readline("User: ")
+
+            if user_input is None or user_input.lower() in ["exit", "quit", "q"]:
+                print("\nFlo: See You Later!")
+                break
+            if not user_input.strip():
+                continue
+            if user_input.strip() == "/usage":
+                await print_usage({"configurable": {"thread_id": thread_id}})
+                print()
+                continue
+
+            print("Flo: ", end="")
+            turn = asyncio.create_task(
+                call_agent_async(
+                    user_input, data["profile"], thread_id, trace, token_budget
+                )
+            )
+            try:
+                await turn
+            except asyncio.CancelledError:
+                if asyncio.current_task().cancelling():
+                    raise
+                print("\n[Cancelled]")
+                await repair_thread({"configurable": {"thread_id": thread_id}})
+            print("\n")
+    finally:
+        stdin.close()
+        compaction.cancel()
+        try:
+            loop.remove_signal_handler(signal.SIGINT)
+        except NotImplementedError:
+            pass
 
 
 if __name__ == "__main__":
-    setup_database()
-    asyncio.run(main())
+    args = parse_args()
+
+    if args.list_threads:
+        for thread in checkpointer.list_threads():
+            print(thread)
+    else:
+        setup_logging()
+        setup_database()
+        if LLM_CACHE_ENABLED:
+            set_llm_cache(llm_cache)
+        if args.trace:
+            tracer.enabled = True
+        if args.profile:
+            profiler.enabled = True
+        asyncio.run(main(args.thread, args.trace, args.token_budget))
@@ -0,0 +1,243 @@
+"""
+ASGI entry point that serves Flo to many users over WebSocket.
+
+Run it with any ASGI server, for example uvicorn from the `server` extra:
+
+    uv sync --extra server
+    uv run uvicorn server:app
+
+The user id is taken as given, so put the server behind a proxy that authenticates
+users before exposing it.
+
+Protocol, one JSON object per WebSocket message. Connect to
+`/ws?user_id=<id>&thread=<name>`, then send:
+
+    {"type": "message", "content": "...", "profile": {...}}   start a turn
+    {"type": "cancel"}                                         stop the running turn
+
+and receive:
+
+    {"type": "token", "content": "..."}      streamed answer text
+    {"type": "custom", "content": ...}       tool progress updates
+    {"type": "span", "content": {...}}       timing of routing, model and tool calls
+    {"type": "usage", "content": {...}}      tokens and cost of a model call and the thread
+    {"type": "queued"}                       waiting for a free turn slot
+    {"type": "done"} / {"type": "cancelled"} / {"type": "error", "error_message": "..."}
+"""
+
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import uuid
+import weakref
+from urllib.parse import parse_qs
+
+from dotenv import load_dotenv
+from langchain_core.globals import set_llm_cache
+from langchain_core.messages import AIMessage, HumanMessage
+
+from src.agents import flo, repair_thread
+from src.config.cache import LLM_CACHE_ENABLED, llm_cache
+from src.config.checkpoint import checkpointer
+from src.config.logging import log_context, setup_logging, stop_logging
+from src.config.profiling import profiler
+from src.config.tracing import tracer
+from src.config.users import current_user, is_valid_user_id, load_profile
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+# Turns running the graph at once, across all connections
+SERVER_MAX_TURNS = int(os.getenv("FLO_SERVER_MAX_TURNS", 16))
+# Events buffered per connection before the turn waits for the client to catch up
+SERVER_QUEUE_SIZE = int(os.getenv("FLO_SERVER_QUEUE_SIZE", 256))
+PROFILE_FIELDS = ("user_name", "user_language", "user_currency")
+
+turn_slots = asyncio.Semaphore(SERVER_MAX_TURNS)
+# One turn at a time per thread, even across connections to the same thread. Locks
+# live as long as a turn holds or waits for them
+thread_locks: weakref.WeakValueDictionary[str, asyncio.Lock] = (
+    weakref.WeakValueDictionary()
+)
+
+
+class Connection:
+    """
+    One WebSocket client: a user, one of their threads, and at most one running turn.
+
+    Threads are namespaced by user id, so users never see each other's checkpoints or
+    goals. Events for the client go through a bounded queue; a client that reads
+    slowly makes its own turn wait instead of growing the server's memory.
+    """
+
+    def __init__(self, scope: dict, receive, send) -> None:
+        query = parse_qs(scope.get("query_string", b"").decode())
+        self.user_id = query.get("user_id", [None])[0]
+        thread = query.get("thread", [None])[0] or str(uuid.uuid4())
+        self.thread_id = f"{self.user_id}:{thread}"
+        self.config = {"configurable": {"thread_id": self.thread_id}}
+        self.trace_attributes = {
+            "enduser.id": self.user_id,
+            "flo.thread_id": self.thread_id,
+        }
+        self.profile: dict = {}
+        self.receive = receive
+        self.send = send
+        self.outbox: asyncio.Queue[dict] = asyncio.Queue(SERVER_QUEUE_SIZE)
+        self.turn: asyncio.Task | None = None
+
+    async def emit(self, event: dict) -> None:
+        await self.outbox.put(event)
+
+    async def _send_loop(self) -> None:
+        while True:
+            event = await self.outbox.get()
+            await self.send(
+                {"type": "websocket.send", "text": json.dumps(event, default=str)}
+            )
+
+    async def _stream(self, content: str) -> None:
+        async for _, stream_mode, chunk in flo.astream(
+            {"messages": [HumanMessage(content=content)], **self.profile},
+            {**self.config, "callbacks": tracer.callbacks()},
+            stream_mode=["messages", "custom"],
+            subgraphs=True,
+        ):
+            if stream_mode == "custom":
+                if isinstance(chunk, dict) and "span" in chunk:
+                    await self.emit({"type": "span", "content": chunk["span"]})
+                elif isinstance(chunk, dict) and "usage" in chunk:
+                    await self.emit({"type": "usage", "content": chunk["usage"]})
+                else:
+                    await self.emit({"type": "custom", "content": chunk})
+                continue
+            msg = chunk[0]
+            if isinstance(msg, AIMessage) and msg.content and not msg.tool_calls:
+                await self.emit({"type": "token", "content": msg.text})
+
+    async def _run_turn(self, content: str) -> None:
+        # Tasks started by the graph inherit the user, and with it their own database
+        current_user.set(self.user_id)
+        with log_context(self.thread_id) as turn_id:
+            lock = thread_locks.setdefault(self.thread_id, asyncio.Lock())
+            try:
+                if lock.locked() or turn_slots.locked():
+                    await self.emit({"type": "queued"})
+                async with lock:
+                    try:
+                        async with turn_slots:
+                            with (
+                                profiler.turn(turn_id),
+                                tracer.turn(**self.trace_attributes),
+                            ):
+                                await self._stream(content)
+                    except asyncio.CancelledError:
+                        # Still holding the thread, so no other turn sees it half done
+                        await repair_thread(self.config)
+                        raise
+                await self.emit({"type": "done"})
+            except asyncio.CancelledError:
+                # The client may be gone, never wait on a full queue here
+                with contextlib.suppress(asyncio.QueueFull):
+                    self.outbox.put_nowait({"type": "cancelled"})
+                raise
+            except Exception as e:
+                logger.exception(f"Turn failed on {self.config['configurable']}")
+                await self.emit({"type": "error", "error_message": str(e)})
+
+    async def _handle(self, data: dict) -> None:
+        if data.get("type") == "message":
+            if self.turn and not self.turn.done():
+                await self.emit(
+                    {"type": "error", "error_message": "A turn is already running"}
+                )
+                return
+            profile = data.get("profile") or {}
+            self.profile.update(
+                {key: profile[key] for key in PROFILE_FIELDS if profile.get(key)}
+            )
+            self.turn = asyncio.create_task(self._run_turn(str(data["content"])))
+        elif data.get("type") == "cancel":
+            if self.turn and not self.turn.done():
+                self.turn.cancel()
+        else:
+            await self.emit(
+                {"type": "error", "error_message": f"Unknown type: {data.get('type')}"}
+            )
+
+    async def run(self) -> None:
+        if (await self.receive())["type"] != "websocket.connect":
+            return
+        if not self.user_id or not is_valid_user_id(self.user_id):
+            await self.send({"type": "websocket.close", "code": 4401})
+            return
+
+        stored = await asyncio.to_thread(load_profile, self.user_id)
+        self.profile = {**stored["profile"], "user_id": self.user_id}
+
+        await self.send({"type": "websocket.accept"})
+        sender = asyncio.create_task(self._send_loop())
+        try:
+            while True:
+                event = await self.receive()
+                if event["type"] == "websocket.disconnect":
+                    break
+                try:
+                    data = json.loads(event.get("text") or event.get("bytes") or "")
+                except ValueError:
+                    await self.emit({"type": "error", "error_message": "Invalid JSON"})
+                    continue
+                await self._handle(data)
+        finally:
+            if self.turn and not self.turn.done():
+                self.turn.cancel()
+                await asyncio.gather(self.turn, return_exceptions=True)
+            sender.cancel()
+
+
+async def lifespan(receive, send) -> None:
+    compaction = None
+    while True:
+        event = await receive()
+        if event["type"] == "lifespan.startup":
+            setup_logging()
+            if LLM_CACHE_ENABLED:
+                set_llm_cache(llm_cache)
+            compaction = asyncio.create_task(checkpointer.run_compaction())
+            await send({"type": "lifespan.startup.complete"})
+        elif event["type"] == "lifespan.shutdown":
+            if compaction:
+                compaction.cancel()
+            stop_logging()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope: dict, receive, send) -> None:
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+    elif scope["type"] == "websocket" and scope["path"] == "/ws":
+        await Connection(scope, receive, send).run()
+    elif scope["type"] == "websocket":
+        await send({"type": "websocket.close", "code": 4404})
+    elif scope["type"] == "http":
+        status, body = (200, b"ok") if scope["path"] == "/health" else (404, b"")
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": [(b"content-type", b"text/plain")],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+
+
+if __name__ == "__main__":
+    try:
+        import uvicorn
+    except ImportError:
+        raise SystemExit("Install an ASGI server to run Flo: `uv sync --extra server`")
+
+    uvicorn.run(app, host=os.getenv("FLO_HOST", "127.0.0.1"), port=8000)
@@ -1 +1 @@
-from .root import flo
+from .root import flo, repair_thread
@@ -1,6 +1,17 @@
 from langchain.agents import create_agent
 from langchain.agents.middleware import ModelRequest, dynamic_prompt
 
+from src.agents.instructions import inline_instruction
+from src.agents.middleware import (
+    CacheInvalidationMiddleware,
+    ContextWindowMiddleware,
+    ToolSchedulerMiddleware,
+    ToolSelectionMiddleware,
+    TracingMiddleware,
+    UsageMiddleware,
+    UserContextMiddleware,
+)
+from src.agents.prompts import render_prompt
 from src.agents.state import State
 from src.config.agents import CAPITALIST
 from src.tools import (
@@ -18,17 +29,10 @@ def personalized_prompt(request: ModelRequest) -> str:
     user_language = request.state.get("user_language", "English")
     user_currency = request.state.get("user_currency", "USD")
 
-    return (
-        CAPITALIST.first.invoke(
-            {
-                "user_currency": user_currency,
-                "user_language": user_language,
-                "user_name": user_name,
-            }
-        )
-        .messages[0]
-        .content
+    messages = render_prompt(
+        "capitalist", CAPITALIST, user_name, user_language, user_currency
     )
+    return messages[0].content + inline_instruction("capitalist", request.messages)
 
 
 capitalist = create_agent(
@@ -55,5 +59,16 @@ capitalist = create_agent(
         update_fixed_deposit,
     ],
     state_schema=State,
-    middleware=[personalized_prompt],
+    middleware=[
+        personalized_prompt,
+        UsageMiddleware("capitalist"),
+        ContextWindowMiddleware(
+            CAPITALIST.last.bound, agent="capitalist", prompt=CAPITALIST
+        ),
+        ToolSelectionMiddleware("capitalist"),
+        ToolSchedulerMiddleware(),
+        CacheInvalidationMiddleware(),
+        UserContextMiddleware(),
+        TracingMiddleware(),
+    ],
 )
@@ -0,0 +1,146 @@
+import logging
+import os
+import re
+import threading
+import time
+from itertools import islice
+
+from langchain_core.messages import AnyMessage, HumanMessage
+
+from src.config.directory import MEMORY_DIR
+
+logger = logging.getLogger(__name__)
+
+INSTRUCTIONS_DIR = os.path.join(MEMORY_DIR, "procedural")
+# Seconds between checks of the instruction files for changes
+INSTRUCTIONS_RELOAD_INTERVAL = float(os.getenv("FLO_INSTRUCTIONS_RELOAD_INTERVAL", 2))
+# How many of the latest user messages are searched for the request at hand
+INSTRUCTION_LOOKBACK = 3
+
+# Instructions each agent may need, with the requests they apply to
+INSTRUCTION_RULES = {
+    "quant": {
+        "write_transaction": r"\b(spent|spend|paid|bought|earned|received|got paid|salary|income)\b",
+        "read_transactions": r"\b(transactions?|spending|history|how much did i)\b",
+        "create_budget": r"\b(create|set|make|new|plan)\b.*\bbudget\b",
+    },
+    "capitalist": {
+        "write_liability": r"\b(debt|loan|mortgage|credit card|installments?|bnpl|subscriptions?|owe)\b",
+        "update_investment": r"\b(update|sold|sell|now worth|price)\b.*\b(stocks?|shares|crypto|investments?|assets?|deposit|bonds?)\b",
+        "insert_investment": r"\b(invested|bought|buy|add|new)\b.*\b(stocks?|shares|crypto|etf|investments?|assets?|deposit|bonds?)\b",
+    },
+    "steward": {
+        "can_i_afford": r"\b(can i afford|should i buy|afford)\b",
+        "add_to_wishlist": r"\bwish ?list\b",
+    },
+    "strategist": {
+        "create_goals": r"\b(new|create|set|add)\b.*\bgoals?\b|\b(save|saving) (up )?for\b",
+    },
+}
+
+
+class InstructionRegistry:
+    """
+    Procedural instructions held in memory.
+
+    The instruction files are read once and kept with their modification times. Every
+    `reload_interval` seconds at most, a lookup stats the directory and reloads the
+    files that were added, changed or removed, so edits show up without a restart.
+    """
+
+    def __init__(
+        self,
+        directory: str = INSTRUCTIONS_DIR,
+        reload_interval: float = INSTRUCTIONS_RELOAD_INTERVAL,
+    ) -> None:
+        self.directory = directory
+        self.reload_interval = reload_interval
+        self.lock = threading.Lock()
+        self.instructions: dict[str, str] = {}
+        self.mtimes: dict[str, float] = {}
+        self.checked_at = 0.0
+
+    def _refresh(self) -> None:
+        now = time.monotonic()
+        if now - self.checked_at < self.reload_interval:
+            return
+
+        with self.lock:
+            self.checked_at = now
+            try:
+                entries = {
+                    entry.name.split(".")[0]: entry
+                    for entry in os.scandir(self.directory)
+                    if entry.is_file() and entry.name.endswith(".txt")
+                }
+            except FileNotFoundError:
+                logger.error(f"Instruction directory not found: {self.directory}")
+                entries = {}
+
+            for name in set(self.instructions) - set(entries):
+                del self.instructions[name]
+                del self.mtimes[name]
+
+            for name, entry in entries.items():
+                mtime = entry.stat().st_mtime
+                if self.mtimes.get(name) != mtime:
+                    with open(entry.path, "r") as file:
+                        self.instructions[name] = file.read()
+                    self.mtimes[name] = mtime
+                    logger.debug(f"Loaded task instruction: {name}")
+
+    def get(self, name: str) -> str | None:
+        self._refresh()
+        return self.instructions.get(name)
+
+    def names(self) -> list[str]:
+        self._refresh()
+        return sorted(self.instructions)
+
+    def match(self, agent: str, text: str) -> str | None:
+        """Name of the one instruction of `agent` that applies to `text`, if any"""
+        text = text.lower()
+        matches = [
+            name
+            for name, pattern in INSTRUCTION_RULES.get(agent, {}).items()
+            if re.search(pattern, text)
+        ]
+        return matches[0] if len(matches) == 1 else None
+
+
+instruction_registry = InstructionRegistry()
+
+
+def inline_instruction(agent: str, messages: list[AnyMessage]) -> str:
+    """
+    Prompt section with the task instruction that applies to the user's latest
+    request, or an empty string when none clearly does.
+
+    It goes after the rendered prompt, so the prompt prefix stays cacheable.
+    """
+    requests = islice(
+        (
+            message
+            for message in reversed(messages)
+            if isinstance(message, HumanMessage)
+        ),
+        INSTRUCTION_LOOKBACK,
+    )
+    # A short follow-up ("yes, go ahead") keeps the instruction of the request before it
+    name = next(
+        (
+            found
+            for request in requests
+            if (found := instruction_registry.match(agent, request.text))
+        ),
+        None,
+    )
+    instruction = instruction_registry.get(name) if name else None
+    if not instruction:
+        return ""
+
+    return (
+        f'\n\n<task_instruction name="{name}">\n{instruction}\n</task_instruction>\n'
+        "This instruction applies to the current request. Follow it directly, "
+        "without calling `get_task_instruction` for it."
+    )
@@ -0,0 +1,12 @@
+from .cache import CacheInvalidationMiddleware
+from .context import (
+    ContextWindowMiddleware,
+    compact_tool_results,
+    context_window,
+    update_summary,
+)
+from .scheduler import ToolSchedulerMiddleware
+from .tools import ToolSelectionMiddleware, tool_selection
+from .tracing import TracingMiddleware
+from .usage import UsageMiddleware
+from .user import UserContextMiddleware
@@ -0,0 +1,32 @@
+import asyncio
+
+from langchain.agents.middleware import AgentMiddleware
+
+from src.config.cache import LLM_CACHE_ENABLED, llm_cache
+from src.tools.registry import is_write_tool, tool_domains
+
+
+class CacheInvalidationMiddleware(AgentMiddleware):
+    """
+    Invalidate cached model answers after a write tool runs.
+
+    The data domains a tool writes come from the tool registry, and every cached answer
+    that read one of them is retired. Unknown tools invalidate the whole cache. With
+    the cache turned off there is nothing to retire, and its file is never opened.
+    """
+
+    def wrap_tool_call(self, request, handler):
+        result = handler(request)
+        name = request.tool_call["name"]
+        if LLM_CACHE_ENABLED and is_write_tool(name):
+            llm_cache.invalidate(tool_domains(name))
+
+        return result
+
+    async def awrap_tool_call(self, request, handler):
+        result = await handler(request)
+        name = request.tool_call["name"]
+        if LLM_CACHE_ENABLED and is_write_tool(name):
+            await asyncio.to_thread(llm_cache.invalidate, tool_domains(name))
+
+        return result
@@ -0,0 +1,311 @@
+import ast
+import json
+import logging
+import os
+import re
+from typing import Any
+
+from langchain.agents.middleware import AgentMiddleware, ModelRequest, ModelResponse
+from langchain_core.messages import (
+    AIMessage,
+    AnyMessage,
+    HumanMessage,
+    SystemMessage,
+    ToolMessage,
+    get_buffer_string,
+)
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.runnables import Runnable
+from langgraph.constants import TAG_NOSTREAM
+
+from src.agents.instructions import inline_instruction
+from src.agents.prompts import render_prompt
+from src.config.usage import add_usage, context_budget
+from src.tools.registry import tool_domains
+
+logger = logging.getLogger(__name__)
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("FLO_CONTEXT_TOKEN_BUDGET", 8000))
+# Share of the budget kept verbatim after summarizing, the rest absorbs the next turns
+CONTEXT_KEEP_RATIO = 0.5
+SYSTEM_PROMPT_RESERVE = 1500
+# Data read by a tool and longer than this is replaced with a stub once the model has
+# read it
+TOOL_RESULT_STUB_THRESHOLD = int(os.getenv("FLO_TOOL_RESULT_STUB_THRESHOLD", 600))
+TOTAL_FIELDS = ("amount", "price", "monthly_cost", "monthly_payment", "total_amount")
+
+SUMMARY_PREFIX = "Summary of the earlier conversation:"
+SUMMARY_PROMPT = """You maintain a running summary of a conversation between a user and Flo, a personal finance assistant.
+Update the summary with the new messages below. Keep every fact that may matter later: amounts, dates, accounts, goals, decisions, and open questions. Drop greetings and tool chatter. Respond ONLY with the updated summary.
+
+<summary>
+{summary}
+</summary>
+
+<new_messages>
+{messages}
+</new_messages>"""
+
+
+def _after_cursor(messages: list[AnyMessage], cursor: str | None) -> list[AnyMessage]:
+    """Return the messages that are not covered by the summary yet"""
+    if cursor:
+        for index, message in enumerate(messages):
+            if message.id == cursor:
+                return messages[index + 1 :]
+
+    return messages
+
+
+def _parse_tool_result(content: Any) -> Any:
+    """Recover the structure of a tool result serialized by the tool node"""
+    if not isinstance(content, str):
+        return None
+    try:
+        return json.loads(content)
+    except ValueError:
+        pass
+    try:
+        return ast.literal_eval(content)
+    except (ValueError, SyntaxError):
+        return None
+
+
+def _number(value: Any) -> float | None:
+    """Extract the number from values such as 12.5, '12.50' or 'USD 12.50'"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if isinstance(value, str):
+        match = re.search(r"-?\d[\d,]*(?:\.\d+)?", value)
+        if match:
+            return float(match.group().replace(",", ""))
+    return None
+
+
+def _digest(payload: Any, path: str = "") -> tuple[dict, dict]:
+    """Count the rows of every list in a tool result and total their money fields"""
+    rows, totals = {}, {}
+    if isinstance(payload, dict):
+        for key, value in payload.items():
+            nested_rows, nested_totals = _digest(
+                value, f"{path}.{key}" if path else key
+            )
+            rows.update(nested_rows)
+            totals.update(nested_totals)
+    elif isinstance(payload, list) and path:
+        rows[path] = len(payload)
+        for field in TOTAL_FIELDS:
+            values = [
+                _number(row.get(field)) for row in payload if isinstance(row, dict)
+            ]
+            values = [value for value in values if value is not None]
+            if values:
+                totals[f"{path}.{field}"] = round(sum(values), 2)
+
+    return rows, totals
+
+
+def stub_tool_result(message: ToolMessage, args: dict | None = None) -> ToolMessage:
+    """Replace a bulky tool result with its name, arguments, row counts and totals"""
+    payload = _parse_tool_result(message.content)
+    stub: dict[str, Any] = {"tool": message.name, "args": args or {}}
+
+    if isinstance(payload, dict):
+        # Short scalar fields (status, summary, net worth...) are kept as they are
+        stub.update(
+            {
+                key: value
+                for key, value in payload.items()
+                if isinstance(value, (str, int, float, bool)) and len(str(value)) <= 200
+            }
+        )
+    rows, totals = _digest(payload)
+    if rows:
+        stub["rows"] = rows
+    if totals:
+        stub["totals"] = totals
+    stub["note"] = (
+        "Full result omitted after it was used. Call the tool again if details are needed."
+    )
+
+    return message.model_copy(
+        update={"content": json.dumps(stub, ensure_ascii=False, default=str)}
+    )
+
+
+def compact_tool_results(messages: list[AnyMessage]) -> list[AnyMessage]:
+    """
+    Stub out the bulky tool results that a later model response has already consumed.
+    The graph state keeps the full payloads, only the copy sent to the model shrinks.
+
+    Only results of data tools (those with domains in the tool registry) are stubbed:
+    task instructions and the specialists' answers are still followed after the next
+    model call.
+    """
+    tool_args, compacted = {}, []
+    last_ai = max(
+        (i for i, message in enumerate(messages) if isinstance(message, AIMessage)),
+        default=-1,
+    )
+
+    for index, message in enumerate(messages):
+        if isinstance(message, AIMessage):
+            tool_args.update({call["id"]: call["args"] for call in message.tool_calls})
+        elif (
+            isinstance(message, ToolMessage)
+            and index < last_ai
+            and tool_domains(message.name)
+            and len(str(message.content)) > TOOL_RESULT_STUB_THRESHOLD
+        ):
+            message = stub_tool_result(message, tool_args.get(message.tool_call_id))
+        compacted.append(message)
+
+    return compacted
+
+
+def context_window(
+    messages: list[AnyMessage], summary: str, cursor: str | None
+) -> list[AnyMessage]:
+    """Build the messages sent to the model: the summary, then the recent turns"""
+    recent = compact_tool_results(_after_cursor(messages, cursor))
+    if not summary or len(recent) == len(messages):
+        return recent
+
+    return [HumanMessage(content=f"{SUMMARY_PREFIX}\n{summary}")] + recent
+
+
+async def update_summary(
+    model: Runnable,
+    messages: list[AnyMessage],
+    summary: str,
+    cursor: str | None,
+    reserved: int = SYSTEM_PROMPT_RESERVE,
+    budget: int = CONTEXT_TOKEN_BUDGET,
+    agent: str | None = None,
+    usage: dict | None = None,
+) -> dict[str, Any] | None:
+    """
+    Fold the oldest turns into the rolling summary when the context exceeds the budget.
+
+    Only the messages between the summary cursor and the new cut point are sent to the
+    model, so each call costs one turn's worth of tokens instead of the whole history.
+
+    The summary call is counted in `usage` under `agent` when an agent is given.
+
+    Returns:
+        dict: The state update with the new summary and cursor, or None if the context
+              still fits. When the model writes no summary, only its usage is updated.
+    """
+    recent = compact_tool_results(_after_cursor(messages, cursor))
+    window = context_window(messages, summary, cursor)
+    if reserved + count_tokens_approximately(window) <= budget:
+        return None
+
+    # Cut before a user message, or inside a long turn before a model response that
+    # follows tool results, so no tool result is separated from its tool call
+    target = budget * CONTEXT_KEEP_RATIO - reserved
+    used, cut = 0, None
+    for index in range(len(recent) - 1, 0, -1):
+        used += count_tokens_approximately([recent[index]])
+        if used > target and cut is not None:
+            break
+        if isinstance(recent[index], HumanMessage) or (
+            isinstance(recent[index], AIMessage)
+            and isinstance(recent[index - 1], ToolMessage)
+        ):
+            cut = index
+
+    if not cut:
+        return None
+
+    response = await model.ainvoke(
+        [
+            HumanMessage(
+                content=SUMMARY_PROMPT.format(
+                    summary=summary or "(empty)",
+                    messages=get_buffer_string(recent[:cut]),
+                )
+            )
+        ],
+        config={"tags": [TAG_NOSTREAM]},
+    )
+
+    update = {}
+    if agent and (usage := add_usage(usage, agent, response)):
+        update["usage"] = usage
+    if not response.text.strip():
+        # Keep the old summary and cursor, the turns are summarized on the next call
+        logger.warning("The summary model answered without text, summary not updated")
+        return update or None
+
+    update.update(
+        {"context_summary": response.text, "summary_cursor": recent[cut - 1].id}
+    )
+    return update
+
+
+class ContextWindowMiddleware(AgentMiddleware):
+    """
+    Keep each model call under a token budget.
+
+    The system prompt and the most recent turns are sent verbatim, while older turns are
+    replaced with a rolling summary that is kept in the graph state and extended
+    incrementally as the conversation grows.
+
+    The system prompt is the agent's `prompt` rendered for the user, with the inline
+    task instruction; it is sized for every call, since the middleware is shared by
+    all the turns running at once. Without a `prompt`, `SYSTEM_PROMPT_RESERVE` is used.
+    """
+
+    def __init__(
+        self,
+        model: Runnable,
+        budget: int = CONTEXT_TOKEN_BUDGET,
+        agent: str | None = None,
+        prompt: Any = None,
+    ) -> None:
+        super().__init__()
+        self.model = model
+        self.budget = budget
+        self.agent = agent
+        self.prompt = prompt
+
+    def reserved(self, state: dict) -> int:
+        """Tokens of the system prompt the next model call will be sent"""
+        if self.prompt is None or self.agent is None:
+            return SYSTEM_PROMPT_RESERVE
+
+        rendered = render_prompt(
+            self.agent,
+            self.prompt,
+            state.get("user_name", "User"),
+            state.get("user_language", "English"),
+            state.get("user_currency", "USD"),
+        )
+        instruction = inline_instruction(self.agent, state["messages"])
+        return count_tokens_approximately(
+            [SystemMessage(content=rendered[0].content + instruction)]
+        )
+
+    async def abefore_model(self, state: dict, runtime: Any) -> dict[str, Any] | None:
+        return await update_summary(
+            self.model,
+            state["messages"],
+            state.get("context_summary", ""),
+            state.get("summary_cursor"),
+            reserved=self.reserved(state),
+            budget=context_budget(self.budget, state.get("usage")),
+            agent=self.agent,
+            usage=state.get("usage"),
+        )
+
+    async def awrap_model_call(self, request: ModelRequest, handler) -> ModelResponse:
+        return await handler(
+            request.override(
+                messages=context_window(
+                    request.messages,
+                    request.state.get("context_summary", ""),
+                    request.state.get("summary_cursor"),
+                )
+            )
+        )
@@ -0,0 +1,115 @@
+import asyncio
+import os
+import threading
+from typing import Any, Callable
+
+from langchain.agents.middleware import AgentMiddleware
+from langchain_core.messages import AIMessage, ToolMessage
+
+from src.tools.registry import tools_conflict
+
+# Tool calls of one model response that may run at the same time
+TOOL_CONCURRENCY = int(os.getenv("FLO_TOOL_CONCURRENCY", 4))
+
+
+def _pending_calls(state) -> list[dict]:
+    """Tool calls of the last model response that have no result yet, in order"""
+    messages = state["messages"] if isinstance(state, dict) else state.messages
+    for index in range(len(messages) - 1, -1, -1):
+        if isinstance(messages[index], AIMessage):
+            answered = {
+                message.tool_call_id
+                for message in messages[index + 1 :]
+                if isinstance(message, ToolMessage)
+            }
+            return [
+                call
+                for call in messages[index].tool_calls
+                if call["id"] not in answered
+            ]
+
+    return []
+
+
+class _Step:
+    """The pending tool calls of one model response, and which of them finished"""
+
+    def __init__(self, calls: list[dict], event: Callable, semaphore: Callable) -> None:
+        self.calls = calls
+        self.index = {call["id"]: index for index, call in enumerate(calls)}
+        self.done = [event() for _ in calls]
+        self.slots = semaphore(TOOL_CONCURRENCY)
+        self.remaining = len(calls)
+
+    def blockers(self, index: int) -> list[Any]:
+        """Events of the earlier calls that the call at `index` has to wait for"""
+        name = self.calls[index]["name"]
+        return [
+            self.done[earlier]
+            for earlier in range(index)
+            if tools_conflict(self.calls[earlier]["name"], name)
+        ]
+
+
+class ToolSchedulerMiddleware(AgentMiddleware):
+    """
+    Run the tool calls of one model response concurrently, writes in order.
+
+    Every tool call of a response is its own graph task, so they all start at once.
+    Calls that touch the same data are put back in the order the model made them,
+    using the access and domains declared in the tool registry: writes run one after
+    another, and a read waits for the earlier writes to its domains (and a write for
+    the earlier reads). At most `TOOL_CONCURRENCY` calls of a response run at a time.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.lock = threading.Lock()
+        self.steps: dict[tuple[str, ...], _Step] = {}
+
+    def _join(self, request, event: Callable, semaphore: Callable):
+        calls = _pending_calls(request.state)
+        key = tuple(call["id"] for call in calls)
+        if request.tool_call.get("id") not in key:
+            return None, None
+
+        with self.lock:
+            step = self.steps.get(key)
+            if step is None:
+                step = self.steps[key] = _Step(calls, event, semaphore)
+        return key, step
+
+    def _leave(self, key: tuple[str, ...], step: _Step, index: int) -> None:
+        step.done[index].set()
+        with self.lock:
+            step.remaining -= 1
+            if not step.remaining:
+                self.steps.pop(key, None)
+
+    def wrap_tool_call(self, request, handler):
+        key, step = self._join(request, threading.Event, threading.BoundedSemaphore)
+        if step is None:
+            return handler(request)
+
+        index = step.index[request.tool_call["id"]]
+        try:
+            for done in step.blockers(index):
+                done.wait()
+            with step.slots:
+                return handler(request)
+        finally:
+            self._leave(key, step, index)
+
+    async def awrap_tool_call(self, request, handler):
+        key, step = self._join(request, asyncio.Event, asyncio.Semaphore)
+        if step is None:
+            return await handler(request)
+
+        index = step.index[request.tool_call["id"]]
+        try:
+            for done in step.blockers(index):
+                await done.wait()
+            async with step.slots:
+                return await handler(request)
+        finally:
+            self._leave(key, step, index)
@@ -0,0 +1,206 @@
+import json
+import logging
+import math
+import os
+import re
+import threading
+from collections import defaultdict
+
+from langchain.agents.middleware import AgentMiddleware, ModelRequest, ModelResponse
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.tools import BaseTool
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from src.tools.registry import TOOL_REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# "on" sends the selected tools, "measure" sends them all but logs what selecting
+# would save, "off" does neither
+TOOL_SELECTION = os.getenv("FLO_TOOL_SELECTION", "measure").lower()
+
+# Data domains each specialist is responsible for, kept whenever a request names fewer
+# than two domains, since one keyword says little about what the model will need
+AGENT_DOMAINS = {
+    "quant": ("transactions", "finance"),
+    "capitalist": ("liabilities", "investments"),
+    "steward": ("wishlist",),
+    "strategist": ("goals",),
+}
+
+# Words that show a request needs the tools of a data domain (see the tool registry)
+DOMAIN_KEYWORDS = {
+    "transactions": [
+        r"\b(spent|spend|spending|paid|pay|bought|expenses?|costs?)\b",
+        r"\b(income|salary|paycheck|earned|received)\b",
+        r"\btransactions?\b",
+    ],
+    "finance": [
+        r"\b(balance|budget|budgets|money|cash)\b",
+        r"\b(spent|spend|spending|paid|expenses?|income|salary|afford)\b",
+    ],
+    "liabilities": [
+        r"\b(debts?|loans?|mortgage|credit card|owe|bills?)\b",
+        r"\b(installments?|bnpl|subscriptions?)\b",
+        r"\b(net worth|afford)\b",
+    ],
+    "investments": [
+        r"\b(invest|investments?|stocks?|shares|crypto|etf|portfolio|assets?)\b",
+        r"\b(fixed deposits?|bonds?|net worth)\b",
+    ],
+    "wishlist": [
+        r"\bwish ?list\b",
+        r"\b(buy|bought|purchased?|afford|want)\b",
+        r"\b(done|got it|cancel|cancell?ed|remove|removed)\b",
+    ],
+    "goals": [
+        r"\b(goals?|target|retire|retirement|afford)\b",
+        r"\b(save|saving|savings)\b",
+    ],
+}
+DOMAIN_PATTERNS = {
+    domain: [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
+    for domain, patterns in DOMAIN_KEYWORDS.items()
+}
+
+
+def _tool_name(tool: BaseTool | dict) -> str:
+    return tool.name if isinstance(tool, BaseTool) else tool.get("name", "")
+
+
+def request_domains(text: str) -> set[str]:
+    return {
+        domain
+        for domain, patterns in DOMAIN_PATTERNS.items()
+        if any(pattern.search(text) for pattern in patterns)
+    }
+
+
+def select_tools(
+    tools: list[BaseTool | dict], messages: list, own_domains: tuple[str, ...] = ()
+) -> list[BaseTool | dict]:
+    """
+    The tools a model call needs for the latest request.
+
+    Tools without a data domain (handoffs, time, instructions) are always kept, and so
+    are the tools already called since the user's last message, so a tool loop can go
+    on. Of the others, only those touching a domain the request mentions are kept, or
+    one of the agent's `own_domains` when the request mentions a single domain. When
+    the request mentions none, every tool is kept.
+    """
+    start = max(
+        (i for i, message in enumerate(messages) if isinstance(message, HumanMessage)),
+        default=0,
+    )
+    domains = request_domains(messages[start].text) if messages else set()
+    if not domains:
+        return tools
+    if len(domains) == 1:
+        domains.update(own_domains)
+
+    called = {
+        call["name"]
+        for message in messages[start:]
+        if isinstance(message, AIMessage)
+        for call in message.tool_calls
+    }
+
+    selected = []
+    for tool in tools:
+        name = _tool_name(tool)
+        info = TOOL_REGISTRY.get(name)
+        if (
+            info is None
+            or not info.domains
+            or name in called
+            or domains.intersection(info.domains)
+        ):
+            selected.append(tool)
+    return selected
+
+
+class ToolSelectionStats:
+    """Schema tokens sent to each agent's model, with and without tool selection"""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.schema_tokens: dict[str, int] = {}
+        self.agents: dict[str, dict[str, int]] = defaultdict(
+            lambda: {"calls": 0, "tools": 0, "selected": 0, "tokens": 0, "sent": 0}
+        )
+
+    def tokens(self, tool: BaseTool | dict) -> int:
+        """Approximate tokens of a tool's JSON schema, about 4 characters each"""
+        name = _tool_name(tool)
+        if name not in self.schema_tokens:
+            schema = json.dumps(convert_to_openai_tool(tool))
+            self.schema_tokens[name] = math.ceil(len(schema) / 4)
+        return self.schema_tokens[name]
+
+    def record(self, agent: str, tools: list, selected: list) -> tuple[int, int]:
+        total = sum(self.tokens(tool) for tool in tools)
+        sent = sum(self.tokens(tool) for tool in selected)
+        with self.lock:
+            row = self.agents[agent]
+            row["calls"] += 1
+            row["tools"] += len(tools)
+            row["selected"] += len(selected)
+            row["tokens"] += total
+            row["sent"] += sent
+        return total, sent
+
+    def report(self) -> dict[str, dict[str, float]]:
+        """Per agent: model calls, mean tools and schema tokens, and the share saved"""
+        with self.lock:
+            return {
+                agent: {
+                    "calls": row["calls"],
+                    "tools": round(row["tools"] / row["calls"], 1),
+                    "selected": round(row["selected"] / row["calls"], 1),
+                    "tokens": round(row["tokens"] / row["calls"]),
+                    "sent": round(row["sent"] / row["calls"]),
+                    "saved": (
+                        round(1 - row["sent"] / row["tokens"], 3)
+                        if row["tokens"]
+                        else 0.0
+                    ),
+                }
+                for agent, row in self.agents.items()
+            }
+
+
+tool_selection = ToolSelectionStats()
+
+
+class ToolSelectionMiddleware(AgentMiddleware):
+    """
+    Send the model only the tools the current request can need.
+
+    Every tool's JSON schema is part of the input of every model call. The request's
+    wording picks the data domains it is about (see `select_tools`), and the tools of
+    other domains are left out of the call; the tool node still has them all. By
+    default (FLO_TOOL_SELECTION=measure) every tool is still sent, and the schema
+    tokens the selection would have saved are logged and summed per agent in
+    `tool_selection`; FLO_TOOL_SELECTION=on sends only the selected tools.
+    """
+
+    def __init__(self, agent: str, mode: str = TOOL_SELECTION) -> None:
+        super().__init__()
+        self.agent = agent
+        self.mode = mode
+        self.domains = AGENT_DOMAINS.get(agent, ())
+
+    async def awrap_model_call(self, request: ModelRequest, handler) -> ModelResponse:
+        if self.mode not in ("on", "measure"):
+            return await handler(request)
+
+        selected = select_tools(request.tools, request.messages, self.domains)
+        total, sent = tool_selection.record(self.agent, request.tools, selected)
+        if self.mode == "measure":
+            logger.info(
+                f"Tool selection for {self.agent}: {len(selected)} of "
+                f"{len(request.tools)} tools, {sent} of {total} schema tokens"
+            )
+            return await handler(request)
+
+        return await handler(request.override(tools=selected))
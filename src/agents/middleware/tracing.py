@@ -0,0 +1,58 @@
+from langchain.agents.middleware import AgentMiddleware
+from langchain_core.messages import ToolMessage
+
+from src.config.queries import query_log
+from src.config.tracing import args_hash, tracer
+
+
+def _span_attributes(request) -> dict:
+    call = request.tool_call
+    return {
+        "gen_ai.operation.name": "execute_tool",
+        "gen_ai.tool.name": call["name"],
+        "gen_ai.tool.call.id": call.get("id"),
+        "flo.tool.args_hash": args_hash(call.get("args", {})),
+    }
+
+
+def _record_status(span, result) -> None:
+    if (
+        span is not None
+        and isinstance(result, ToolMessage)
+        and result.status == "error"
+    ):
+        span.error = str(result.content)[:200]
+
+
+class TracingMiddleware(AgentMiddleware):
+    """
+    Record a span per tool call of the traced turn.
+
+    Queries the tool runs become child spans, and their count and the rows they touched
+    are summed on the tool span. Every statement is also attributed to the tool in
+    `query_log`, traced or not.
+    """
+
+    def wrap_tool_call(self, request, handler):
+        name = request.tool_call["name"]
+        with (
+            query_log.tool(name),
+            tracer.span(
+                f"execute_tool {name}", "tool", **_span_attributes(request)
+            ) as span,
+        ):
+            result = handler(request)
+            _record_status(span, result)
+            return result
+
+    async def awrap_tool_call(self, request, handler):
+        name = request.tool_call["name"]
+        with (
+            query_log.tool(name),
+            tracer.span(
+                f"execute_tool {name}", "tool", **_span_attributes(request)
+            ) as span,
+        ):
+            result = await handler(request)
+            _record_status(span, result)
+            return result
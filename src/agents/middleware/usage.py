@@ -0,0 +1,36 @@
+from typing import Any
+
+from langchain.agents.middleware import AgentMiddleware, hook_config
+from langchain_core.messages import AIMessage
+
+from src.config.usage import BUDGET_EXHAUSTED_MESSAGE, add_usage, budget_exhausted
+
+
+class UsageMiddleware(AgentMiddleware):
+    """
+    Count the tokens and estimated cost of every model call of the agent.
+
+    The counters live in the `usage` state channel, so they are checkpointed with the
+    thread. Once the thread has used its token budget the model is not called anymore
+    and the agent answers with a refusal, which also ends a runaway tool loop.
+    """
+
+    def __init__(self, agent: str) -> None:
+        super().__init__()
+        self.agent = agent
+
+    @hook_config(can_jump_to=["end"])
+    async def abefore_model(self, state: dict, runtime: Any) -> dict[str, Any] | None:
+        if budget_exhausted(state.get("usage")):
+            return {
+                "messages": [AIMessage(content=BUDGET_EXHAUSTED_MESSAGE)],
+                "jump_to": "end",
+            }
+        return None
+
+    async def aafter_model(self, state: dict, runtime: Any) -> dict[str, Any] | None:
+        message = state["messages"][-1]
+        if not isinstance(message, AIMessage):
+            return None
+        usage = add_usage(state.get("usage"), self.agent, message)
+        return {"usage": usage} if usage else None
@@ -0,0 +1,41 @@
+from langchain.agents.middleware import AgentMiddleware
+
+from src.config.users import current_user
+
+
+def _user_id(state) -> str | None:
+    if isinstance(state, dict):
+        return state.get("user_id")
+    return getattr(state, "user_id", None)
+
+
+class UserContextMiddleware(AgentMiddleware):
+    """
+    Point data access at the user in the graph state while a tool runs.
+
+    Tools open their database session and profile through `current_user`, so setting it
+    from the state keeps every tool call inside its user's data, however the graph was
+    invoked. Sessions without a user id keep the local user's data.
+    """
+
+    def wrap_tool_call(self, request, handler):
+        user_id = _user_id(request.state)
+        if not user_id:
+            return handler(request)
+
+        token = current_user.set(user_id)
+        try:
+            return handler(request)
+        finally:
+            current_user.reset(token)
+
+    async def awrap_tool_call(self, request, handler):
+        user_id = _user_id(request.state)
+        if not user_id:
+            return await handler(request)
+
+        token = current_user.set(user_id)
+        try:
+            return await handler(request)
+        finally:
+            current_user.reset(token)
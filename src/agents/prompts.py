@@ -0,0 +1,72 @@
+import hashlib
+from functools import lru_cache
+from typing import Any
+
+from langchain_core.messages import BaseMessage
+
+PROMPT_CACHE_SIZE = 256
+
+# Templates by version. A version names one template's content, so entries never change
+_templates: dict[str, Any] = {}
+# Version of each prompt object, with the object itself so its id is never reused
+_versions: dict[int, tuple[Any, str]] = {}
+
+
+def prompt_version(prompt: Any) -> str:
+    """Identify a pulled prompt by its LangSmith commit, or by a hash of its template"""
+    cached = _versions.get(id(prompt))
+    if cached is not None and cached[0] is prompt:
+        return cached[1]
+
+    metadata = getattr(prompt.first, "metadata", None) or {}
+    version = (
+        metadata.get("lc_hub_commit_hash")
+        or hashlib.sha1(repr(prompt.first).encode()).hexdigest()
+    )
+    _templates.setdefault(version, prompt.first)
+    _versions[id(prompt)] = (prompt, version)
+    return version
+
+
+@lru_cache(maxsize=PROMPT_CACHE_SIZE)
+def _render(
+    agent: str, version: str, user_name: str, user_language: str, user_currency: str
+) -> tuple[BaseMessage, ...]:
+    return tuple(
+        _templates[version]
+        .invoke(
+            {
+                "user_currency": user_currency,
+                "user_language": user_language,
+                "user_name": user_name,
+            }
+        )
+        .messages
+    )
+
+
+def render_prompt(
+    agent: str, prompt: Any, user_name: str, user_language: str, user_currency: str
+) -> list[BaseMessage]:
+    """
+    Render an agent's prompt for a user, reusing earlier renders.
+
+    Renders are shared by all agents and keyed by (agent, inputs, prompt version), so
+    the same user always gets a byte-identical prompt prefix. The version is looked up
+    from the prompt given, so a reloaded prompt is rendered from its own template.
+
+    Args:
+        agent (str): Agent name, e.g. 'quant'.
+        prompt: The prompt pulled from LangSmith (`prompt.first` is the template).
+        user_name (str): The user's name.
+        user_language (str): The user's language.
+        user_currency (str): The user's currency.
+
+    Returns:
+        list: The rendered prompt messages.
+    """
+    rendered = _render(
+        agent, prompt_version(prompt), user_name, user_language, user_currency
+    )
+    # Copies, so no caller can change the messages other callers get
+    return [message.model_copy() for message in rendered]
@@ -2,6 +2,17 @@ from dotenv import load_dotenv
 from langchain.agents import create_agent
 from langchain.agents.middleware import ModelRequest, dynamic_prompt
 
+from src.agents.instructions import inline_instruction
+from src.agents.middleware import (
+    CacheInvalidationMiddleware,
+    ContextWindowMiddleware,
+    ToolSchedulerMiddleware,
+    ToolSelectionMiddleware,
+    TracingMiddleware,
+    UsageMiddleware,
+    UserContextMiddleware,
+)
+from src.agents.prompts import render_prompt
 from src.agents.state import State
 from src.config.agents import QUANT
 from src.tools import (
@@ -21,17 +32,8 @@ def personalized_prompt(request: ModelRequest) -> str:
     user_language = request.state.get("user_language", "English")
     user_currency = request.state.get("user_currency", "USD")
 
-    return (
-        QUANT.first.invoke(
-            {
-                "user_currency": user_currency,
-                "user_language": user_language,
-                "user_name": user_name,
-            }
-        )
-        .messages[0]
-        .content
-    )
+    messages = render_prompt("quant", QUANT, user_name, user_language, user_currency)
+    return messages[0].content + inline_instruction("quant", request.messages)
 
 
 quant = create_agent(
@@ -53,5 +55,14 @@ quant = create_agent(
         update_budget,
     ],
     state_schema=State,
-    middleware=[personalized_prompt],
+    middleware=[
+        personalized_prompt,
+        UsageMiddleware("quant"),
+        ContextWindowMiddleware(QUANT.last.bound, agent="quant", prompt=QUANT),
+        ToolSelectionMiddleware("quant"),
+        ToolSchedulerMiddleware(),
+        CacheInvalidationMiddleware(),
+        UserContextMiddleware(),
+        TracingMiddleware(),
+    ],
 )
@@ -1 +1 @@
-from .agent import flo
+from .agent import flo, repair_thread
@@ -1,47 +1,111 @@
-from langgraph.checkpoint.memory import InMemorySaver
+from dataclasses import replace
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import END, START
 from langgraph.graph.state import StateGraph
 from langgraph.prebuilt import ToolNode
-from langgraph.store.memory import InMemoryStore
+from langgraph.types import Send
 from typing_extensions import Literal
 
 # Specialist agents
 from src.agents.capitalist import capitalist
+from src.agents.middleware import context_window, update_summary
+from src.agents.middleware.context import CONTEXT_TOKEN_BUDGET
+from src.agents.prompts import render_prompt
 from src.agents.quant import quant
+from src.agents.root.consult import (
+    SPECIALISTS,
+    consult,
+    consult_call,
+    fan_out,
+    gather,
+)
+from src.agents.router import intent_router
 from src.agents.state import State
 from src.agents.steward import steward
 from src.agents.strategist import strategist
 from src.config.agents import FLO
-from src.tools import handoff_to_agent
-
-checkpointer = InMemorySaver()
-store = InMemoryStore()
+from src.config.checkpoint import checkpointer
+from src.config.store import store
+from src.config.tracing import tracer
+from src.config.usage import (
+    BUDGET_EXHAUSTED_MESSAGE,
+    add_usage,
+    budget_exhausted,
+    context_budget,
+)
+from src.tools import consult_specialists, handoff_to_agent
 
 tools = [handoff_to_agent]
+# Calls to consult_specialists are fanned out by the graph instead of the tool node
+model = FLO.last.bound.bind_tools(
+    [*tools, consult_specialists],
+    **{key: value for key, value in FLO.last.kwargs.items() if key != "tools"},
+)
 
 
 async def root_agent(state: State):
     """LLM decides whether to call a tool or not"""
+    if budget_exhausted(state.usage):
+        return {"messages": [AIMessage(content=BUDGET_EXHAUSTED_MESSAGE)]}
+
+    system_messages = render_prompt(
+        "root", FLO, state.user_name, state.user_language, state.user_currency
+    )
+
+    summary = await update_summary(
+        # Without the tools, so the summary is always written as text
+        FLO.last.bound,
+        state.messages,
+        state.context_summary,
+        state.summary_cursor,
+        reserved=count_tokens_approximately(system_messages),
+        budget=context_budget(CONTEXT_TOKEN_BUDGET, state.usage),
+        agent="root",
+        usage=state.usage,
+    )
+    summary = summary or {}
+
+    response = await model.ainvoke(
+        system_messages
+        + context_window(
+            state.messages,
+            summary.get("context_summary", state.context_summary),
+            summary.get("summary_cursor", state.summary_cursor),
+        )
+    )
+    usage = add_usage(summary.get("usage", state.usage), "root", response)
+    learn_route(state, response)
 
     return {
-        "messages": [
-            await FLO.last.ainvoke(
-                FLO.first.invoke(
-                    {
-                        "user_currency": state.user_currency,
-                        "user_language": state.user_language,
-                        "user_name": state.user_name,
-                    }
-                ).messages
-                + state.messages
-            )
-        ],
+        "messages": [response],
+        **summary,
+        **({"usage": usage} if usage else {}),
     }
 
 
-def entry_routing(
+def learn_route(state: State, response: AIMessage) -> None:
+    """Teach the local intent router which specialist the root LLM picked"""
+    agent = next(
+        (
+            call["args"].get("agent_name")
+            for call in response.tool_calls
+            if call["name"] == "transfer_to_agent"
+        ),
+        None,
+    )
+    request = next(
+        (m for m in reversed(state.messages) if isinstance(m, HumanMessage)), None
+    )
+    if agent in SPECIALISTS and request:
+        intent_router.record(request.text, agent)
+
+
+def select_agent(
     state: State,
-) -> Literal["quant", "capitalist", "strategist", "root_agent"]:
+) -> Literal["quant", "capitalist", "strategist", "steward", "root_agent"]:
     if state.active_agent == "quant":
         return "quant"
     elif state.active_agent == "capitalist":
@@ -50,14 +114,39 @@ def entry_routing(
         return "strategist"
     elif state.active_agent == "steward":
         return "steward"
+    elif (
+        isinstance(state.messages[-1], HumanMessage)
+        and (agent := intent_router.route(state.messages[-1].text)) is not None
+    ):
+        # Unambiguous request, skip the root LLM hop
+        return agent
     else:
         return "root_agent"
 
 
-def tool_condition(state: State) -> Literal["tool_node", END]:
+def entry_routing(
+    state: State,
+) -> Literal["quant", "capitalist", "strategist", "steward", "root_agent"] | Send:
+    with tracer.span(
+        "route", "route", **{"flo.active_agent": state.active_agent}
+    ) as span:
+        agent = select_agent(state)
+        if span is not None:
+            span.attributes["flo.route.agent"] = agent
+        if agent != "root_agent" and agent != state.active_agent:
+            # Routed straight to a specialist, which becomes the active agent just as
+            # after a handoff by the root LLM
+            return Send(agent, replace(state, active_agent=agent))
+        return agent
+
+
+def tool_condition(state: State) -> Literal["tool_node", "gather", END] | list[Send]:
     """Decide if we should continue the loop or stop based upon whether the LLM made a tool call"""
     last_message = state.messages[-1]
 
+    if consult_call(state):
+        # Specialists answer in parallel, `gather` merges their answers
+        return fan_out(state) or "gather"
     if last_message.tool_calls:
         return "tool_node"
 
@@ -71,10 +160,45 @@ graph.add_node("quant", quant)
 graph.add_node("capitalist", capitalist)
 graph.add_node("strategist", strategist)
 graph.add_node("steward", steward)
+graph.add_node("consult", consult)
+graph.add_node("gather", gather)
 
 graph.add_conditional_edges(
     START, entry_routing, ["quant", "capitalist", "strategist", "steward", "root_agent"]
 )
-graph.add_conditional_edges("root_agent", tool_condition, ["tool_node", END])
+graph.add_conditional_edges(
+    "root_agent", tool_condition, ["tool_node", "consult", "gather", END]
+)
+graph.add_edge("consult", "gather")
+graph.add_edge("gather", "root_agent")
 
 flo = graph.compile(checkpointer=checkpointer, store=store)
+
+
+async def repair_thread(config: RunnableConfig) -> None:
+    """
+    Close the tool calls a cancelled turn left unanswered.
+
+    The last checkpoint of a cancelled turn may hold an AI message whose tool calls never
+    ran. Models reject such histories, so each one gets a ToolMessage saying the call
+    was cancelled. Specialists only write to the parent graph when they finish, so the
+    open calls are always the root agent's.
+    """
+    snapshot = await flo.aget_state(config)
+    messages = snapshot.values.get("messages", [])
+
+    answered = {msg.tool_call_id for msg in messages if isinstance(msg, ToolMessage)}
+    missing = [
+        ToolMessage(
+            content="Cancelled by the user before it ran.",
+            tool_call_id=call["id"],
+            name=call["name"],
+            status="error",
+        )
+        for msg in messages
+        if isinstance(msg, AIMessage)
+        for call in msg.tool_calls
+        if call["id"] not in answered
+    ]
+    if missing:
+        await flo.aupdate_state(config, {"messages": missing}, as_node="tool_node")
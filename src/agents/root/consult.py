@@ -0,0 +1,168 @@
+import json
+import logging
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langgraph.config import get_config
+from langgraph.constants import TAG_HIDDEN, TAG_NOSTREAM
+from langgraph.errors import GraphBubbleUp, ParentCommand
+from langgraph.types import Send
+from typing_extensions import TypedDict
+
+from src.agents.capitalist import capitalist
+from src.agents.quant import quant
+from src.agents.state import State
+from src.agents.steward import steward
+from src.agents.strategist import strategist
+from src.config.usage import branch_budget
+
+logger = logging.getLogger(__name__)
+
+SPECIALISTS = {
+    "quant": quant,
+    "capitalist": capitalist,
+    "steward": steward,
+    "strategist": strategist,
+}
+PROFILE_FIELDS = ("user_id", "user_name", "user_language", "user_currency")
+
+
+class Consultation(TypedDict):
+    """One specialist's scoped question, sent to the `consult` node"""
+
+    agent: str
+    question: str
+    profile: dict
+    usage: dict
+    # Specialists consulted in parallel, who share the thread's token budget
+    branches: int
+
+
+def consult_call(state: State) -> dict | None:
+    """The `consult_specialists` call of the last root response, if it made one"""
+    message = state.messages[-1]
+    if not isinstance(message, AIMessage):
+        return None
+    return next(
+        (call for call in message.tool_calls if call["name"] == "consult_specialists"),
+        None,
+    )
+
+
+def fan_out(state: State) -> list[Send]:
+    """A task per consulted specialist, run in parallel by the `consult` node"""
+    questions = consult_call(state)["args"].get("questions") or {}
+    profile = {field: getattr(state, field) for field in PROFILE_FIELDS}
+    asked = {
+        agent: question
+        for agent, question in questions.items()
+        if agent in SPECIALISTS and question
+    }
+    return [
+        Send(
+            "consult",
+            Consultation(
+                agent=agent,
+                question=question,
+                profile=profile,
+                usage=state.usage,
+                branches=len(asked),
+            ),
+        )
+        for agent, question in asked.items()
+    ]
+
+
+async def consult(task: Consultation) -> dict:
+    """
+    Let one specialist answer its question in a state of its own.
+
+    The specialist starts from the question alone, without the thread's messages, and
+    its answer streams nowhere: only the merged answers reach the root agent. It gets
+    its share of the token budget left (see `branch_budget`), and if it fails, its
+    error is reported as its answer so the others' answers still reach the root agent.
+    """
+    agent = task["agent"]
+    # Neither its tokens nor its messages go to the client
+    config = {"tags": [TAG_NOSTREAM, TAG_HIDDEN]}
+    if budget := branch_budget(task["usage"], task["branches"]):
+        config["configurable"] = {
+            **get_config()["configurable"],
+            "token_budget": budget,
+        }
+    try:
+        result = await SPECIALISTS[agent].ainvoke(
+            {
+                "messages": [HumanMessage(content=task["question"])],
+                "active_agent": agent,
+                "usage": task["usage"],
+                **task["profile"],
+            },
+            config,
+        )
+    except ParentCommand:
+        # The specialist tried to hand the question to another agent
+        return {
+            "consultations": {
+                agent: {"status": "error", "error_message": "Handed off, no answer"}
+            }
+        }
+    except GraphBubbleUp:
+        raise
+    except Exception as e:
+        logger.error(f"Consulting {agent} failed: {e}")
+        return {
+            "consultations": {
+                agent: {"status": "error", "error_message": f"Failed to answer: {e}"}
+            }
+        }
+
+    answer = result["messages"][-1]
+    return {
+        "consultations": {
+            agent: {
+                "status": "success",
+                "question": task["question"],
+                "answer": answer.text,
+            }
+        },
+        "usage": result.get("usage", {}),
+    }
+
+
+def gather(state: State) -> dict:
+    """
+    Answer the `consult_specialists` call with the merged answers.
+
+    Specialists that were asked but did not answer (unknown names, empty questions) are
+    reported as errors, and any other tool call of the same response is closed as not
+    run, so the root agent gets a complete history to write its reply from.
+    """
+    call = consult_call(state)
+    questions = call["args"].get("questions") or {}
+    answers = {
+        agent: state.consultations.get(
+            agent, {"status": "error", "error_message": f"Unknown agent: {agent}"}
+        )
+        for agent in questions
+    }
+    if not answers:
+        answers = {"status": "error", "error_message": "No questions were given"}
+
+    messages = [
+        ToolMessage(
+            content=json.dumps(answers, ensure_ascii=False, default=str),
+            name="consult_specialists",
+            tool_call_id=call["id"],
+        )
+    ]
+    messages.extend(
+        ToolMessage(
+            content="Not run, specialists were consulted instead.",
+            name=other["name"],
+            tool_call_id=other["id"],
+            status="error",
+        )
+        for other in state.messages[-1].tool_calls
+        if other["id"] != call["id"]
+    )
+    return {"messages": messages, "consultations": None}
@@ -0,0 +1,201 @@
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import threading
+import uuid
+from collections import Counter, defaultdict, deque
+
+from src.config.directory import ROUTING_LOG_PATH
+
+logger = logging.getLogger(__name__)
+
+ROUTER_CONFIDENCE = float(os.getenv("FLO_ROUTER_CONFIDENCE", 0.85))
+ROUTER_MIN_SAMPLES = int(os.getenv("FLO_ROUTER_MIN_SAMPLES", 30))
+# Routing decisions learned from, older ones are forgotten and dropped from the log
+ROUTER_MAX_SAMPLES = int(os.getenv("FLO_ROUTER_MAX_SAMPLES", 5000))
+
+KEYWORD_RULES = {
+    "quant": [
+        r"\b(spent|spend|paid for|expense|expenses)\b",
+        r"\b(income|salary|paycheck|got paid)\b",
+        r"\b(budget|over budget|balance)\b",
+        r"\btransactions?\b",
+    ],
+    "capitalist": [
+        r"\b(debt|debts|loan|mortgage|credit card)\b",
+        r"\b(installment|installments|bnpl|subscription|subscriptions)\b",
+        r"\b(invest|investment|investments|stock|stocks|shares|crypto|etf|portfolio)\b",
+        r"\b(net worth|fixed deposit|bond|bonds)\b",
+    ],
+    "strategist": [
+        r"\b(goal|goals)\b",
+        r"\b(save|saving) (up )?for\b",
+        r"\b(retire|retirement)\b",
+    ],
+    "steward": [
+        r"\bwish ?list\b",
+        r"\bcan i afford\b",
+        r"\bshould i buy\b",
+    ],
+}
+
+
+def _tokens(text: str) -> list[str]:
+    return re.findall(r"[a-z0-9']+", text.lower())
+
+
+def _features(text: str) -> list[str]:
+    """Hashed words of a request, so the routing log never holds what users wrote"""
+    return [
+        hashlib.blake2b(token.encode(), digest_size=8).hexdigest()
+        for token in _tokens(text)
+    ]
+
+
+class IntentRouter:
+    """
+    Local router that sends unambiguous requests straight to a specialist.
+
+    Keyword rules decide when exactly one specialist matches. Otherwise a multinomial
+    Naive Bayes classifier, trained online from the routing decisions logged by the root
+    agent, decides when it is confident enough. Anything else is left to the root LLM.
+
+    Only the latest `max_samples` decisions are learned from. The log keeps them as
+    hashed words, and is compacted once it holds twice as many.
+    """
+
+    def __init__(
+        self, log_path: str = ROUTING_LOG_PATH, max_samples: int = ROUTER_MAX_SAMPLES
+    ) -> None:
+        self.log_path = log_path
+        self.max_samples = max_samples
+        self.lock = threading.Lock()
+        self.samples: deque[tuple[list[str], str]] = deque()
+        # Lines in the log, including those of forgotten decisions
+        self.logged = 0
+        self.agent_counts: Counter = Counter()
+        self.word_counts: dict[str, Counter] = defaultdict(Counter)
+        self.vocabulary: Counter = Counter()
+        self.rules = {
+            agent: [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
+            for agent, patterns in KEYWORD_RULES.items()
+        }
+        self._load()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.log_path):
+            return
+
+        rewrite = False
+        with open(self.log_path, "r") as file:
+            for line in file:
+                self.logged += 1
+                try:
+                    record = json.loads(line)
+                    if "text" in record:
+                        # Logged before words were hashed
+                        record["features"] = _features(record["text"])
+                        rewrite = True
+                    self._learn(record["features"], record["agent"])
+                except (ValueError, KeyError, TypeError):
+                    continue
+
+        if rewrite or self.logged > self.max_samples:
+            self._compact()
+
+    def _learn(self, features: list[str], agent: str) -> None:
+        self.samples.append((features, agent))
+        self.agent_counts[agent] += 1
+        self.word_counts[agent].update(features)
+        self.vocabulary.update(features)
+
+        while len(self.samples) > self.max_samples:
+            features, agent = self.samples.popleft()
+            self.agent_counts[agent] -= 1
+            self.word_counts[agent] -= Counter(features)
+            self.vocabulary -= Counter(features)
+            if self.agent_counts[agent] <= 0:
+                del self.agent_counts[agent]
+                del self.word_counts[agent]
+
+    def _compact(self) -> None:
+        """Rewrite the log with only the decisions still learned from"""
+        staging = f"{self.log_path}.{uuid.uuid4().hex}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+            with open(staging, "w") as file:
+                for features, agent in self.samples:
+                    file.write(
+                        json.dumps({"features": features, "agent": agent}) + "\n"
+                    )
+            os.replace(staging, self.log_path)
+            self.logged = len(self.samples)
+        except OSError as e:
+            logger.warning(f"Failed to compact the routing log: {e}")
+
+    def record(self, text: str, agent: str) -> None:
+        """Log a routing decision made by the root LLM and learn from it"""
+        features = _features(text)
+        with self.lock:
+            self._learn(features, agent)
+            if self.logged >= 2 * self.max_samples:
+                self._compact()
+                return
+
+            try:
+                os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+                with open(self.log_path, "a") as file:
+                    file.write(
+                        json.dumps({"features": features, "agent": agent}) + "\n"
+                    )
+                self.logged += 1
+            except OSError as e:
+                logger.warning(f"Failed to log routing decision: {e}")
+
+    def classify(self, text: str) -> tuple[str | None, float]:
+        """Return the most likely agent and its posterior probability"""
+        with self.lock:
+            total = sum(self.agent_counts.values())
+            if total < ROUTER_MIN_SAMPLES:
+                return None, 0.0
+
+            tokens = _features(text)
+            vocabulary = len(self.vocabulary) + 1
+            scores = {}
+            for agent, count in self.agent_counts.items():
+                words = self.word_counts[agent]
+                size = sum(words.values())
+                scores[agent] = math.log(count / total) + sum(
+                    math.log((words[token] + 1) / (size + vocabulary))
+                    for token in tokens
+                )
+
+        best = max(scores, key=scores.get)
+        normalizer = sum(math.exp(score - scores[best]) for score in scores.values())
+        return best, 1 / normalizer
+
+    def route(self, text: str) -> str | None:
+        """Return the specialist to send the request to, or None for the root LLM"""
+        matches = [
+            agent
+            for agent, patterns in self.rules.items()
+            if any(pattern.search(text) for pattern in patterns)
+        ]
+        if len(matches) == 1:
+            return matches[0]
+
+        agent, confidence = self.classify(text)
+        if (
+            agent
+            and confidence >= ROUTER_CONFIDENCE
+            and (not matches or agent in matches)
+        ):
+            return agent
+
+        return None
+
+
+intent_router = IntentRouter()
@@ -4,11 +4,27 @@ from langchain_core.messages import AnyMessage
 from langgraph.graph import add_messages
 from typing_extensions import Annotated
 
+from src.config.usage import merge_usage
+
+
+def merge_consultations(left: dict | None, right: dict | None) -> dict:
+    """Collect the answers of parallel specialists, None clears them"""
+    if right is None:
+        return {}
+    return {**(left or {}), **right}
+
 
 @dataclass
 class State:
     messages: Annotated[list[AnyMessage], add_messages]
+    user_id: str | None = field(default=None)
     user_name: str = field(default="User")
     user_language: str = field(default="English")
     user_currency: str = field(default="USD")
     active_agent: str = field(default="root")
+    context_summary: str = field(default="")
+    summary_cursor: str | None = field(default=None)
+    # Token and cost counters per agent, see `src.config.usage`
+    usage: Annotated[dict, merge_usage] = field(default_factory=dict)
+    # Answers of the specialists consulted in parallel, keyed by agent
+    consultations: Annotated[dict, merge_consultations] = field(default_factory=dict)
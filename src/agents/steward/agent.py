@@ -1,6 +1,17 @@
 from langchain.agents import create_agent
 from langchain.agents.middleware import ModelRequest, dynamic_prompt
 
+from src.agents.instructions import inline_instruction
+from src.agents.middleware import (
+    CacheInvalidationMiddleware,
+    ContextWindowMiddleware,
+    ToolSchedulerMiddleware,
+    ToolSelectionMiddleware,
+    TracingMiddleware,
+    UsageMiddleware,
+    UserContextMiddleware,
+)
+from src.agents.prompts import render_prompt
 from src.agents.state import State
 from src.config.agents import STEWARD
 from src.tools import (
@@ -21,17 +32,10 @@ def personalized_prompt(request: ModelRequest) -> str:
     user_language = request.state.get("user_language", "English")
     user_currency = request.state.get("user_currency", "USD")
 
-    return (
-        STEWARD.first.invoke(
-            {
-                "user_currency": user_currency,
-                "user_language": user_language,
-                "user_name": user_name,
-            }
-        )
-        .messages[0]
-        .content
+    messages = render_prompt(
+        "steward", STEWARD, user_name, user_language, user_currency
     )
+    return messages[0].content + inline_instruction("steward", request.messages)
 
 
 steward = create_agent(
@@ -44,9 +48,11 @@ steward = create_agent(
         check_available_instructions,
         handoff_to_agent,
         # Steward tools
+        assess_affordability,
         append_wishlist,
         update_wishlist_status,
         get_user_wishlist,
+        plan_wishlist_purchases,
         # Other tools
         check_balance,
         check_budget,
@@ -55,5 +61,14 @@ steward = create_agent(
         read_transactions,
     ],
     state_schema=State,
-    middleware=[personalized_prompt],
+    middleware=[
+        personalized_prompt,
+        UsageMiddleware("steward"),
+        ContextWindowMiddleware(STEWARD.last.bound, agent="steward", prompt=STEWARD),
+        ToolSelectionMiddleware("steward"),
+        ToolSchedulerMiddleware(),
+        CacheInvalidationMiddleware(),
+        UserContextMiddleware(),
+        TracingMiddleware(),
+    ],
 )
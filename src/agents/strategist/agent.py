@@ -1,6 +1,17 @@
 from langchain.agents import create_agent
 from langchain.agents.middleware import ModelRequest, dynamic_prompt
 
+from src.agents.instructions import inline_instruction
+from src.agents.middleware import (
+    CacheInvalidationMiddleware,
+    ContextWindowMiddleware,
+    ToolSchedulerMiddleware,
+    ToolSelectionMiddleware,
+    TracingMiddleware,
+    UsageMiddleware,
+    UserContextMiddleware,
+)
+from src.agents.prompts import render_prompt
 from src.agents.state import State
 from src.config.agents import STRATEGIST
 from src.tools.capitalist import get_user_investments, get_user_liabilities
@@ -20,17 +31,10 @@ def personalized_prompt(request: ModelRequest) -> str:
     user_language = request.state.get("user_language", "English")
     user_currency = request.state.get("user_currency", "USD")
 
-    return (
-        STRATEGIST.first.invoke(
-            {
-                "user_currency": user_currency,
-                "user_language": user_language,
-                "user_name": user_name,
-            }
-        )
-        .messages[0]
-        .content
+    messages = render_prompt(
+        "strategist", STRATEGIST, user_name, user_language, user_currency
     )
+    return messages[0].content + inline_instruction("strategist", request.messages)
 
 
 strategist = create_agent(
@@ -45,8 +49,20 @@ strategist = create_agent(
         # Strategist tools
         create_financial_goal,
         get_all_goals,
+        get_goals_progress,
         # Other tools
     ],
     state_schema=State,
-    middleware=[personalized_prompt],
+    middleware=[
+        personalized_prompt,
+        UsageMiddleware("strategist"),
+        ContextWindowMiddleware(
+            STRATEGIST.last.bound, agent="strategist", prompt=STRATEGIST
+        ),
+        ToolSelectionMiddleware("strategist"),
+        ToolSchedulerMiddleware(),
+        CacheInvalidationMiddleware(),
+        UserContextMiddleware(),
+        TracingMiddleware(),
+    ],
 )
@@ -0,0 +1,340 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from collections.abc import Sequence
+from typing import Any
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.outputs import ChatGeneration
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from src.tools.registry import is_write_tool, tool_domains
+
+from .directory import LLM_CACHE_PATH
+from .sqlite import SQLiteFile
+from .users import current_user
+
+logger = logging.getLogger(__name__)
+
+LLM_CACHE_ENABLED = os.getenv("FLO_LLM_CACHE", "1") != "0"
+# Cosine similarity a rephrased request needs to reuse an answer, 0 disables it
+LLM_CACHE_SEMANTIC_THRESHOLD = float(os.getenv("FLO_LLM_CACHE_SEMANTIC", 0))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("FLO_LLM_CACHE_MAX_ENTRIES", 5000))
+EMBEDDING_DIMENSIONS = 1024
+# Every entry depends on this domain, bumping it invalidates the whole cache
+ALL_DOMAINS = "*"
+VOLATILE_KWARGS = ("id", "response_metadata", "usage_metadata", "additional_kwargs")
+STOPWORDS = frozenset(
+    "a an the is are am was be do does did can could would will you me my i "
+    "to of for on in please pls s".split()
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    frame TEXT NOT NULL,
+    queries TEXT NOT NULL,
+    versions TEXT NOT NULL,
+    type TEXT NOT NULL,
+    generations BLOB NOT NULL,
+    used_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_frame ON entries (frame);
+CREATE INDEX IF NOT EXISTS entries_used_at ON entries (used_at);
+CREATE TABLE IF NOT EXISTS versions (
+    domain TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+"""
+
+
+def _scoped(domain: str) -> str:
+    """A data domain of the current user, whose writes touch no one else's answers"""
+    return f"{current_user.get() or ''}/{domain}"
+
+
+def _hash(*parts: str) -> str:
+    return hashlib.sha256("\0".join(parts).encode()).hexdigest()
+
+
+def _text(content: Any) -> str:
+    if isinstance(content, str):
+        return content
+    return " ".join(
+        block.get("text", "") if isinstance(block, dict) else str(block)
+        for block in content
+    )
+
+
+def _normalize(message: dict) -> tuple[str, dict]:
+    """Drop the fields that change between otherwise identical calls"""
+    kind = message.get("id", ["?"])[-1]
+    kwargs = {
+        key: value
+        for key, value in message.get("kwargs", {}).items()
+        if key not in VOLATILE_KWARGS and key != "tool_call_id"
+    }
+    if "content" in kwargs:
+        kwargs["content"] = " ".join(_text(kwargs["content"]).split())
+    if kwargs.get("tool_calls"):
+        kwargs["tool_calls"] = [
+            {"name": call["name"], "args": call["args"]}
+            for call in kwargs["tool_calls"]
+        ]
+    kwargs.pop("invalid_tool_calls", None)
+    return kind, kwargs
+
+
+def embed(text: str) -> dict[int, float]:
+    """Hashed bag-of-words embedding, unit length, keyed by dimension"""
+    tokens = [
+        token
+        for token in re.findall(r"[a-z0-9]+", text.lower())
+        if token not in STOPWORDS
+    ]
+    vector: dict[int, float] = {}
+    for token in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]:
+        digest = hashlib.blake2b(token.encode(), digest_size=4).digest()
+        index = int.from_bytes(digest) % EMBEDDING_DIMENSIONS
+        vector[index] = vector.get(index, 0.0) + 1.0
+
+    norm = math.sqrt(sum(value * value for value in vector.values())) or 1.0
+    return {index: value / norm for index, value in vector.items()}
+
+
+def similarity(a: dict[int, float], b: dict[int, float]) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(value * b.get(index, 0.0) for index, value in a.items())
+
+
+def _fresh_ids(generation: ChatGeneration) -> ChatGeneration:
+    """Give a replayed answer new message and tool call ids"""
+    message = generation.message
+    ids = {call["id"]: f"call_{uuid.uuid4().hex}" for call in message.tool_calls}
+    update: dict[str, Any] = {"id": str(uuid.uuid4())}
+    if ids:
+        update["tool_calls"] = [
+            {**call, "id": ids[call["id"]]} for call in message.tool_calls
+        ]
+        if "tool_calls" in message.additional_kwargs:
+            update["additional_kwargs"] = {
+                **message.additional_kwargs,
+                "tool_calls": [
+                    {**call, "id": ids.get(call.get("id"), call.get("id"))}
+                    for call in message.additional_kwargs["tool_calls"]
+                ],
+            }
+
+    return ChatGeneration(
+        message=message.model_copy(update=update),
+        generation_info=generation.generation_info,
+    )
+
+
+class SQLiteLLMCache(SQLiteFile, BaseCache):
+    """
+    Chat model response cache stored in a SQLite file.
+
+    Calls are matched on the prompt with ids and provider metadata stripped, plus the
+    model settings and bound tool schemas. With `semantic_threshold` set, a call whose
+    user messages are rephrasings of a cached call's, and that is otherwise identical,
+    reuses its answer too.
+
+    Each entry remembers the version of every data domain its prompt read through
+    tools (see `src.tools.registry`). Write tools bump those versions through
+    `invalidate`, and entries that saw an older version are never served again.
+    Entries and domain versions are kept per user.
+
+    Answers that call a write tool are not cached, since replaying one would write
+    again with the arguments (timestamps, amounts) of the first request.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        semantic_threshold: float = LLM_CACHE_SEMANTIC_THRESHOLD,
+        max_entries: int = LLM_CACHE_MAX_ENTRIES,
+    ) -> None:
+        self.path = path
+        self.semantic_threshold = semantic_threshold
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.serde = JsonPlusSerializer()
+        self.lock = threading.Lock()
+
+    def setup(self, conn: sqlite3.Connection) -> None:
+        conn.executescript(SCHEMA)
+
+    def _parse(self, prompt: str, llm_string: str) -> dict | None:
+        """Split a serialized prompt into its cache keys and data dependencies"""
+        try:
+            messages = json.loads(prompt)
+        except ValueError:
+            return None
+
+        normalized, framed, queries = [], [], []
+        domains = {ALL_DOMAINS, _scoped(ALL_DOMAINS)}
+        for message in messages:
+            kind, kwargs = _normalize(message)
+            normalized.append([kind, kwargs])
+            if kind == "HumanMessage":
+                queries.append(kwargs.get("content", ""))
+                framed.append([kind, {**kwargs, "content": None}])
+            else:
+                framed.append([kind, kwargs])
+            if kind == "ToolMessage":
+                found = tool_domains(kwargs.get("name", ""))
+                if found is None:
+                    # Unknown tools may read anything, their answers are not cached
+                    return None
+                domains.update(_scoped(domain) for domain in found)
+
+        user = current_user.get() or ""
+        return {
+            "key": _hash(user, llm_string, json.dumps(normalized, sort_keys=True)),
+            "frame": _hash(user, llm_string, json.dumps(framed, sort_keys=True)),
+            "queries": queries,
+            "domains": sorted(domains),
+        }
+
+    def _versions(self, domains: Sequence[str]) -> dict[str, int]:
+        placeholders = ", ".join("?" for _ in domains)
+        rows = self.conn.execute(
+            f"SELECT domain, version FROM versions WHERE domain IN ({placeholders})",
+            tuple(domains),
+        ).fetchall()
+        found = dict(rows)
+        return {domain: found.get(domain, 0) for domain in domains}
+
+    def _is_fresh(self, versions: str) -> bool:
+        recorded = json.loads(versions)
+        return self._versions(list(recorded)) == recorded
+
+    def _find(self, parsed: dict) -> tuple[str, tuple[str, bytes]] | None:
+        row = self.conn.execute(
+            "SELECT key, versions, type, generations FROM entries WHERE key = ?",
+            (parsed["key"],),
+        ).fetchone()
+        if row and self._is_fresh(row[1]):
+            return row[0], (row[2], row[3])
+
+        if not self.semantic_threshold or not parsed["queries"]:
+            return None
+
+        wanted = [embed(query) for query in parsed["queries"]]
+        best, best_score = None, self.semantic_threshold
+        for key, queries, versions, *generations in self.conn.execute(
+            "SELECT key, queries, versions, type, generations FROM entries "
+            "WHERE frame = ?",
+            (parsed["frame"],),
+        ).fetchall():
+            score = min(
+                similarity(a, embed(b)) for a, b in zip(wanted, json.loads(queries))
+            )
+            if score >= best_score and self._is_fresh(versions):
+                best, best_score = (key, tuple(generations)), score
+
+        return best
+
+    def lookup(self, prompt: str, llm_string: str) -> RETURN_VAL_TYPE | None:
+        parsed = self._parse(prompt, llm_string)
+        if parsed is None:
+            return None
+
+        with self.lock:
+            found = self._find(parsed)
+            if found is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            with self.conn:
+                self.conn.execute(
+                    "UPDATE entries SET used_at = ? WHERE key = ?",
+                    (time.time(), found[0]),
+                )
+
+        return [
+            _fresh_ids(ChatGeneration(**generation))
+            for generation in self.serde.loads_typed(found[1])
+        ]
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        parsed = self._parse(prompt, llm_string)
+        if parsed is None or not all(
+            isinstance(generation, ChatGeneration)
+            and not any(
+                is_write_tool(call["name"]) for call in generation.message.tool_calls
+            )
+            for generation in return_val
+        ):
+            return
+
+        type_, generations = self.serde.dumps_typed(
+            [
+                {"message": item.message, "generation_info": item.generation_info}
+                for item in return_val
+            ]
+        )
+        with self.lock, self.conn:
+            versions = self._versions(parsed["domains"])
+            self.conn.execute(
+                "INSERT OR REPLACE INTO entries "
+                "(key, frame, queries, versions, type, generations, used_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    parsed["key"],
+                    parsed["frame"],
+                    json.dumps(parsed["queries"]),
+                    json.dumps(versions),
+                    type_,
+                    generations,
+                    time.time(),
+                ),
+            )
+            self.conn.execute(
+                "DELETE FROM entries WHERE key IN "
+                "(SELECT key FROM entries ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def invalidate(self, domains: Sequence[str] | None = None) -> None:
+        """
+        Retire every entry of the current user that read one of `domains`, or every
+        entry of every user for None
+        """
+        if domains is None:
+            domains = [ALL_DOMAINS]
+        else:
+            domains = [_scoped(domain) for domain in domains]
+
+        with self.lock, self.conn:
+            for domain in domains:
+                self.conn.execute(
+                    "INSERT INTO versions (domain, version) VALUES (?, 1) "
+                    "ON CONFLICT (domain) DO UPDATE SET version = version + 1",
+                    (domain,),
+                )
+                # Entries that read the domain can never match again
+                self.conn.execute(
+                    "DELETE FROM entries WHERE EXISTS "
+                    "(SELECT 1 FROM json_each(entries.versions) WHERE key = ?)",
+                    (domain,),
+                )
+
+    def clear(self, **kwargs: Any) -> None:
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM entries")
+
+
+llm_cache = SQLiteLLMCache(LLM_CACHE_PATH)
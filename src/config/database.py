@@ -1,18 +1,24 @@
 import logging
 import os
+import threading
+from collections import OrderedDict
 
 from sqlalchemy.engine import Engine, create_engine
+from sqlalchemy.orm import Session as OrmSession
 from sqlalchemy.orm import declarative_base, sessionmaker
 
 from .directory import DB_PATH
+from .users import current_user, user_dir
 
 logger = logging.getLogger(__name__)
 
 DB_URL = f"sqlite:///{DB_PATH}"
+# Per-user engines kept open at once, the least recently used one is closed first
+DB_POOL_SIZE = int(os.getenv("FLO_DB_POOL_SIZE", 64))
 
 logger.info(f"Database URL configured: {DB_URL}")
 engine = create_engine(DB_URL, connect_args={"check_same_thread": False})
-Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+LocalSession = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
@@ -20,3 +26,67 @@ Base = declarative_base()
 def initialize_db(engine: Engine) -> None:
     """Crete all the database tables"""
     Base.metadata.create_all(engine)
+
+
+class EnginePool:
+    """
+    One SQLite database per user, with an LRU pool of open engines.
+
+    A user's database file lives in their own directory and is created with all the
+    tables on first use. At most `size` engines stay in the pool; older ones are
+    reopened on demand, and disposed once no session of a running turn still holds one
+    of their connections.
+    """
+
+    def __init__(self, size: int = DB_POOL_SIZE) -> None:
+        self.size = size
+        self.lock = threading.Lock()
+        self.sessions: OrderedDict[str, sessionmaker] = OrderedDict()
+        # Evicted engines with connections still checked out
+        self.retired: list[Engine] = []
+
+    def _dispose_idle(self) -> None:
+        busy = []
+        for retired in self.retired:
+            if retired.pool.checkedout():
+                busy.append(retired)
+            else:
+                retired.dispose()
+        self.retired = busy
+
+    def get(self, user_id: str) -> sessionmaker:
+        with self.lock:
+            self._dispose_idle()
+            if user_id in self.sessions:
+                self.sessions.move_to_end(user_id)
+                return self.sessions[user_id]
+
+            directory = user_dir(user_id)
+            os.makedirs(directory, exist_ok=True)
+            user_engine = create_engine(
+                f"sqlite:///{os.path.join(directory, 'userdata.db')}",
+                connect_args={"check_same_thread": False},
+            )
+            initialize_db(user_engine)
+
+            self.sessions[user_id] = sessionmaker(
+                autocommit=False, autoflush=False, bind=user_engine
+            )
+            if len(self.sessions) > self.size:
+                _, evicted = self.sessions.popitem(last=False)
+                self.retired.append(evicted.kw["bind"])
+                self._dispose_idle()
+
+            return self.sessions[user_id]
+
+
+engine_pool = EnginePool()
+
+
+def Session() -> OrmSession:
+    """Open a session on the current user's database (see `current_user`)"""
+    user_id = current_user.get()
+    if user_id is None:
+        return LocalSession()
+
+    return engine_pool.get(user_id)()
@@ -5,4 +5,13 @@ script_dir = os.path.dirname(os.path.abspath(__file__))
 MEMORY_DIR = os.path.join(script_dir, "..", "memory")
 DATABASE_DIR = os.path.join(script_dir, "..", "database")
 DB_PATH = os.path.join(MEMORY_DIR, "semantic", "userdata.db")
+STORE_DB_PATH = os.path.join(MEMORY_DIR, "semantic", "store.db")
+USERS_DIR = os.path.join(MEMORY_DIR, "users")
 LOGGING_DIR = os.path.join(script_dir, "../..", "logs")
+CHECKPOINT_DB_PATH = os.path.join(MEMORY_DIR, "episodic", "checkpoints.db")
+ROUTING_LOG_PATH = os.path.join(MEMORY_DIR, "episodic", "routing.jsonl")
+LLM_CACHE_PATH = os.path.join(MEMORY_DIR, "episodic", "llm_cache.db")
+TRACE_PATH = os.path.join(LOGGING_DIR, "traces.jsonl")
+SLOW_QUERY_LOG_PATH = os.path.join(LOGGING_DIR, "slow_queries.jsonl")
+LOG_PATH = os.path.join(LOGGING_DIR, "system.jsonl")
+PROFILE_DIR = os.path.join(LOGGING_DIR, "profiles")
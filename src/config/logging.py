@@ -1,33 +1,159 @@
+import atexit
+import json
 import logging
+import logging.handlers
 import os
+import queue
+import secrets
 import sys
+import traceback
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
 
-from .directory import LOGGING_DIR
+from .directory import LOG_PATH
+from .users import current_user
 
+LOG_LEVEL = os.getenv("FLO_LOG_LEVEL", "INFO").upper()
+# Console output goes to stderr and stays quiet by default, so it never mixes with chat
+LOG_CONSOLE_LEVEL = os.getenv("FLO_LOG_CONSOLE_LEVEL", "WARNING").upper()
+LOG_MAX_BYTES = int(os.getenv("FLO_LOG_MAX_BYTES", 10 * 1024 * 1024))
+LOG_BACKUP_COUNT = int(os.getenv("FLO_LOG_BACKUP_COUNT", 5))
+CONSOLE_FORMAT = "%(asctime)s [%(levelname)s] %(name)s: %(message)s"
 
-def setup_logging():
-    """Configure root logger for the system"""
+# Conversation thread and turn the current code runs for, added to every record
+thread_id_var: ContextVar[str | None] = ContextVar("log_thread_id", default=None)
+turn_id_var: ContextVar[str | None] = ContextVar("log_turn_id", default=None)
 
-    log_format = "%(asctime)s [%(levelname)s] %(message)s"
+# Attributes every LogRecord has, anything else came in through `extra=`
+RECORD_ATTRIBUTES = frozenset(
+    logging.LogRecord("", 0, "", 0, "", None, None).__dict__
+) | {"message", "asctime", "thread_id", "turn_id", "user_id", "exception"}
 
-    os.makedirs(LOGGING_DIR, exist_ok=True)
-    log_file_path = os.path.join(LOGGING_DIR, "system.log")
+_listener: logging.handlers.QueueListener | None = None
+
+
+@contextmanager
+def log_context(
+    thread_id: str | None = None, turn_id: str | None = None
+) -> Iterator[str]:
+    """
+    Tag the records logged inside the block with a thread and turn id.
+
+    A new turn id is made when none is given, in the format of a trace id so the
+    turn's trace (see `src.config.tracing`) takes it over. Yields the turn id.
+    """
+    turn_id = turn_id or secrets.token_hex(16)
+    thread_token = thread_id_var.set(thread_id)
+    turn_token = turn_id_var.set(turn_id)
+    try:
+        yield turn_id
+    finally:
+        turn_id_var.reset(turn_token)
+        thread_id_var.reset(thread_token)
+
+
+class ContextQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hand records to the background listener, with the caller's context attached.
+
+    Context variables and exception info only exist in the thread that logs, so they
+    are resolved here; formatting and I/O happen on the listener thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = logging.makeLogRecord(record.__dict__)
+        record.message = record.getMessage()
+        record.thread_id = thread_id_var.get()
+        record.turn_id = turn_id_var.get()
+        record.user_id = current_user.get()
+        if record.exc_info:
+            record.exception = "".join(traceback.format_exception(*record.exc_info))
+        record.msg, record.args = record.message, None
+        record.exc_info = record.exc_text = None
+        return record
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per record, with the correlation ids and any `extra` fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(
+                record.created, timezone.utc
+            ).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread_id": getattr(record, "thread_id", None),
+            "turn_id": getattr(record, "turn_id", None),
+            "user_id": getattr(record, "user_id", None),
+        }
+        entry.update(
+            (key, value)
+            for key, value in record.__dict__.items()
+            if key not in RECORD_ATTRIBUTES
+        )
+        if exception := getattr(record, "exception", None):
+            entry["exception"] = exception
+        return json.dumps(entry, default=str)
 
-    logger = logging.getLogger()
-    logger.setLevel(logging.INFO)
 
-    if logger.hasHandlers():
-        logger.handlers.clear
+class ConsoleFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        if exception := getattr(record, "exception", None):
+            text = f"{text}\n{exception.rstrip()}"
+        return text
 
-    stdout_handler = logging.StreamHandler(sys.stdout)
-    stdout_handler.setFormatter(logging.Formatter(log_format))
-    logger.addHandler(stdout_handler)
 
-    file_handler = logging.FileHandler(log_file_path)
-    file_handler.setFormatter(logging.Formatter(log_format))
-    logger.addHandler(stdout_handler)
+def setup_logging(level: str = LOG_LEVEL, console_level: str = LOG_CONSOLE_LEVEL):
+    """
+    Configure the root logger for the system.
+
+    Records are put on a queue and written by a background listener, so logging never
+    blocks the event loop: JSON lines to `LOG_PATH`, rotated by size, and a readable
+    line on stderr for records at `console_level` or above. Calling it again replaces
+    the previous configuration.
+    """
+    global _listener
+
+    os.makedirs(os.path.dirname(LOG_PATH), exist_ok=True)
+
+    file_handler = logging.handlers.RotatingFileHandler(
+        LOG_PATH, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT
+    )
+    file_handler.setFormatter(JSONFormatter())
+
+    console_handler = logging.StreamHandler(sys.stderr)
+    console_handler.setLevel(console_level)
+    console_handler.setFormatter(ConsoleFormatter(CONSOLE_FORMAT))
+
+    stop_logging()
+    logger = logging.getLogger()
+    logger.setLevel(level)
+    logger.handlers.clear()
+
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    logger.addHandler(ContextQueueHandler(records))
+    _listener = logging.handlers.QueueListener(
+        records, file_handler, console_handler, respect_handler_level=True
+    )
+    _listener.start()
 
     logging.info("Logging configured successfully.")
 
 
-setup_logging()
+def stop_logging() -> None:
+    """Write out the queued records and stop the listener"""
+    global _listener
+
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(stop_logging)
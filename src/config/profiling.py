@@ -0,0 +1,178 @@
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+from types import FrameType
+
+from .directory import PROFILE_DIR
+
+logger = logging.getLogger(__name__)
+
+PROFILING_ENABLED = os.getenv("FLO_PROFILE", "0") != "0"
+# Seconds between two samples of every thread's stack
+PROFILE_INTERVAL = float(os.getenv("FLO_PROFILE_INTERVAL_MS", 5)) / 1000
+# Frames kept per allocation, more pin down the caller but slow every allocation
+PROFILE_TRACEMALLOC_FRAMES = int(os.getenv("FLO_PROFILE_TRACEMALLOC_FRAMES", 8))
+# Allocation sites listed per turn
+PROFILE_TOP_ALLOCATIONS = 25
+
+# Leaf frames of a thread that waits instead of running: the event loop polling for
+# I/O, idle workers and the log listener. Their samples would only bury the CPU time
+IDLE_FRAMES = frozenset(
+    {
+        ("selectors.py", "select"),
+        ("threading.py", "wait"),
+        ("queue.py", "get"),
+        ("thread.py", "_worker"),
+        ("handlers.py", "dequeue"),
+    }
+)
+TRACEMALLOC_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+]
+
+
+def _frame_name(frame: FrameType) -> str:
+    code = frame.f_code
+    filename = os.path.basename(code.co_filename)
+    name = f"{code.co_qualname} ({filename}:{code.co_firstlineno})"
+    # `;` separates the frames of a folded stack
+    return name.replace(";", ":")
+
+
+def fold_stack(frame: FrameType | None) -> str | None:
+    """Stack of `frame` as `outer;...;inner`, None when the thread is idle"""
+    if frame is None or (
+        (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name)
+        in IDLE_FRAMES
+    ):
+        return None
+
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class Profiler:
+    """
+    Opt-in per-turn CPU and memory profiler.
+
+    While a turn runs, a background thread samples the stack of every thread each
+    `interval` seconds; the samples are written as folded stacks (`<turn>.folded`, the
+    input of flamegraph.pl, speedscope and inferno). `tracemalloc` snapshots taken at
+    the start and end of the turn are compared, and the allocation sites that grew the
+    most are written to `<turn>.allocations.txt`.
+
+    The whole process is sampled, so turns that overlap on the server share their
+    samples and allocations.
+
+    Example:
+        with profiler.turn(turn_id):
+            await flo.ainvoke(...)
+    """
+
+    def __init__(
+        self,
+        directory: str = PROFILE_DIR,
+        enabled: bool = PROFILING_ENABLED,
+        interval: float = PROFILE_INTERVAL,
+    ) -> None:
+        self.directory = directory
+        self.enabled = enabled
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.active: list[Counter] = []
+        self.sampler: threading.Thread | None = None
+
+    def _sample(self) -> None:
+        own = threading.get_ident()
+        while True:
+            with self.lock:
+                if not self.active:
+                    self.sampler = None
+                    return
+                collectors = list(self.active)
+
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own or (stack := fold_stack(frame)) is None:
+                    continue
+                stack = f"{names.get(ident, ident)};{stack}"
+                for samples in collectors:
+                    samples[stack] += 1
+            time.sleep(self.interval)
+
+    @contextmanager
+    def turn(self, turn_id: str) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(PROFILE_TRACEMALLOC_FRAMES)
+        before = tracemalloc.take_snapshot().filter_traces(TRACEMALLOC_FILTERS)
+
+        samples: Counter = Counter()
+        with self.lock:
+            self.active.append(samples)
+            if self.sampler is None:
+                self.sampler = threading.Thread(
+                    target=self._sample, name="flo-profiler", daemon=True
+                )
+                self.sampler.start()
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                self.active.remove(samples)
+            after = tracemalloc.take_snapshot().filter_traces(TRACEMALLOC_FILTERS)
+            self.write(turn_id, samples, before, after, elapsed)
+
+    def write(
+        self,
+        turn_id: str,
+        samples: Counter,
+        before: tracemalloc.Snapshot,
+        after: tracemalloc.Snapshot,
+        elapsed: float,
+    ) -> None:
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [
+            f"Turn {turn_id}: {elapsed:.3f}s, {sum(samples.values())} CPU samples",
+            f"Traced memory: {current / 1024:.0f} KB now, {peak / 1024:.0f} KB peak",
+            "",
+        ]
+        for stat in after.compare_to(before, "traceback")[:PROFILE_TOP_ALLOCATIONS]:
+            lines.append(
+                f"{stat.size_diff / 1024:+.1f} KB ({stat.count_diff:+d} blocks), "
+                f"{stat.size / 1024:.1f} KB in {stat.count} blocks"
+            )
+            lines.extend(f"    {line.strip()}" for line in stat.traceback.format())
+
+        base = os.path.join(self.directory, turn_id)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(f"{base}.folded", "w") as file:
+                file.writelines(
+                    f"{stack} {count}\n" for stack, count in samples.items()
+                )
+            with open(f"{base}.allocations.txt", "w") as file:
+                file.write("\n".join(lines) + "\n")
+        except OSError as e:
+            logger.error(f"Could not write the profile of turn {turn_id}: {e}")
+            return
+        logger.info(f"Profile of turn {turn_id} written to {base}.*")
+
+
+profiler = Profiler()
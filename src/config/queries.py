@@ -0,0 +1,164 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .directory import SLOW_QUERY_LOG_PATH
+
+logger = logging.getLogger(__name__)
+
+# Statements slower than this are written to the slow-query log with their plan
+SLOW_QUERY_MS = float(os.getenv("FLO_SLOW_QUERY_MS", 100))
+# Queries one tool call may run before it is reported as a likely N+1 pattern
+TOOL_QUERY_WARNING = int(os.getenv("FLO_TOOL_QUERY_WARNING", 50))
+# Longest parameter list kept in the slow-query log
+MAX_PARAMETERS_LENGTH = 200
+
+# Tool whose call issued the statements running in the current context
+current_tool: ContextVar[str | None] = ContextVar("current_tool", default=None)
+_counters: ContextVar[tuple["QueryCounter", ...]] = ContextVar(
+    "query_counters", default=()
+)
+
+
+class QueryCounter:
+    """Statements run while the counter was active, and how long they took"""
+
+    def __init__(self) -> None:
+        self.total = 0
+        self.ms = 0.0
+        self.by_tool: Counter = Counter()
+        self.statements: list[str] = []
+
+    def count(self, tool: str | None = None) -> int:
+        """Statements issued by `tool`, or by anything when no tool is given"""
+        return self.by_tool[tool] if tool else self.total
+
+
+class QueryLog:
+    """
+    Per-tool accounting of the SQL statements run by every engine.
+
+    Each statement is attributed to the tool call that issued it (see `tool`), counted
+    in `stats` for the life of the process and in every active `count()` block. A
+    statement slower than `threshold_ms` is appended to the slow-query log along with
+    its `EXPLAIN QUERY PLAN`.
+
+    Example:
+        with query_log.count() as queries:
+            get_user_liabilities.func()
+        assert queries.total <= 3
+    """
+
+    def __init__(
+        self, path: str = SLOW_QUERY_LOG_PATH, threshold_ms: float = SLOW_QUERY_MS
+    ) -> None:
+        self.path = path
+        self.threshold_ms = threshold_ms
+        self.lock = threading.Lock()
+        self.stats: dict[str, dict[str, float]] = defaultdict(
+            lambda: {"calls": 0, "queries": 0, "ms": 0.0}
+        )
+
+    @contextmanager
+    def count(self) -> Iterator[QueryCounter]:
+        counter = QueryCounter()
+        token = _counters.set(_counters.get() + (counter,))
+        try:
+            yield counter
+        finally:
+            _counters.reset(token)
+
+    @contextmanager
+    def tool(self, name: str) -> Iterator[QueryCounter]:
+        """Attribute the statements run inside the block to one call of tool `name`"""
+        token = current_tool.set(name)
+        try:
+            with self.count() as counter:
+                yield counter
+        finally:
+            current_tool.reset(token)
+            with self.lock:
+                self.stats[name]["calls"] += 1
+            if counter.total > TOOL_QUERY_WARNING:
+                logger.warning(
+                    f"Tool {name} ran {counter.total} queries in one call "
+                    f"({counter.ms:.0f} ms), likely one query per row"
+                )
+
+    def record(self, statement: str, ms: float) -> None:
+        tool = current_tool.get()
+        for counter in _counters.get():
+            counter.total += 1
+            counter.ms += ms
+            counter.by_tool[tool] += 1
+            counter.statements.append(statement)
+        if tool:
+            with self.lock:
+                self.stats[tool]["queries"] += 1
+                self.stats[tool]["ms"] += ms
+
+    def log_slow(self, cursor, statement: str, parameters, ms: float) -> None:
+        try:
+            plan = [
+                row[-1]
+                for row in cursor.connection.execute(
+                    f"EXPLAIN QUERY PLAN {statement}", parameters or ()
+                )
+            ]
+        except Exception as e:
+            plan = [f"unavailable: {e}"]
+
+        entry = {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "tool": current_tool.get(),
+            "ms": round(ms, 3),
+            "statement": statement,
+            "parameters": repr(parameters)[:MAX_PARAMETERS_LENGTH],
+            "plan": plan,
+        }
+        try:
+            with self.lock:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                with open(self.path, "a") as file:
+                    file.write(json.dumps(entry, default=str) + "\n")
+        except OSError as e:
+            logger.error(f"Could not write the slow-query log: {e}")
+
+
+query_log = QueryLog()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("query_started")
+    if not started:
+        return
+
+    ms = (time.perf_counter() - started.pop()) * 1000
+    query_log.record(statement, ms)
+    # A plan is for one set of parameters, batched statements are not explained
+    if ms >= query_log.threshold_ms and not executemany:
+        query_log.log_slow(cursor, statement, parameters, ms)
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context):
+    conn = exception_context.connection
+    started = conn.info.get("query_started") if conn is not None else None
+    if started:
+        started.pop()
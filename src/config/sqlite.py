@@ -0,0 +1,37 @@
+import os
+import sqlite3
+import threading
+
+
+class SQLiteFile:
+    """
+    Connection to a SQLite file, opened on first use.
+
+    Checkpoints, the store and the LLM cache are module-level singletons; opening their
+    files lazily keeps importing the agents from creating databases on disk. Subclasses
+    set `path` and create their tables in `setup`.
+    """
+
+    path: str
+    # Run before switching to WAL, after which settings such as auto_vacuum are fixed
+    pragmas: tuple[str, ...] = ()
+    _conn: sqlite3.Connection | None = None
+    _connect_lock = threading.Lock()
+
+    def setup(self, conn: sqlite3.Connection) -> None:
+        """Create the tables and indexes, run once when the file is opened"""
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            with SQLiteFile._connect_lock:
+                if self._conn is None:
+                    os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                    conn = sqlite3.connect(self.path, check_same_thread=False)
+                    with conn:
+                        for pragma in self.pragmas:
+                            conn.execute(f"PRAGMA {pragma}")
+                        conn.execute("PRAGMA journal_mode = WAL")
+                        self.setup(conn)
+                    self._conn = conn
+        return self._conn
@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+from collections.abc import Iterable
+from datetime import datetime, timezone
+from typing import Any
+
+from langgraph.store.base import (
+    BaseStore,
+    GetOp,
+    Item,
+    ListNamespacesOp,
+    MatchCondition,
+    Op,
+    PutOp,
+    Result,
+    SearchItem,
+    SearchOp,
+)
+
+from .directory import STORE_DB_PATH
+from .sqlite import SQLiteFile
+from .tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+# Value fields with a secondary index, filters on them never scan a namespace
+INDEXED_FIELDS = ("status", "deadline", "funding_category")
+DB_ATTRIBUTES = {"db.system": "sqlite"}
+OPERATORS = {
+    "$eq": "=",
+    "$ne": "!=",
+    "$gt": ">",
+    "$gte": ">=",
+    "$lt": "<",
+    "$lte": "<=",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    prefix TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (prefix, key)
+);
+CREATE INDEX IF NOT EXISTS items_updated_at ON items (prefix, updated_at);
+"""
+
+
+def _field(name: str) -> str:
+    """SQL expression for a top-level value field, as written in the indexes"""
+    if not name.isidentifier():
+        raise ValueError(f"Unsupported filter field: {name}")
+    return f"json_extract(value, '$.{name}')"
+
+
+def _matches(condition: MatchCondition, namespace: tuple[str, ...]) -> bool:
+    path = condition.path
+    if len(namespace) < len(path):
+        return False
+    labels = namespace if condition.match_type == "prefix" else namespace[-len(path) :]
+    return all(p == "*" or p == label for p, label in zip(path, labels))
+
+
+class SQLiteStore(SQLiteFile, BaseStore):
+    """
+    Long-term memory store kept in a SQLite file.
+
+    Items are keyed by their dotted namespace and key. `INDEXED_FIELDS` get an
+    expression index per namespace, so `search` finds the items matching a filter on
+    them (equality or `$gt`/`$gte`/`$lt`/`$lte`/`$ne` comparisons) by index lookups.
+    Other top-level fields can be filtered on too, by a scan of the namespace. The
+    matching items are then sorted by `updated_at` before the limit and offset apply,
+    which stays cheap as long as a filter or the namespace keeps them few. Natural
+    language queries are not supported and are ignored.
+    """
+
+    def __init__(self, path: str) -> None:
+        super().__init__()
+        self.path = path
+        self.lock = threading.Lock()
+
+    def setup(self, conn: sqlite3.Connection) -> None:
+        conn.executescript(SCHEMA)
+        for name in INDEXED_FIELDS:
+            conn.execute(
+                f"CREATE INDEX IF NOT EXISTS items_{name} "
+                f"ON items (prefix, {_field(name)})"
+            )
+
+    def _item(self, row: tuple, cls: type[Item] = Item) -> Item:
+        prefix, key, value, created_at, updated_at = row
+        return cls(
+            namespace=tuple(prefix.split(".")),
+            key=key,
+            value=json.loads(value),
+            created_at=datetime.fromisoformat(created_at),
+            updated_at=datetime.fromisoformat(updated_at),
+        )
+
+    def _get(self, op: GetOp) -> Item | None:
+        row = self.conn.execute(
+            "SELECT prefix, key, value, created_at, updated_at FROM items "
+            "WHERE prefix = ? AND key = ?",
+            (".".join(op.namespace), op.key),
+        ).fetchone()
+        return self._item(row) if row else None
+
+    def _put(self, op: PutOp) -> None:
+        prefix = ".".join(op.namespace)
+        if op.value is None:
+            self.conn.execute(
+                "DELETE FROM items WHERE prefix = ? AND key = ?", (prefix, op.key)
+            )
+            return
+
+        now = datetime.now(timezone.utc).isoformat()
+        self.conn.execute(
+            "INSERT INTO items (prefix, key, value, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?) ON CONFLICT (prefix, key) DO UPDATE SET "
+            "value = excluded.value, updated_at = excluded.updated_at",
+            (prefix, str(op.key), json.dumps(op.value), now, now),
+        )
+
+    def _search(self, op: SearchOp) -> list[SearchItem]:
+        prefix = ".".join(op.namespace_prefix)
+        if prefix:
+            # Children share the dotted prefix, "/" sorts right after "."
+            clauses = ["(prefix = ? OR (prefix >= ? AND prefix < ?))"]
+            params: list[Any] = [prefix, f"{prefix}.", f"{prefix}/"]
+        else:
+            clauses, params = [], []
+
+        for name, condition in (op.filter or {}).items():
+            if not isinstance(condition, dict):
+                condition = {"$eq": condition}
+            for operator, operand in condition.items():
+                if operator not in OPERATORS:
+                    raise ValueError(f"Unsupported operator: {operator}")
+                clauses.append(f"{_field(name)} {OPERATORS[operator]} ?")
+                params.append(operand)
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self.conn.execute(
+            "SELECT prefix, key, value, created_at, updated_at FROM items "
+            f"{where} ORDER BY updated_at DESC LIMIT ? OFFSET ?",
+            (*params, op.limit, op.offset),
+        ).fetchall()
+        return [self._item(row, SearchItem) for row in rows]
+
+    def _list_namespaces(self, op: ListNamespacesOp) -> list[tuple[str, ...]]:
+        namespaces = {
+            tuple(prefix.split("."))
+            for (prefix,) in self.conn.execute("SELECT DISTINCT prefix FROM items")
+        }
+        if op.match_conditions:
+            namespaces = {
+                namespace
+                for namespace in namespaces
+                if all(
+                    _matches(condition, namespace) for condition in op.match_conditions
+                )
+            }
+        if op.max_depth is not None:
+            namespaces = {namespace[: op.max_depth] for namespace in namespaces}
+
+        return sorted(namespaces)[op.offset : op.offset + op.limit]
+
+    def batch(self, ops: Iterable[Op]) -> list[Result]:
+        results: list[Result] = []
+        with tracer.span("store.batch", "db", **DB_ATTRIBUTES), self.lock, self.conn:
+            for op in ops:
+                if isinstance(op, GetOp):
+                    results.append(self._get(op))
+                elif isinstance(op, SearchOp):
+                    results.append(self._search(op))
+                elif isinstance(op, PutOp):
+                    results.append(self._put(op))
+                elif isinstance(op, ListNamespacesOp):
+                    results.append(self._list_namespaces(op))
+                else:
+                    raise ValueError(f"Unknown operation type: {type(op)}")
+
+        return results
+
+    async def abatch(self, ops: Iterable[Op]) -> list[Result]:
+        return await asyncio.to_thread(self.batch, list(ops))
+
+
+store = SQLiteStore(STORE_DB_PATH)
@@ -0,0 +1,434 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import ChatGeneration, LLMResult
+from langgraph.config import get_stream_writer
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .database import Base
+from .directory import TRACE_PATH
+from .logging import turn_id_var
+
+logger = logging.getLogger(__name__)
+
+TRACING_ENABLED = os.getenv("FLO_TRACING", "1") != "0"
+# Size at which the trace file is rotated to `<path>.1`
+TRACE_MAX_BYTES = int(os.getenv("FLO_TRACE_MAX_BYTES", 10 * 1024 * 1024))
+# Longest SQL text kept on a database span
+MAX_STATEMENT_LENGTH = 200
+SERVICE_NAME = "flo"
+
+# OTLP span kinds
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_CLIENT = 3
+
+# Span being recorded in the current context, new spans become its children
+current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+
+def args_hash(args: Any) -> str:
+    """Short stable hash of tool arguments, so calls compare without logging values"""
+    payload = json.dumps(args, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def _otlp_value(value: Any) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class Span:
+    """
+    One timed operation of a turn: routing, a model call, a tool call or a query.
+
+    `kind` is Flo's category of the span (turn, route, model, tool, db) and drives the
+    latency breakdown. Attributes follow the OpenTelemetry semantic conventions where
+    one exists.
+    """
+
+    def __init__(
+        self,
+        trace: Trace,
+        name: str,
+        kind: str,
+        parent: Span | None = None,
+        attributes: dict[str, Any] | None = None,
+    ) -> None:
+        self.trace = trace
+        self.name = name
+        self.kind = kind
+        self.parent = parent
+        self.attributes = attributes or {}
+        self.span_id = secrets.token_hex(8)
+        self.error: str | None = None
+        self.start_ns = time.time_ns()
+        self.started = time.perf_counter_ns()
+        self.duration_ns: int | None = None
+
+    @property
+    def duration_ms(self) -> float:
+        duration = self.duration_ns
+        if duration is None:
+            duration = time.perf_counter_ns() - self.started
+        return duration / 1e6
+
+    def add(self, key: str, amount: int | float) -> None:
+        self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def end(self, error: BaseException | str | None = None) -> None:
+        if self.duration_ns is not None:
+            return
+        self.duration_ns = time.perf_counter_ns() - self.started
+        if error is not None:
+            self.error = str(error) or type(error).__name__
+        self.trace.spans.append(self)
+
+    def to_event(self) -> dict:
+        """Compact form sent to clients on the custom stream"""
+        return {
+            "trace_id": self.trace.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent.span_id if self.parent else None,
+            "name": self.name,
+            "kind": self.kind,
+            "duration_ms": round(self.duration_ms, 3),
+            "status": "error" if self.error else "ok",
+            "attributes": self.attributes,
+        }
+
+    def to_otlp(self) -> dict:
+        span = {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": (
+                SPAN_KIND_CLIENT if self.kind in ("model", "db") else SPAN_KIND_INTERNAL
+            ),
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.start_ns + (self.duration_ns or 0)),
+            "attributes": [
+                {"key": key, "value": _otlp_value(value)}
+                for key, value in {
+                    "flo.span.kind": self.kind,
+                    **self.attributes,
+                }.items()
+                if value is not None
+            ],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent:
+            span["parentSpanId"] = self.parent.span_id
+        return span
+
+
+class Trace:
+    """The spans of one turn, under a root span that covers the whole turn"""
+
+    def __init__(self, name: str, attributes: dict[str, Any]) -> None:
+        # The turn id of the logs, so a turn's log records and its trace share an id
+        self.trace_id = turn_id_var.get() or secrets.token_hex(16)
+        self.spans: list[Span] = []
+        self.root = Span(self, name, "turn", attributes=attributes)
+        self.callbacks = [ModelSpanHandler(self)]
+
+    def breakdown(self) -> dict[str, dict[str, float]]:
+        """
+        Where the turn spent its time, as count and milliseconds per category.
+
+        Root agent model calls count as routing, since they mostly pick a specialist.
+        Tool time excludes the queries the tool ran, which count as sqlite. Work running
+        in parallel is counted once per span, so categories can add up to more than the
+        total.
+        """
+        rows = {
+            name: {"count": 0, "ms": 0.0}
+            for name in ("routing", "model", "tool", "sqlite")
+        }
+        first_token = []
+        for span in self.spans:
+            if span.kind == "route" or (
+                span.kind == "model"
+                and span.attributes.get("flo.agent") == "root_agent"
+            ):
+                category = "routing"
+            elif span.kind == "model":
+                category = "model"
+                if (ttft := span.attributes.get("gen_ai.response.ttft_ms")) is not None:
+                    first_token.append(ttft)
+            elif span.kind == "tool":
+                category = "tool"
+            elif span.kind == "db":
+                category = "sqlite"
+                if span.parent and span.parent.kind == "tool":
+                    rows["tool"]["ms"] -= span.duration_ms
+            else:
+                continue
+            rows[category]["count"] += 1
+            rows[category]["ms"] += span.duration_ms
+
+        if first_token:
+            rows["model"]["first_token_ms"] = sum(first_token) / len(first_token)
+        rows["sqlite"]["rows"] = sum(
+            span.attributes.get("flo.db.rows", 0)
+            for span in self.spans
+            if span.kind == "tool"
+        )
+        total = self.root.duration_ms
+        rows["other"] = {
+            "count": 0,
+            "ms": max(0.0, total - sum(row["ms"] for row in rows.values())),
+        }
+        rows["total"] = {"count": 1, "ms": total}
+        return rows
+
+    def to_otlp(self) -> dict:
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [
+                            {"key": "service.name", "value": _otlp_value(SERVICE_NAME)}
+                        ]
+                    },
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": __name__},
+                            "spans": [span.to_otlp() for span in self.spans],
+                        }
+                    ],
+                }
+            ]
+        }
+
+
+def _emit(span: Span) -> None:
+    """Send a finished span to the custom stream when running inside the graph"""
+    try:
+        writer = get_stream_writer()
+    except (RuntimeError, KeyError):
+        return
+    writer({"span": span.to_event()})
+
+
+class Tracer:
+    """
+    Per-turn span recorder.
+
+    `turn` opens a trace for one graph run and `span` records an operation inside it;
+    spans nest through a context variable, so tool and query spans find their parent
+    across the graph's tasks and worker threads. Finished spans (except queries, which
+    are summed on their tool span) are streamed on the `custom` stream, and each trace
+    is appended to `path` as one OTLP/JSON line, the format of the OpenTelemetry
+    collector's file exporter.
+    """
+
+    def __init__(self, path: str = TRACE_PATH, enabled: bool = TRACING_ENABLED) -> None:
+        self.path = path
+        self.enabled = enabled
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def turn(self, name: str = "turn", **attributes: Any) -> Iterator[Trace | None]:
+        if not self.enabled:
+            yield None
+            return
+
+        trace = Trace(name, attributes)
+        token = current_span.set(trace.root)
+        try:
+            yield trace
+        except BaseException as e:
+            trace.root.end(e)
+            raise
+        finally:
+            current_span.reset(token)
+            trace.root.end()
+            self.export(trace)
+
+    @contextmanager
+    def span(self, name: str, kind: str, **attributes: Any) -> Iterator[Span | None]:
+        """Record a child of the current span, nothing when no turn is traced"""
+        parent = current_span.get()
+        if parent is None:
+            yield None
+            return
+
+        span = Span(parent.trace, name, kind, parent, attributes)
+        token = current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.end(e)
+            raise
+        finally:
+            current_span.reset(token)
+            span.end()
+            if kind != "db":
+                _emit(span)
+
+    def callbacks(self) -> list[BaseCallbackHandler]:
+        """Callback handlers that record the model calls of the current turn"""
+        span = current_span.get()
+        return span.trace.callbacks if span else []
+
+    def export(self, trace: Trace) -> None:
+        line = json.dumps(trace.to_otlp(), default=str)
+        try:
+            with self.lock:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                if (
+                    os.path.exists(self.path)
+                    and os.path.getsize(self.path) > TRACE_MAX_BYTES
+                ):
+                    os.replace(self.path, f"{self.path}.1")
+                with open(self.path, "a") as file:
+                    file.write(line + "\n")
+        except OSError as e:
+            logger.error(f"Could not write trace {trace.trace_id}: {e}")
+
+
+tracer = Tracer()
+
+
+class ModelSpanHandler(BaseCallbackHandler):
+    """Record a span per chat model call, with token usage and time to first token"""
+
+    run_inline = True
+
+    def __init__(self, trace: Trace) -> None:
+        self.trace = trace
+        self.spans: dict[UUID, Span] = {}
+
+    def on_chat_model_start(
+        self,
+        serialized: dict[str, Any],
+        messages: list,
+        *,
+        run_id: UUID,
+        metadata: dict[str, Any] | None = None,
+        **kwargs: Any,
+    ) -> None:
+        metadata = metadata or {}
+        model = metadata.get("ls_model_name") or (serialized or {}).get("name", "")
+        # The outermost graph node is the agent, e.g. "quant:<task id>|model:<task id>"
+        namespace = metadata.get("langgraph_checkpoint_ns", "")
+        agent = namespace.split(":")[0] or metadata.get("langgraph_node")
+        self.spans[run_id] = Span(
+            self.trace,
+            f"chat {model}".strip(),
+            "model",
+            self.trace.root,
+            {
+                "gen_ai.operation.name": "chat",
+                "gen_ai.request.model": model,
+                "flo.agent": agent,
+            },
+        )
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> None:
+        span = self.spans.get(run_id)
+        if span and "gen_ai.response.ttft_ms" not in span.attributes:
+            span.attributes["gen_ai.response.ttft_ms"] = round(span.duration_ms, 3)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        span = self.spans.pop(run_id, None)
+        if span is None:
+            return
+
+        generation = response.generations[0][0] if response.generations else None
+        usage = (
+            getattr(generation.message, "usage_metadata", None)
+            if isinstance(generation, ChatGeneration)
+            else None
+        )
+        if usage:
+            span.attributes["gen_ai.usage.input_tokens"] = usage.get("input_tokens")
+            span.attributes["gen_ai.usage.output_tokens"] = usage.get("output_tokens")
+        # Answers that were not streamed arrive all at once
+        span.attributes.setdefault(
+            "gen_ai.response.ttft_ms", round(span.duration_ms, 3)
+        )
+        span.end()
+        _emit(span)
+
+    def on_llm_error(
+        self, error: BaseException, *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        span = self.spans.pop(run_id, None)
+        if span is not None:
+            span.end(error)
+            _emit(span)
+
+
+# Queries of every engine, including the per-user ones, are recorded as db spans
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    parent = current_span.get()
+    if parent is None:
+        return
+
+    operation = statement.lstrip().split(" ", 1)[0].upper()
+    span = Span(
+        parent.trace,
+        operation,
+        "db",
+        parent,
+        {
+            "db.system": "sqlite",
+            "db.operation.name": operation,
+            "db.query.text": statement[:MAX_STATEMENT_LENGTH],
+        },
+    )
+    conn.info.setdefault("flo_spans", []).append(span)
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    spans = conn.info.get("flo_spans")
+    if not spans:
+        return
+
+    span = spans.pop()
+    span.end()
+    if cursor.rowcount > 0:
+        span.attributes["db.response.affected_rows"] = cursor.rowcount
+    if span.parent.kind == "tool":
+        span.parent.add("flo.db.queries", 1)
+        span.parent.add("flo.db.rows", max(cursor.rowcount, 0))
+
+
+@event.listens_for(Base, "load", propagate=True)
+def _on_load(target, context):
+    # Rows read are only known once the ORM loads them, after the query span ended
+    span = current_span.get()
+    if span is not None and span.kind == "tool":
+        span.add("flo.db.rows", 1)
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context):
+    conn = exception_context.connection
+    spans = conn.info.get("flo_spans") if conn is not None else None
+    if spans:
+        spans.pop().end(exception_context.original_exception)
@@ -0,0 +1,181 @@
+import json
+import logging
+import os
+from typing import Any
+
+from langchain_core.messages import AIMessage
+from langgraph.config import get_config, get_stream_writer
+
+logger = logging.getLogger(__name__)
+
+# Tokens a thread may spend in total, 0 for no limit. A thread can set its own with
+# `{"configurable": {"token_budget": ...}}`
+THREAD_TOKEN_BUDGET = int(os.getenv("FLO_THREAD_TOKEN_BUDGET", 0))
+# Share of the budget after which the context is summarized down harder
+BUDGET_SUMMARIZE_RATIO = float(os.getenv("FLO_BUDGET_SUMMARIZE_RATIO", 0.8))
+# Share of the context budget kept once a thread is close to its token budget
+BUDGET_CONTEXT_RATIO = 0.5
+BUDGET_EXHAUSTED_MESSAGE = (
+    "This conversation has used up its token budget, so I have to stop here. "
+    "Please start a new conversation to continue."
+)
+
+USAGE_FIELDS = ("calls", "input_tokens", "output_tokens", "cached_tokens", "cost_usd")
+
+# Model name prefix -> USD per million input, cached input and output tokens. Estimates
+# from the providers' list prices, extend or correct them with FLO_MODEL_PRICES
+MODEL_PRICES: dict[str, tuple[float, float, float]] = {
+    "gemini-2.5-pro": (1.25, 0.31, 10.0),
+    "gemini-2.5-flash-lite": (0.10, 0.025, 0.40),
+    "gemini-2.5-flash": (0.30, 0.075, 2.50),
+    "gemini-2.0-flash-lite": (0.075, 0.075, 0.30),
+    "gemini-2.0-flash": (0.10, 0.025, 0.40),
+    "gpt-5-nano": (0.05, 0.005, 0.40),
+    "gpt-5-mini": (0.25, 0.025, 2.0),
+    "gpt-5": (1.25, 0.125, 10.0),
+    "gpt-4.1-nano": (0.10, 0.025, 0.40),
+    "gpt-4.1-mini": (0.40, 0.10, 1.60),
+    "gpt-4.1": (2.0, 0.50, 8.0),
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "gpt-4o": (2.50, 1.25, 10.0),
+}
+MODEL_PRICES.update(
+    {
+        model: tuple(prices)
+        for model, prices in json.loads(os.getenv("FLO_MODEL_PRICES", "{}")).items()
+    }
+)
+
+
+def model_price(model: str) -> tuple[float, float, float]:
+    """Prices of the longest known prefix of `model`, zero for unknown models"""
+    model = model.rsplit("/", 1)[-1]
+    matches = [prefix for prefix in MODEL_PRICES if model.startswith(prefix)]
+    return MODEL_PRICES[max(matches, key=len)] if matches else (0.0, 0.0, 0.0)
+
+
+def call_usage(message: AIMessage) -> dict[str, Any] | None:
+    """
+    Tokens and estimated cost of the model call that produced `message`.
+
+    Returns:
+        dict: The call's usage, or None when the provider reported none (answers from
+              the LLM cache have none, they cost nothing).
+    """
+    usage = getattr(message, "usage_metadata", None)
+    if not usage:
+        return None
+
+    metadata = message.response_metadata or {}
+    model = metadata.get("model_name") or metadata.get("model") or ""
+    cached = (usage.get("input_token_details") or {}).get("cache_read") or 0
+    input_price, cached_price, output_price = model_price(model)
+    cost = (
+        (usage.get("input_tokens", 0) - cached) * input_price
+        + cached * cached_price
+        + usage.get("output_tokens", 0) * output_price
+    ) / 1_000_000
+
+    return {
+        "model": model,
+        "calls": 1,
+        "input_tokens": usage.get("input_tokens", 0),
+        "output_tokens": usage.get("output_tokens", 0),
+        "cached_tokens": cached,
+        "cost_usd": cost,
+    }
+
+
+def merge_usage(left: dict | None, right: dict | None) -> dict:
+    """
+    Reducer of the `usage` state channel: per agent counters that only grow.
+
+    A specialist hands its whole state back to the parent graph, usage included, so the
+    larger value of each counter is kept instead of adding them up.
+    """
+    merged = {agent: dict(counters) for agent, counters in (left or {}).items()}
+    for agent, counters in (right or {}).items():
+        current = merged.setdefault(agent, {})
+        for field, value in counters.items():
+            current[field] = max(current.get(field, 0), value)
+    return merged
+
+
+def add_usage(usage: dict | None, agent: str, message: AIMessage) -> dict | None:
+    """
+    Add the model call behind `message` to the counters of `agent`, and report it on
+    the stream.
+
+    Returns:
+        dict: The update for the `usage` channel, or None if the call reported no usage.
+    """
+    call = call_usage(message)
+    if call is None:
+        return None
+
+    usage = merge_usage(usage, {})
+    counters = usage.setdefault(agent, dict.fromkeys(USAGE_FIELDS, 0))
+    for field in USAGE_FIELDS:
+        counters[field] = counters.get(field, 0) + call[field]
+
+    try:
+        get_stream_writer()(
+            {"usage": {"agent": agent, **call, "thread": thread_totals(usage)}}
+        )
+    except RuntimeError:
+        # Outside a graph run there is no stream to report to
+        pass
+    return usage
+
+
+def thread_totals(usage: dict | None) -> dict[str, float]:
+    """Counters summed over every agent of the thread"""
+    return {
+        field: sum(counters.get(field, 0) for counters in (usage or {}).values())
+        for field in USAGE_FIELDS
+    }
+
+
+def total_tokens(usage: dict | None) -> int:
+    totals = thread_totals(usage)
+    return totals["input_tokens"] + totals["output_tokens"]
+
+
+def token_budget() -> int:
+    """Token budget of the thread being run, 0 for none"""
+    try:
+        configurable = get_config().get("configurable", {})
+    except RuntimeError:
+        return THREAD_TOKEN_BUDGET
+    budget = configurable.get("token_budget")
+    return int(budget) if budget is not None else THREAD_TOKEN_BUDGET
+
+
+def budget_exhausted(usage: dict | None) -> bool:
+    budget = token_budget()
+    if budget and total_tokens(usage) >= budget:
+        logger.warning(f"Token budget of {budget} used up, refusing the model call")
+        return True
+    return False
+
+
+def branch_budget(usage: dict | None, branches: int) -> int:
+    """
+    Token budget of one of `branches` runs started in parallel from `usage`, 0 for none.
+
+    A parallel run only counts its own tokens, not those its siblings are spending, so
+    the budget left is split evenly between them: together they cannot go over it.
+    """
+    budget = token_budget()
+    if not budget:
+        return 0
+    spent = total_tokens(usage)
+    return max(spent + max(budget - spent, 0) // max(branches, 1), 1)
+
+
+def context_budget(budget: int, usage: dict | None) -> int:
+    """The context budget to summarize to, smaller once the thread nears its budget"""
+    limit = token_budget()
+    if limit and total_tokens(usage) >= limit * BUDGET_SUMMARIZE_RATIO:
+        return int(budget * BUDGET_CONTEXT_RATIO)
+    return budget
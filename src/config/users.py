@@ -0,0 +1,62 @@
+import copy
+import json
+import os
+import re
+import uuid
+from contextvars import ContextVar
+
+from .directory import MEMORY_DIR, USERS_DIR
+
+# User whose data the current request reads and writes, None for the local CLI user
+current_user: ContextVar[str | None] = ContextVar("current_user", default=None)
+
+# No periods: user ids label store namespaces, whose labels must not contain one
+USER_ID_PATTERN = re.compile(r"[A-Za-z0-9][A-Za-z0-9_@-]{0,127}")
+DEFAULT_PROFILE = {
+    "profile": {
+        "user_name": "User",
+        "user_language": "English",
+        "user_currency": "USD",
+    },
+    "finance": {"balance": 0, "avg_salary": 0, "budget": {}},
+}
+
+
+def is_valid_user_id(user_id: str) -> bool:
+    return bool(USER_ID_PATTERN.fullmatch(user_id))
+
+
+def user_dir(user_id: str | None = None) -> str:
+    """Directory holding a user's profile and database, the current user by default"""
+    user_id = user_id or current_user.get()
+    if user_id is None:
+        return os.path.join(MEMORY_DIR, "semantic")
+    if not is_valid_user_id(user_id):
+        raise ValueError(f"Invalid user id: {user_id!r}")
+
+    return os.path.join(USERS_DIR, user_id)
+
+
+def profile_path(user_id: str | None = None) -> str:
+    """
+    Path of a user's profile.json, the current user by default.
+
+    Profiles of new users are created from `DEFAULT_PROFILE` on first use.
+    """
+    path = os.path.join(user_dir(user_id), "profile.json")
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        profile = copy.deepcopy(DEFAULT_PROFILE)
+        profile["profile"]["user_name"] = user_id or current_user.get() or "User"
+        # Written aside and moved in place, so a concurrent reader never sees half a file
+        staging = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(staging, "w") as file:
+            json.dump(profile, file, indent=4)
+        os.replace(staging, path)
+
+    return path
+
+
+def load_profile(user_id: str | None = None) -> dict:
+    with open(profile_path(user_id), "r") as file:
+        return json.load(file)
@@ -1,5 +1,4 @@
 import json
-import os
 from datetime import datetime
 from decimal import Decimal
 from typing import Any, Dict, Optional
@@ -8,7 +7,7 @@ from langchain.tools import tool
 from langgraph.config import get_stream_writer
 
 from src.config.database import Session
-from src.config.directory import MEMORY_DIR
+from src.config.users import profile_path
 from src.database import (
     Asset,
     Debt,
@@ -19,6 +18,13 @@ from src.database import (
     Subscription,
 )
 
+# Table holding the details of each type of liability
+LIABILITY_MODELS = {
+    "debt": Debt,
+    "installment": Installment,
+    "subscription": Subscription,
+}
+
 
 @tool("insert_debt")
 def insert_debt(
@@ -227,7 +233,7 @@ def insert_subscription(
         return {
             "status": "success",
             "summary": (
-                f"Subscription '{name}' (Cost: {monthly_cost_d} per month) recorded successfully. "
+                f"Subscription '{name}' (Cost: {monthly_cost_d} per month, billed {billing_cycle.lower()}) recorded successfully. "
                 f"Next bill: {next_billing_date_dt.date() if next_billing_date_dt else 'N/A'}. ID: {subscription_id}"
             ),
         }
@@ -258,34 +264,17 @@ def get_user_liabilities() -> Dict[str, Any]:
     writer = get_stream_writer()
     writer("Retrieve user liabilities..")
     try:
-        # 1. Query all entries from the main Liability table
-        all_liabilities = session.query(Liability).all()
-
-        for liability in all_liabilities:
-            details = None
-
-            # 2. Fetch details based on liability type and reference_id
-            if liability.liability_type == "debt":
-                details = (
-                    session.query(Debt)
-                    .filter(Debt.id == liability.reference_id)
-                    .first()
-                )
-            elif liability.liability_type == "installment":
-                details = (
-                    session.query(Installment)
-                    .filter(Installment.id == liability.reference_id)
-                    .first()
-                )
-            elif liability.liability_type == "subscription":
-                details = (
-                    session.query(Subscription)
-                    .filter(Subscription.id == liability.reference_id)
-                    .first()
-                )
-
-            # 3. Combine main liability data with specific details
-            if details:
+        # One query per liability type, joining each entry of the main Liability
+        # table with its details
+        for liability_type, model in LIABILITY_MODELS.items():
+            rows = (
+                session.query(Liability, model)
+                .join(model, model.id == Liability.reference_id)
+                .filter(Liability.liability_type == liability_type)
+                .order_by(Liability.id)
+                .all()
+            )
+            for liability, details in rows:
                 # Convert ORM object to a dictionary for a clean return structure
                 liability_entry = {
                     "id": liability.id,
@@ -298,7 +287,7 @@ def get_user_liabilities() -> Dict[str, Any]:
                         if not k.startswith("_") and k != "id"
                     },
                 }
-                liabilities_data[liability.liability_type].append(liability_entry)
+                liabilities_data[liability_type].append(liability_entry)
 
         session.close()
         return {
@@ -651,7 +640,7 @@ def calculate_networth() -> dict[str, Any]:
 
     try:
         # 1. Get Cash Balance
-        with open(os.path.join(MEMORY_DIR, "semantic", "profile.json"), "r") as file:
+        with open(profile_path(), "r") as file:
             profile_data = json.load(file)
         cash_balance = Decimal(profile_data["finance"].get("balance", 0))
 
@@ -1,14 +1,13 @@
-import os
 from datetime import datetime
 
-from langchain.messages import ToolMessage
+from langchain.messages import AnyMessage, HumanMessage, ToolMessage
 from langchain.tools import InjectedState, InjectedToolCallId, tool
 from langgraph.config import get_stream_writer
 from langgraph.types import Command
 from typing_extensions import Annotated, Any
 
+from src.agents.instructions import instruction_registry
 from src.agents.state import State
-from src.config.directory import MEMORY_DIR
 
 
 @tool("transfer_to_agent", description="Handoff control to another agent")
@@ -23,24 +22,51 @@ def handoff_to_agent(
         tool_call_id=tool_call_id,
     )
     if agent_name == "root_agent":
+        # The parent graph has not seen the messages the specialist produced this turn,
+        # nor the tokens it used
         return Command(
             goto=agent_name,
             graph=Command.PARENT,
             update={
-                "messages": state.messages + [tool_message],
+                "messages": current_turn(state.messages) + [tool_message],
                 "active_agent": agent_name,
+                "usage": state.usage,
             },
         )
     else:
         return Command(
             goto=agent_name,
             update={
-                "messages": state.messages + [tool_message],
+                "messages": [tool_message],
                 "active_agent": agent_name,
             },
         )
 
 
+@tool("consult_specialists")
+def consult_specialists(questions: dict[str, str]) -> str:
+    """
+    Ask several specialists at once, for broad requests that span their areas, such as
+    a full financial health check. Their answers come back together.
+
+    Args:
+        questions (dict): Maps each agent to consult (quant, capitalist, steward or
+                          strategist) to a self-contained question for it. The agents
+                          do not see the conversation, only their question.
+    """
+    # Never run by the tool node: the root graph sends each question to its specialist
+    return "Consulted by the root graph."
+
+
+def current_turn(messages: list[AnyMessage]) -> list[AnyMessage]:
+    """Return the messages after the latest user message"""
+    for index in range(len(messages) - 1, -1, -1):
+        if isinstance(messages[index], HumanMessage):
+            return messages[index + 1 :]
+
+    return list(messages)
+
+
 @tool
 def get_task_instruction(task_name: str) -> dict[str, str]:
     """
@@ -56,12 +82,11 @@ def get_task_instruction(task_name: str) -> dict[str, str]:
               If 'error', includes an 'error_message' key.
     """
     writer = get_stream_writer()
-    instruction_path = os.path.join(MEMORY_DIR, f"procedural/{task_name}.txt")
 
     writer(f"Retrieving `{task_name}` task instruction..")
-    if os.path.exists(instruction_path):
-        with open(instruction_path, "r") as file:
-            return {"status": "success", "task_instruction": file.read()}
+    instruction = instruction_registry.get(task_name)
+    if instruction is not None:
+        return {"status": "success", "task_instruction": instruction}
     else:
         return {
             "status": "error",
@@ -80,16 +105,11 @@ def check_available_instructions() -> dict[str, Any]:
               If 'success', includes a 'instruction_list' key.
               If 'error', includes an 'error_message' key.
     """
-    instruction = []
     writer = get_stream_writer()
 
-    instruction_path = os.path.join(MEMORY_DIR, "procedural")
-
-    if os.path.exists(instruction_path):
-        writer(f"Retrieving all available instruction..")
-        for dir in os.scandir(instruction_path):
-            instruction.append(dir.name.split(".")[0])
-
+    writer(f"Retrieving all available instruction..")
+    instruction = instruction_registry.names()
+    if instruction:
         return {"status": "success", "instruction_list": instruction}
     else:
         return {
@@ -1,5 +1,4 @@
 import json
-import os
 from datetime import datetime
 from decimal import Decimal
 
@@ -10,8 +9,12 @@ from sqlalchemy import desc, or_, select
 from typing_extensions import Optional
 
 from src.config.database import Session
-from src.config.directory import MEMORY_DIR
+from src.config.users import profile_path
 from src.database import Transaction
+from src.tools.strategist import fund_goals, goals_namespace
+
+# Categories of transactions that put money aside, and so fund goals like income does
+SAVING_CATEGORIES = frozenset({"saving", "savings"})
 
 
 @tool("read_transactions")
@@ -159,7 +162,7 @@ def time_value_calculator(amount: str) -> dict:
     except ValueError:
         return {"status": "error", "error_message": "Invalid amount provided."}
 
-    with open(os.path.join(MEMORY_DIR, "semantic", "profile.json"), "r") as file:
+    with open(profile_path(), "r") as file:
         data = json.load(file)
 
     finance_data = data.get("finance", {})
@@ -213,8 +216,10 @@ def write_transaction(
     category: str,
     subcategory: Optional[str],
     notes: Optional[str],
+    runtime: ToolRuntime,
 ) -> dict:
-    """Insert a transaction into the database
+    """Insert a transaction into the database. Income and saving transactions also
+    update the goals funded by their category.
 
     Args:
         timestamp (str): Transaction date in 'YYYY-MM-DD HH:MM:SS' format.
@@ -251,39 +256,50 @@ def write_transaction(
         writer("Inserting transaction to the Database...")
         session.add(new_transaction)
         session.commit()
-        session.close()
-
-        if type.lower() == "expense":
-            return {
-                "status": "success",
-                "time_value_calculator": time_value_calculator(amount),
-                "summary": (
-                    "Transaction recorded successfully.\n"
-                    f"Type: {type.upper()} | Amount: {currency.upper()} {amount_d}\n"
-                    f"Description: {description}\n"
-                    f"Category: {category.title()} ({subcategory.title() if subcategory else 'N/A'})\n"
-                    f"Timestamp: {timestamp_dt.strftime('%Y-%m-%d')}"
-                ),
-            }
-        else:
-            return {
-                "status": "success",
-                "summary": (
-                    "Transaction recorded successfully.\n"
-                    f"Type: {type.upper()} | Amount: {currency.upper()} {amount_d}\n"
-                    f"Description: {description}\n"
-                    f"Category: {category.title()} ({subcategory.title() if subcategory else 'N/A'})\n"
-                    f"Timestamp: {timestamp_dt.strftime('%Y-%m-%d')}"
-                ),
-            }
-
     except Exception as e:
         session.rollback()
-        session.close()
         return {
             "status": "error",
             "error_message": f"Failed to insert transaction: {e}",
         }
+    finally:
+        session.close()
+
+    result = {
+        "status": "success",
+        "summary": (
+            "Transaction recorded successfully.\n"
+            f"Type: {type.upper()} | Amount: {currency.upper()} {amount_d}\n"
+            f"Description: {description}\n"
+            f"Category: {category.title()} ({subcategory.title() if subcategory else 'N/A'})\n"
+            f"Timestamp: {timestamp_dt.strftime('%Y-%m-%d')}"
+        ),
+        "funded_goals": [],
+    }
+    if type.lower() == "expense":
+        try:
+            result["time_value_calculator"] = time_value_calculator(amount)
+        except Exception as e:
+            result["time_value_calculator"] = {
+                "status": "error",
+                "error_message": str(e),
+            }
+
+    # Expenses spend money, only income and money put aside count toward goals
+    if type.lower() == "income" or category.lower() in SAVING_CATEGORIES:
+        try:
+            result["funded_goals"] = fund_goals(
+                runtime.store,
+                goals_namespace(runtime.state),
+                amount_d,
+                category.lower(),
+                subcategory.lower() if subcategory else None,
+            )
+        except Exception as e:
+            # The transaction is saved, so it must not be written again
+            result["funding_error"] = f"Transaction saved, but goals not updated: {e}"
+
+    return result
 
 
 @tool(description="Check user balance")
@@ -291,7 +307,7 @@ def check_balance() -> dict[str, str]:
     writer = get_stream_writer()
 
     writer("Retrieving user balance..")
-    with open(os.path.join(MEMORY_DIR, "semantic", "profile.json"), "r") as file:
+    with open(profile_path(), "r") as file:
         data = json.load(file)
 
     return {"status": "success", "balance": data["finance"].get("balance", 0)}
@@ -301,14 +317,14 @@ def check_balance() -> dict[str, str]:
 def update_balance(amount: int, runtime: ToolRuntime) -> dict[str, str]:
     writer = get_stream_writer()
 
-    with open(os.path.join(MEMORY_DIR, "semantic", "profile.json"), "r") as file:
+    with open(profile_path(), "r") as file:
         data = json.load(file)
 
     writer("Calculating current balance..")
     new_balance = data["finance"].get("balance", 0) + amount
 
     writer("Updating balance..")
-    with open(os.path.join(MEMORY_DIR, "semantic", "profile.json"), "w") as file:
+    with open(profile_path(), "w") as file:
         data["finance"]["balance"] = new_balance
         data = json.dump(data, file, indent=4)
 
@@ -320,7 +336,7 @@ def check_budget() -> dict[str, dict]:
     writer = get_stream_writer()
 
     writer("Retrieving user budget..")
-    with open(os.path.join(MEMORY_DIR, "semantic", "profile.json"), "r") as file:
+    with open(profile_path(), "r") as file:
         data = json.load(file)
 
     budget = data["finance"].get("budget", {})
@@ -332,14 +348,14 @@ def check_budget() -> dict[str, dict]:
 def update_budget(budget: dict):
     writer = get_stream_writer()
 
-    with open(os.path.join(MEMORY_DIR, "semantic", "profile.json"), "r") as file:
+    with open(profile_path(), "r") as file:
         data = json.load(file)
 
     writer("Inserting new budget..")
     budget = budget
 
     writer("Updating budget..")
-    with open(os.path.join(MEMORY_DIR, "semantic", "profile.json"), "w") as file:
+    with open(profile_path(), "w") as file:
         data["finance"]["budget"] = budget
         data = json.dump(data, file, indent=4)
 
@@ -349,7 +365,7 @@ def get_avg_income() -> dict[str, str]:
     writer = get_stream_writer()
 
     writer("Retrieving user average income..")
-    with open(os.path.join(MEMORY_DIR, "semantic", "profile.json"), "r") as file:
+    with open(profile_path(), "r") as file:
         data = json.load(file)
 
     return {"status": "success", "avg_income": data["finance"].get("avg_salary", 0)}
@@ -0,0 +1,84 @@
+from typing import Literal, NamedTuple
+
+
+class ToolInfo(NamedTuple):
+    """What a tool touches: the data domains it reads or writes, and how"""
+
+    domains: tuple[str, ...]
+    access: Literal["read", "write"]
+
+
+# Data domains:
+# - finance: balance, budget and income in profile.json
+# - transactions, liabilities, investments, wishlist: tables in userdata.db
+# - goals: the long-term memory store
+TOOL_REGISTRY: dict[str, ToolInfo] = {
+    # Essential tools
+    "transfer_to_agent": ToolInfo((), "read"),
+    "consult_specialists": ToolInfo((), "read"),
+    "get_current_time": ToolInfo((), "read"),
+    "get_task_instruction": ToolInfo((), "read"),
+    "check_available_instructions": ToolInfo((), "read"),
+    # Quant tools
+    "read_transactions": ToolInfo(("transactions",), "read"),
+    "write_transaction": ToolInfo(("transactions", "goals"), "write"),
+    "check_balance": ToolInfo(("finance",), "read"),
+    "update_balance": ToolInfo(("finance",), "write"),
+    "check_budget": ToolInfo(("finance",), "read"),
+    "update_budget": ToolInfo(("finance",), "write"),
+    "get_avg_income": ToolInfo(("finance",), "read"),
+    # Capitalist tools
+    "insert_debt": ToolInfo(("liabilities",), "write"),
+    "insert_installment": ToolInfo(("liabilities",), "write"),
+    "insert_subscription": ToolInfo(("liabilities",), "write"),
+    "get_user_liabilities": ToolInfo(("liabilities",), "read"),
+    "insert_asset": ToolInfo(("investments",), "write"),
+    "insert_fixed_deposit": ToolInfo(("investments",), "write"),
+    "update_asset": ToolInfo(("investments",), "write"),
+    "update_fixed_deposit": ToolInfo(("investments",), "write"),
+    "get_user_investments": ToolInfo(("investments",), "read"),
+    "calculate_networth": ToolInfo(("finance", "investments", "liabilities"), "read"),
+    # Steward tools
+    "append_wishlist": ToolInfo(("wishlist",), "write"),
+    "update_wishlist_status": ToolInfo(("wishlist",), "write"),
+    "get_user_wishlist": ToolInfo(("wishlist",), "read"),
+    "assess_affordability": ToolInfo(
+        ("finance", "transactions", "liabilities", "goals"), "read"
+    ),
+    "plan_wishlist_purchases": ToolInfo(
+        ("finance", "liabilities", "goals", "wishlist"), "read"
+    ),
+    # Strategist tools
+    "create_financial_goal": ToolInfo(("goals",), "write"),
+    "get_all_goals": ToolInfo(("goals",), "read"),
+    "get_goals_progress": ToolInfo(("goals",), "read"),
+}
+
+
+def tool_domains(name: str) -> tuple[str, ...] | None:
+    """Return the data domains a tool touches, or None when the tool is unknown"""
+    info = TOOL_REGISTRY.get(name)
+    return info.domains if info else None
+
+
+def is_write_tool(name: str) -> bool:
+    """Unknown tools are treated as writes, so nothing cached survives them"""
+    info = TOOL_REGISTRY.get(name)
+    return info is None or info.access == "write"
+
+
+def tools_conflict(first: str, second: str) -> bool:
+    """
+    Whether two tool calls must not run at the same time. Reads never conflict, writes
+    always conflict with each other, and a read conflicts with a write on one of its
+    domains. Unknown tools conflict with everything.
+    """
+    if not (is_write_tool(first) or is_write_tool(second)):
+        return False
+    if is_write_tool(first) and is_write_tool(second):
+        return True
+
+    first_domains, second_domains = tool_domains(first), tool_domains(second)
+    if first_domains is None or second_domains is None:
+        return True
+    return bool(set(first_domains) & set(second_domains))
@@ -1,11 +1,37 @@
-from decimal import Decimal
+import asyncio
+import json
+from datetime import datetime, timedelta
+from decimal import ROUND_CEILING, Decimal
 
-from langchain.tools import tool
+from langchain.tools import ToolRuntime, tool
 from langgraph.config import get_stream_writer
+from sqlalchemy import case, func, or_, select
 from typing_extensions import Any, Dict, Optional
 
 from src.config.database import Session
-from src.database import Wishlist
+from src.config.users import profile_path
+from src.database import (
+    Debt,
+    Installment,
+    Liability,
+    Subscription,
+    Transaction,
+    Wishlist,
+)
+from src.tools.strategist import goals_namespace
+
+# Subscription bills per month for each billing cycle, unknown cycles count as monthly
+BILLING_CYCLES_PER_MONTH = {
+    "daily": Decimal(365) / 12,
+    "weekly": Decimal(52) / 12,
+    "biweekly": Decimal(26) / 12,
+    "monthly": Decimal(1),
+    "quarterly": Decimal(1) / 3,
+    "semiannual": Decimal(1) / 6,
+    "yearly": Decimal(1) / 12,
+    "annual": Decimal(1) / 12,
+    "annually": Decimal(1) / 12,
+}
 
 
 @tool
@@ -124,3 +150,518 @@ def get_user_wishlist(status: str | None = "active") -> Dict[str, Any]:
         return {"status": "error", "error_message": str(e)}
     finally:
         session.close()
+
+
+def _load_finance() -> dict:
+    """Read the finance section (balance, avg_salary, budget) of the user profile"""
+    with open(profile_path(), "r") as file:
+        data = json.load(file)
+
+    return data.get("finance", {})
+
+
+def _upcoming_bills() -> dict:
+    """Sum the bills due in the next 30 days (subscriptions, installments and debt minimums)
+
+    Only active subscriptions count: those without a next billing date, or whose next
+    billing date is not past. Their `monthly_cost` is the cost per month, so a plan
+    billed less often than monthly is due at its full price per cycle when it is billed
+    in the next 30 days, and not at all otherwise. The recurring cost per month of all
+    the bills is returned as `monthly`.
+    """
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    months_per_cycle = case(
+        {
+            cycle: float(1 / factor)
+            for cycle, factor in BILLING_CYCLES_PER_MONTH.items()
+            if factor < 1
+        },
+        value=func.lower(Subscription.billing_cycle),
+        else_=1.0,
+    )
+    due = case(
+        (Subscription.next_billing_date.is_(None), Subscription.monthly_cost),
+        (
+            Subscription.next_billing_date < today + timedelta(days=30),
+            Subscription.monthly_cost * months_per_cycle,
+        ),
+        (months_per_cycle > 1, 0),
+        else_=Subscription.monthly_cost,
+    )
+
+    session = Session()
+    try:
+        subscriptions, subscriptions_monthly = session.execute(
+            select(
+                func.coalesce(func.sum(due), 0),
+                func.coalesce(func.sum(Subscription.monthly_cost), 0),
+            )
+            .join(Liability, Liability.reference_id == Subscription.id)
+            .where(
+                Liability.liability_type == "subscription",
+                or_(
+                    Subscription.next_billing_date.is_(None),
+                    Subscription.next_billing_date >= today,
+                ),
+            )
+        ).one()
+        installments = session.execute(
+            select(func.coalesce(func.sum(Installment.monthly_payment), 0))
+            .join(Liability, Liability.reference_id == Installment.id)
+            .where(
+                Liability.liability_type == "installment",
+                Installment.installments_paid < Installment.total_installments,
+            )
+        ).scalar_one()
+        debts = session.execute(
+            select(func.coalesce(func.sum(Debt.min_monthly_payment), 0))
+            .join(Liability, Liability.reference_id == Debt.id)
+            .where(
+                Liability.liability_type == "debt",
+                Debt.amount_paid < Debt.total_amount,
+            )
+        ).scalar_one()
+    finally:
+        session.close()
+
+    breakdown = {
+        "subscriptions": Decimal(str(subscriptions)).quantize(Decimal("0.01")),
+        "installments": Decimal(str(installments)),
+        "debt_minimums": Decimal(str(debts)),
+    }
+    return {
+        "total": sum(breakdown.values(), Decimal(0)),
+        "monthly": Decimal(str(subscriptions_monthly)).quantize(Decimal("0.01"))
+        + breakdown["installments"]
+        + breakdown["debt_minimums"],
+        "breakdown": breakdown,
+    }
+
+
+def _month_expenses(month_start: datetime, category: Optional[str] = None) -> Decimal:
+    """Sum the expenses recorded from the start of the month onwards"""
+    if month_start.month == 12:
+        month_end = month_start.replace(year=month_start.year + 1, month=1)
+    else:
+        month_end = month_start.replace(month=month_start.month + 1)
+
+    stmt = select(func.coalesce(func.sum(Transaction.amount), 0)).where(
+        Transaction.type == "expense",
+        Transaction.timestamp >= month_start,
+        Transaction.timestamp < month_end,
+    )
+    if category:
+        stmt = stmt.where(Transaction.category == category.lower())
+
+    session = Session()
+    try:
+        return Decimal(str(session.execute(stmt).scalar_one()))
+    finally:
+        session.close()
+
+
+def _line_allocation(value: Any) -> Optional[Decimal]:
+    """Monthly allocation of one budget line, None for free-text lines.
+
+    Lines are either an amount or, as `create_budget` writes them,
+    {"description": ..., "allocation": amount}.
+    """
+    if isinstance(value, dict):
+        value = value.get("allocation")
+    try:
+        allocation = Decimal(str(value).replace(",", "").strip())
+    except Exception:
+        return None
+    return allocation if allocation.is_finite() else None
+
+
+def _budget_allocation(
+    budget: dict, category: Optional[str]
+) -> tuple[Optional[str], Optional[Decimal]]:
+    """Resolve which budget line applies to a purchase.
+
+    Returns the matched category (None for the overall budget) and its monthly allocation,
+    or (None, None) when the user has no budget set.
+    """
+    limits = {
+        str(k).lower(): allocation
+        for k, v in budget.items()
+        if (allocation := _line_allocation(v)) is not None
+    }
+
+    if category and category.lower() in limits:
+        return category.lower(), limits[category.lower()]
+    if "total" in limits:
+        return None, limits["total"]
+    if not limits:
+        return None, None
+
+    return None, sum(limits.values(), Decimal(0))
+
+
+def _affordability_verdict(
+    cost: Decimal,
+    balance: Decimal,
+    upcoming_bills: Decimal,
+    remaining_budget: Optional[Decimal],
+    active_goals: list,
+) -> dict[str, str]:
+    """Run the Broke, Survival, Budget and Opportunity checks in order"""
+    if cost > balance:
+        return {
+            "verdict": "Not recommended",
+            "check": "broke",
+            "reason": "The item costs more than the current balance.",
+        }
+    if cost > balance - upcoming_bills:
+        return {
+            "verdict": "Not recommended",
+            "check": "survival",
+            "reason": "Buying this leaves too little to pay the bills due in the next 30 days.",
+        }
+    if remaining_budget is not None and cost > remaining_budget:
+        return {
+            "verdict": "Technically yes, risky though",
+            "check": "budget",
+            "reason": "The cash is there, but this exceeds the remaining budget for the month.",
+        }
+    if active_goals:
+        return {
+            "verdict": "Yes, but...",
+            "check": "opportunity",
+            "reason": "Affordable, but this money could go toward the active goals.",
+        }
+
+    return {
+        "verdict": "Yes",
+        "check": "green_light",
+        "reason": "The purchase fits the budget and does not impact upcoming bills.",
+    }
+
+
+@tool
+async def assess_affordability(
+    amount: str,
+    runtime: ToolRuntime,
+    category: Optional[str] = None,
+    date: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Assess whether the user can afford a purchase (Can I Afford?) in a single call.
+    Runs the Broke, Survival, Budget and Opportunity checks against the current balance,
+    upcoming bills, remaining monthly budget and active goals.
+
+    Args:
+        amount (str): The purchase cost (e.g., '800').
+        category (str): Optional spending category of the purchase (e.g., 'Shopping').
+        date (str): Optional planned purchase date in 'YYYY-MM-DD' format. Defaults to today.
+
+    Returns:
+        dict: The verdict, the check that decided it, and the data used for the reasoning.
+    """
+    writer = runtime.stream_writer
+
+    try:
+        cost = Decimal(amount.replace(",", "").strip())
+        purchase_date = datetime.strptime(date, "%Y-%m-%d") if date else datetime.now()
+    except Exception:
+        return {
+            "status": "error",
+            "error_message": "Invalid amount or date. Use a numeric amount and YYYY-MM-DD.",
+        }
+    if not cost.is_finite() or cost <= 0:
+        return {"status": "error", "error_message": "The amount must be positive."}
+
+    month_start = purchase_date.replace(
+        day=1, hour=0, minute=0, second=0, microsecond=0
+    )
+    namespace = goals_namespace(runtime.state)
+
+    writer("Gathering balance, bills, budget and goals..")
+    try:
+        finance, bills, goals = await asyncio.gather(
+            asyncio.to_thread(_load_finance),
+            asyncio.to_thread(_upcoming_bills),
+            runtime.store.asearch(
+                namespace, filter={"status": "in_progress"}, limit=100
+            ),
+        )
+        budget_category, allocation = _budget_allocation(
+            finance.get("budget", {}) or {}, category
+        )
+        spent = await asyncio.to_thread(_month_expenses, month_start, budget_category)
+    except Exception as e:
+        return {
+            "status": "error",
+            "error_message": f"Failed to gather financial data: {e}",
+        }
+
+    writer("Assessing affordability..")
+    balance = Decimal(str(finance.get("balance", 0)))
+    remaining_budget = allocation - spent if allocation is not None else None
+    active_goals = [
+        {
+            "id": goal.key,
+            "goal": goal.value["description"],
+            "deadline": goal.value["deadline"],
+        }
+        for goal in goals
+        if goal.value.get("status") == "in_progress"
+    ]
+
+    return {
+        "status": "success",
+        **_affordability_verdict(
+            cost, balance, bills["total"], remaining_budget, active_goals
+        ),
+        "data": {
+            "item_cost": str(cost),
+            "balance": str(balance),
+            "upcoming_bills": str(bills["total"]),
+            "bills_breakdown": {k: str(v) for k, v in bills["breakdown"].items()},
+            "balance_after_bills": str(balance - bills["total"]),
+            "budget": {
+                "category": budget_category or "total",
+                "allocation": str(allocation) if allocation is not None else "N/A",
+                "spent_this_month": str(spent),
+                "remaining": (
+                    str(remaining_budget) if remaining_budget is not None else "N/A"
+                ),
+            },
+            "active_goals": active_goals,
+        },
+    }
+
+
+PRIORITY_WEIGHTS = {"high": 3, "medium": 2, "low": 1}
+KNAPSACK_RESOLUTION = 1000
+
+
+def _active_wishlist() -> list[dict]:
+    """Load every active wishlist item"""
+    session = Session()
+    try:
+        items = session.query(Wishlist).filter(Wishlist.status == "active").all()
+        return [
+            {
+                "id": i.id,
+                "item": i.item_name,
+                "price": (
+                    Decimal(str(i.estimated_price))
+                    if i.estimated_price is not None
+                    else None
+                ),
+                "urgency": (i.urgency or "low").lower(),
+                "priority": (i.priority or "medium").lower(),
+                "type": (i.type or "want").lower(),
+            }
+            for i in items
+        ]
+    finally:
+        session.close()
+
+
+def _item_value(item: dict) -> int:
+    """Weight of a wishlist item, priority counting twice as much as urgency"""
+    return PRIORITY_WEIGHTS.get(item["priority"], 1) * 2 + PRIORITY_WEIGHTS.get(
+        item["urgency"], 1
+    )
+
+
+def _knapsack(items: list[dict], capacity: Decimal) -> list[dict]:
+    """Pick the subset of items with the highest priority weight that fits the capacity.
+
+    Prices are scaled down to at most KNAPSACK_RESOLUTION units (rounding prices up and
+    the capacity down) so the table stays small for any currency.
+    """
+    if capacity <= 0 or not items:
+        return []
+
+    unit = max(capacity / KNAPSACK_RESOLUTION, Decimal("0.01"))
+    slots = int(capacity / unit)
+    costs = [
+        int((item["price"] / unit).to_integral_value(rounding=ROUND_CEILING))
+        for item in items
+    ]
+    values = [_item_value(item) for item in items]
+
+    best = [0] * (slots + 1)
+    keep = [[False] * (slots + 1) for _ in items]
+    for n, (cost, value) in enumerate(zip(costs, values)):
+        for c in range(slots, cost - 1, -1):
+            if best[c - cost] + value > best[c]:
+                best[c] = best[c - cost] + value
+                keep[n][c] = True
+
+    chosen, c = [], slots
+    for n in range(len(items) - 1, -1, -1):
+        if keep[n][c]:
+            chosen.append(items[n])
+            c -= costs[n]
+
+    return chosen[::-1]
+
+
+def _schedule(
+    items: list[dict], available: Decimal, monthly: Decimal, months: int
+) -> tuple[list[list[dict]], list[Decimal]]:
+    """Spread the items that fit the whole horizon over its months.
+
+    The cash of month m is `available` plus m months of `monthly`, less what earlier
+    months spent. Which items fit is decided once for the whole horizon (needs first,
+    then wants, each by knapsack), then each item, needs and the heaviest first, is
+    bought in the earliest month that leaves every later month solvent.
+
+    Returns:
+        tuple: The items bought in each month, and the cash left at the end of each.
+    """
+    horizon = available + monthly * (months - 1)
+    needs = _knapsack([i for i in items if i["type"] == "need"], horizon)
+    left = horizon - sum((i["price"] for i in needs), Decimal(0))
+    wants = _knapsack([i for i in items if i["type"] != "need"], left)
+    chosen = sorted(
+        needs + wants,
+        key=lambda i: (i["type"] != "need", -_item_value(i), i["price"]),
+    )
+
+    # Cash left at the end of each month, given what is bought so far
+    slack = [available + monthly * month for month in range(months)]
+    bought: list[list[dict]] = [[] for _ in range(months)]
+    for item in chosen:
+        month = next(m for m in range(months) if min(slack[m:]) >= item["price"])
+        bought[month].append(item)
+        for later in range(month, months):
+            slack[later] -= item["price"]
+
+    return bought, slack
+
+
+@tool
+async def plan_wishlist_purchases(
+    runtime: ToolRuntime, months: int = 6
+) -> Dict[str, Any]:
+    """
+    Build a purchase schedule for all active wishlist items and assess the affordability
+    of each one in a single call.
+    The plan spans the whole horizon: needs are chosen before wants, the items with the
+    highest priority and urgency that the horizon's cash can pay for are kept, and each
+    is bought in the earliest month it can be without leaving a later month short.
+
+    Args:
+        months (int): Planning horizon in months, starting with the current month. Defaults to 6.
+
+    Returns:
+        dict: The monthly schedule, the items that don't fit the horizon, and the
+              affordability verdict of every item if bought today.
+    """
+    writer = runtime.stream_writer
+    months = max(1, min(months, 24))
+    now = datetime.now()
+    month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    namespace = goals_namespace(runtime.state)
+
+    writer("Gathering wishlist, balance, bills, budget and goals..")
+    try:
+        items, finance, bills, goals, spent = await asyncio.gather(
+            asyncio.to_thread(_active_wishlist),
+            asyncio.to_thread(_load_finance),
+            asyncio.to_thread(_upcoming_bills),
+            runtime.store.asearch(
+                namespace, filter={"status": "in_progress"}, limit=100
+            ),
+            asyncio.to_thread(_month_expenses, month_start),
+        )
+    except Exception as e:
+        return {
+            "status": "error",
+            "error_message": f"Failed to gather financial data: {e}",
+        }
+
+    if not items:
+        return {"status": "success", "summary": "No active wishlist items to plan."}
+
+    balance = Decimal(str(finance.get("balance", 0)))
+    income = Decimal(str(finance.get("avg_salary", 0)))
+    _, allocation = _budget_allocation(finance.get("budget", {}) or {}, None)
+    remaining_budget = allocation - spent if allocation is not None else None
+    free_cash_flow = max(income - bills["monthly"] - (allocation or 0), Decimal(0))
+    active_goals = [
+        goal.key for goal in goals if goal.value.get("status") == "in_progress"
+    ]
+    # Only items with a positive price can be planned
+    plannable = [
+        item
+        for item in items
+        if item["price"] is not None and item["price"].is_finite() and item["price"] > 0
+    ]
+
+    writer("Assessing affordability of every item..")
+    affordability = []
+    for item in plannable:
+        verdict = _affordability_verdict(
+            item["price"], balance, bills["total"], remaining_budget, active_goals
+        )
+        affordability.append(
+            {
+                "id": item["id"],
+                "item": item["item"],
+                "price": str(item["price"]),
+                "verdict": verdict["verdict"],
+                "check": verdict["check"],
+            }
+        )
+
+    writer("Scheduling purchases..")
+    available = max(balance - bills["total"], Decimal(0))
+    bought, cash_left = _schedule(plannable, available, free_cash_flow, months)
+    schedule = []
+    for month, purchases in enumerate(bought):
+        if not purchases:
+            continue
+        year, index = divmod(month_start.month - 1 + month, 12)
+        schedule.append(
+            {
+                "month": f"{month_start.year + year}-{index + 1:02d}",
+                "items": [
+                    {"id": i["id"], "item": i["item"], "price": str(i["price"])}
+                    for i in purchases
+                ],
+                "spend": str(sum((i["price"] for i in purchases), Decimal(0))),
+                "cash_left": str(cash_left[month]),
+            }
+        )
+
+    scheduled = {i["id"] for purchases in bought for i in purchases}
+    return {
+        "status": "success",
+        "summary": (
+            f"Scheduled {len(scheduled)} of {len(items)} wishlist items "
+            f"over {months} month(s)."
+        ),
+        "assumptions": {
+            "available_now": str(available),
+            "monthly_free_cash_flow": str(free_cash_flow),
+            "monthly_bills": str(bills["monthly"]),
+            "monthly_budget": str(allocation) if allocation is not None else "N/A",
+        },
+        "schedule": schedule,
+        "unscheduled": [
+            {
+                "id": i["id"],
+                "item": i["item"],
+                "price": str(i["price"]) if i["price"] is not None else "N/A",
+                "reason": (
+                    "No estimated price"
+                    if i["price"] is None
+                    else (
+                        "Estimated price is not positive"
+                        if i not in plannable
+                        else "Does not fit the horizon"
+                    )
+                ),
+            }
+            for i in items
+            if i["id"] not in scheduled
+        ],
+        "affordability": affordability,
+    }
@@ -1,12 +1,26 @@
 import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
 
 from langchain.tools import ToolRuntime, tool
+from langgraph.store.base import BaseStore
 from typing_extensions import Optional
 
+DAYS_PER_MONTH = Decimal("30.44")
+# Completion dates further out than this are reported as unknown
+MAX_PROJECTION_DAYS = 100 * 365
+
 
 @tool
 def create_financial_goal(
-    description: str, deadline: str, notes: Optional[str], runtime: ToolRuntime
+    description: str,
+    deadline: str,
+    notes: Optional[str],
+    runtime: ToolRuntime,
+    target_amount: Optional[str] = None,
+    funding_category: Optional[str] = None,
+    funding_tag: Optional[str] = None,
+    saved_amount: Optional[str] = None,
 ):
     """Create and save goal to memory
 
@@ -14,15 +28,18 @@ def create_financial_goal(
         description (str): Goal description
         deadline (str): Goal deadline in 'YYYY-MM-DD HH:MM:SS' format.
         notes (str): Optional notes specified by the user.
+        target_amount (str): Optional amount to reach (e.g., '10000.00').
+        funding_category (str): Optional transaction category that funds the goal (e.g., 'savings').
+        funding_tag (str): Optional transaction sub-category that funds the goal (e.g., 'house fund').
+        saved_amount (str): Optional amount the user already saved toward the goal.
 
     Returns:
         dict: A dictionary containing the transaction record status.
     """
 
     writer = runtime.stream_writer
-    user_name = runtime.state["user_name"]
-    namespace = (user_name, "goals")
-    id = uuid.uuid4()
+    namespace = goals_namespace(runtime.state)
+    id = str(uuid.uuid4())
     store = runtime.store
 
     writer("Creating goals..")
@@ -31,6 +48,11 @@ def create_financial_goal(
         "deadline": deadline,
         "status": "in_progress",
         "notes": notes,
+        "target_amount": str(Decimal(target_amount)) if target_amount else None,
+        "saved_amount": str(Decimal(saved_amount or 0)),
+        "starting_amount": str(Decimal(saved_amount or 0)),
+        "funding_category": funding_category.lower() if funding_category else None,
+        "funding_tag": funding_tag.lower() if funding_tag else None,
     }
 
     writer("Saving goals..")
@@ -43,23 +65,171 @@ def create_financial_goal(
             f"Id: {id}\n"
             f"Description: {description}\n"
             f"Deadline: {deadline}\n"
+            f"Target: {goal['target_amount'] or 'N/A'} (saved {goal['saved_amount']})\n"
+            f"Funded by: {goal['funding_category'] or 'N/A'} ({goal['funding_tag'] or 'N/A'})\n"
             f"Notes: {notes}\n"
         ),
     }
 
 
+def goals_namespace(state: dict) -> tuple[str, str]:
+    """Store namespace of the user's goals, by user id when the session has one
+
+    Namespace labels cannot contain periods, so those of a user name are escaped the
+    way URLs escape characters, which keeps distinct names apart.
+    """
+    owner = state.get("user_id") or state["user_name"]
+    return (owner.replace("%", "%25").replace(".", "%2E"), "goals")
+
+
+def fund_goals(
+    store: BaseStore,
+    namespace: tuple[str, ...],
+    amount: Decimal,
+    category: str,
+    subcategory: Optional[str] = None,
+) -> list[dict]:
+    """
+    Add a new transaction to the saved amount of every goal it funds.
+
+    Goals are matched on their funding category, with an indexed lookup, and on their
+    funding tag when they have one. Goals that reach their target are completed.
+
+    Returns:
+        list: The updated goals, with their id and new saved amount.
+    """
+    funded = []
+    for goal in store.search(
+        namespace,
+        filter={"status": "in_progress", "funding_category": category},
+        limit=100,
+    ):
+        value = goal.value
+        if value.get("funding_tag") and value["funding_tag"] != subcategory:
+            continue
+
+        saved = Decimal(value.get("saved_amount") or 0) + amount
+        value = {**value, "saved_amount": str(saved)}
+        if value.get("target_amount") and saved >= Decimal(value["target_amount"]):
+            value["status"] = "completed"
+
+        store.put(namespace, goal.key, value)
+        funded.append(
+            {
+                "id": goal.key,
+                "goal": value["description"],
+                "saved_amount": value["saved_amount"],
+                "status": value["status"],
+            }
+        )
+
+    return funded
+
+
+def parse_deadline(deadline: str) -> datetime:
+    """Parse a goal deadline, 'YYYY-MM-DD HH:MM:SS' or 'YYYY-MM-DD'"""
+    for format in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(deadline, format)
+        except (TypeError, ValueError):
+            continue
+    raise ValueError(f"Invalid deadline: {deadline!r}")
+
+
+def _goal_progress(goal, now: datetime) -> dict:
+    """Progress, required monthly saving and projected completion of a goal"""
+    value = goal.value
+    saved = Decimal(value.get("saved_amount") or 0)
+    progress = {
+        "id": goal.key,
+        "goal": value["description"],
+        "deadline": value["deadline"],
+        "status": value["status"],
+        "target_amount": value.get("target_amount"),
+        "saved_amount": str(saved),
+    }
+    if not value.get("target_amount"):
+        return progress
+
+    target = Decimal(value["target_amount"])
+    remaining = max(target - saved, Decimal(0))
+    deadline = parse_deadline(value["deadline"])
+    months_left = Decimal((deadline - now).days) / DAYS_PER_MONTH
+    # Saving pace since the goal was created, at least one day to avoid a spike
+    days_elapsed = max((now.astimezone() - goal.created_at).days, 1)
+    daily_rate = (saved - Decimal(value.get("starting_amount") or 0)) / days_elapsed
+
+    projected = None
+    if remaining == 0:
+        projected = now
+    elif daily_rate > 0 and remaining / daily_rate <= MAX_PROJECTION_DAYS:
+        projected = now + timedelta(days=float(remaining / daily_rate))
+
+    progress.update(
+        {
+            "percent_complete": (
+                str(round(saved / target * 100, 1)) if target else "100"
+            ),
+            "remaining_amount": str(remaining),
+            "required_monthly_saving": str(
+                round(remaining / months_left, 2) if months_left >= 1 else remaining
+            ),
+            "projected_completion": (
+                projected.strftime("%Y-%m-%d") if projected else None
+            ),
+            "on_track": bool(projected and projected <= deadline),
+        }
+    )
+    return progress
+
+
 @tool
-def get_all_goals(runtime: ToolRuntime):
-    """Get all goals from memory"""
+def get_all_goals(
+    runtime: ToolRuntime,
+    status: Optional[str] = None,
+    deadline_before: Optional[str] = None,
+    deadline_after: Optional[str] = None,
+    limit: int = 20,
+    offset: int = 0,
+):
+    """Get the user's goals from memory, most recently updated first
+
+    Args:
+        status (str): Optional goal status to filter by (e.g. 'in_progress', 'completed').
+        deadline_before (str): Optional, only goals due on or before this day, 'YYYY-MM-DD'.
+        deadline_after (str): Optional, only goals due on or after this day, 'YYYY-MM-DD'.
+        limit (int): Maximum number of goals to return. Defaults to 20.
+        offset (int): Number of goals to skip, for paging through long lists.
+
+    Returns:
+        dict: A dictionary containing the matching goals.
+    """
     writer = runtime.stream_writer
-    user_name = runtime.state["user_name"]
-    namespace = (user_name, "goals")
+    namespace = goals_namespace(runtime.state)
     store = runtime.store
 
+    query_filter = {}
+    if status:
+        query_filter["status"] = status
+    # Bounds are whole days, and deadlines ('YYYY-MM-DD[ HH:MM:SS]') sort by date as text
+    deadline = {}
+    try:
+        if deadline_before:
+            day = parse_deadline(deadline_before).date() + timedelta(days=1)
+            deadline["$lt"] = day.isoformat()
+        if deadline_after:
+            deadline["$gte"] = parse_deadline(deadline_after).date().isoformat()
+    except ValueError as e:
+        return {"status": "error", "error_message": str(e)}
+    if deadline:
+        query_filter["deadline"] = deadline
+
     writer("Retrieving goals..")
     goals = []
 
-    for goal in store.search(namespace):
+    for goal in store.search(
+        namespace, filter=query_filter or None, limit=limit, offset=offset
+    ):
         goals.append(
             {
                 "id": goal.key,
@@ -71,3 +241,43 @@ def get_all_goals(runtime: ToolRuntime):
         )
 
     return {"status": "success", "goals": goals}
+
+
+@tool
+def get_goals_progress(runtime: ToolRuntime, status: Optional[str] = "in_progress"):
+    """Get how every goal is doing: progress toward its target, the monthly saving
+    still required to meet the deadline, and the projected completion date at the
+    current saving pace.
+
+    Args:
+        status (str): Goal status to report on. Defaults to 'in_progress'; pass None for all goals.
+
+    Returns:
+        dict: A dictionary containing the progress of each goal.
+    """
+    writer = runtime.stream_writer
+    namespace = goals_namespace(runtime.state)
+    store = runtime.store
+
+    writer("Calculating goal progress..")
+    now = datetime.now()
+    goals = store.search(
+        namespace, filter={"status": status} if status else None, limit=100
+    )
+
+    progress = []
+    for goal in goals:
+        try:
+            progress.append(_goal_progress(goal, now))
+        except (ValueError, ArithmeticError) as e:
+            # A malformed goal is reported on its own, the others still are
+            progress.append(
+                {
+                    "id": goal.key,
+                    "goal": goal.value.get("description"),
+                    "status": goal.value.get("status"),
+                    "error_message": f"Failed to compute progress: {e}",
+                }
+            )
+
+    return {"status": "success", "goals": progress}
@@ -0,0 +1,29 @@
+"""
+Storage settings of the SQLite checkpointer.
+
+    uv run pytest tests/test_checkpoint.py
+"""
+
+import sqlite3
+
+from src.config.checkpoint import SQLiteSaver
+
+INCREMENTAL = 2
+
+
+def test_new_file_has_incremental_vacuum(tmp_path):
+    saver = SQLiteSaver(str(tmp_path / "checkpoints.db"))
+    assert saver.conn.execute("PRAGMA auto_vacuum").fetchone()[0] == INCREMENTAL
+    assert saver.conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_existing_file_gets_incremental_vacuum(tmp_path):
+    path = str(tmp_path / "checkpoints.db")
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("CREATE TABLE legacy (value TEXT)")
+    conn.commit()
+    conn.close()
+
+    saver = SQLiteSaver(path)
+    assert saver.conn.execute("PRAGMA auto_vacuum").fetchone()[0] == INCREMENTAL
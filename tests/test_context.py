@@ -0,0 +1,83 @@
+"""
+Tool results stubbed out of the messages sent to the model, and the rolling summary.
+
+    uv run pytest tests/test_context.py
+"""
+
+import asyncio
+import json
+
+from benchmarks.fakes import ScriptedChatModel, install_fake_prompts
+
+install_fake_prompts()
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage  # noqa: E402
+
+import src.agents  # noqa: E402, F401
+from src.agents.middleware.context import (  # noqa: E402
+    TOOL_RESULT_STUB_THRESHOLD,
+    compact_tool_results,
+    update_summary,
+)
+
+LONG = "x" * (TOOL_RESULT_STUB_THRESHOLD + 1)
+
+
+def turn(name: str) -> list:
+    return [
+        HumanMessage(content="Hi"),
+        AIMessage(content="", tool_calls=[{"name": name, "args": {}, "id": "call"}]),
+        ToolMessage(content=LONG, name=name, tool_call_id="call"),
+        AIMessage(content="Done."),
+    ]
+
+
+def test_consumed_data_is_stubbed():
+    result = compact_tool_results(turn("read_transactions"))[2]
+    assert json.loads(result.content)["tool"] == "read_transactions"
+
+
+def test_instructions_are_kept():
+    result = compact_tool_results(turn("get_task_instruction"))[2]
+    assert result.content == LONG
+
+
+def test_specialist_answers_are_kept():
+    result = compact_tool_results(turn("consult_specialists"))[2]
+    assert result.content == LONG
+
+
+def long_history(turns: int) -> list:
+    messages = []
+    for index in range(turns):
+        messages.append(HumanMessage(content=LONG, id=f"human{index}"))
+        messages.append(AIMessage(content=LONG, id=f"ai{index}"))
+    return messages
+
+
+def test_summary_is_written():
+    model = ScriptedChatModel()
+    model.set_script([AIMessage(content="The user asked about their budget.")])
+    update = asyncio.run(
+        update_summary(model, long_history(10), "", None, reserved=0, budget=1000)
+    )
+    assert update["context_summary"] == "The user asked about their budget."
+    assert update["summary_cursor"].startswith("ai")
+
+
+def test_empty_summary_keeps_the_old_one():
+    model = ScriptedChatModel()
+    model.set_script(
+        [
+            AIMessage(
+                content="",
+                tool_calls=[{"name": "get_current_time", "args": {}, "id": "time"}],
+            )
+        ]
+    )
+    update = asyncio.run(
+        update_summary(
+            model, long_history(10), "Old summary", None, reserved=0, budget=1000
+        )
+    )
+    assert update is None
@@ -0,0 +1,79 @@
+"""
+Queries run by the hot data-layer tools, counted with `query_log.count()`.
+
+Each tool is called on a scratch user database filled by `benchmarks.datagen`, once to
+open the engine and once counted, at two scales: a tool whose count grows with the
+user's data runs a query per row.
+
+    uv run pytest tests/test_queries.py
+"""
+
+import os
+
+import pytest
+
+from benchmarks.fakes import install_fake_prompts
+
+install_fake_prompts()
+
+from langchain_core.runnables.config import var_child_runnable_config  # noqa: E402
+from langgraph._internal._constants import CONFIG_KEY_RUNTIME  # noqa: E402
+from langgraph.runtime import Runtime  # noqa: E402
+
+import src.agents  # noqa: E402, F401
+import src.config.database  # noqa: E402
+import src.config.users  # noqa: E402
+from benchmarks.datagen import generate  # noqa: E402
+from src.config.database import EnginePool  # noqa: E402
+from src.config.queries import query_log  # noqa: E402
+from src.config.users import current_user, user_dir  # noqa: E402
+from src.tools.capitalist import calculate_networth, get_user_liabilities  # noqa: E402
+
+# Most statements one call may run, whatever the number of rows
+MAX_QUERIES = {
+    # Liabilities joined with their details, one query per type
+    "get_user_liabilities": (get_user_liabilities, 3),
+    # Assets, fixed deposits, debts and installments
+    "calculate_networth": (calculate_networth, 4),
+}
+
+
+@pytest.fixture(autouse=True)
+def users_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(src.config.users, "USERS_DIR", str(tmp_path))
+    # Engines are kept per user id, so they would still point to another test's files
+    monkeypatch.setattr(src.config.database, "engine_pool", EnginePool())
+    # The tools report progress on the graph's stream, which is not there when they
+    # are called directly
+    token = var_child_runnable_config.set(
+        {"configurable": {CONFIG_KEY_RUNTIME: Runtime(stream_writer=lambda _: None)}}
+    )
+    # Undoes the users set by `count_queries`, so none leaks into later tests
+    user_token = current_user.set(None)
+    yield
+    current_user.reset(user_token)
+    var_child_runnable_config.reset(token)
+
+
+def count_queries(tool, rows: int) -> int:
+    user_id = f"rows{rows}"
+    current_user.set(user_id)
+    generate(os.path.join(user_dir(user_id), "userdata.db"), rows)
+
+    assert tool.func()["status"] == "success"
+    with query_log.count() as queries:
+        result = tool.func()
+    assert result["status"] == "success"
+    return queries.total
+
+
+@pytest.mark.parametrize("name", MAX_QUERIES)
+def test_query_count_is_bounded(name):
+    tool, limit = MAX_QUERIES[name]
+    assert count_queries(tool, 10) <= limit
+
+
+@pytest.mark.parametrize("name", MAX_QUERIES)
+def test_query_count_does_not_grow_with_rows(name):
+    tool, _ = MAX_QUERIES[name]
+    assert count_queries(tool, 10) == count_queries(tool, 200)
@@ -0,0 +1,69 @@
+"""
+Bills the Steward counts against the user's cash.
+
+    uv run pytest tests/test_steward.py
+"""
+
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+from benchmarks.fakes import install_fake_prompts
+
+install_fake_prompts()
+
+import src.agents  # noqa: E402, F401
+import src.config.database  # noqa: E402
+import src.config.users  # noqa: E402
+from src.config.database import EnginePool, Session  # noqa: E402
+from src.config.users import current_user  # noqa: E402
+from src.database import Liability, Subscription  # noqa: E402
+from src.tools.steward import _upcoming_bills  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def user(tmp_path, monkeypatch):
+    monkeypatch.setattr(src.config.users, "USERS_DIR", str(tmp_path))
+    monkeypatch.setattr(src.config.database, "engine_pool", EnginePool())
+    token = current_user.set("steward")
+    yield
+    current_user.reset(token)
+
+
+def add_subscription(
+    monthly_cost: int, billing_cycle: str, next_billing_date: datetime | None
+) -> None:
+    session = Session()
+    subscription = Subscription(
+        monthly_cost=Decimal(monthly_cost),
+        billing_cycle=billing_cycle,
+        next_billing_date=next_billing_date,
+    )
+    session.add(subscription)
+    session.flush()
+    session.add(
+        Liability(
+            name=billing_cycle,
+            liability_type="subscription",
+            reference_id=subscription.id,
+        )
+    )
+    session.commit()
+    session.close()
+
+
+def test_subscriptions_are_due_by_billing_cycle():
+    now = datetime.now()
+    add_subscription(10, "monthly", None)
+    # Billed at its yearly price of 60 within 30 days
+    add_subscription(5, "yearly", now + timedelta(days=10))
+    # Not billed within 30 days
+    add_subscription(7, "yearly", now + timedelta(days=100))
+    add_subscription(20, "weekly", now + timedelta(days=3))
+    # Lapsed: its next billing date is past
+    add_subscription(3, "yearly", now - timedelta(days=5))
+
+    bills = _upcoming_bills()
+    assert bills["breakdown"]["subscriptions"] == Decimal("90.00")
+    assert bills["monthly"] == Decimal("42.00")
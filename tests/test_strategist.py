@@ -0,0 +1,105 @@
+"""
+Goals kept by the Strategist in the long-term memory store.
+
+    uv run pytest tests/test_strategist.py
+"""
+
+import pytest
+
+from benchmarks.fakes import install_fake_prompts
+
+install_fake_prompts()
+
+from langchain.tools import ToolRuntime  # noqa: E402
+
+import src.agents  # noqa: E402, F401
+from src.config.store import SQLiteStore  # noqa: E402
+from src.tools.strategist import (  # noqa: E402
+    fund_goals,
+    get_all_goals,
+    get_goals_progress,
+    goals_namespace,
+)
+
+STATE = {"user_id": "strategist", "user_name": "Strategist"}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SQLiteStore(str(tmp_path / "store.db"))
+
+
+@pytest.fixture
+def runtime(store):
+    return ToolRuntime(
+        state=STATE,
+        context=None,
+        config={},
+        stream_writer=lambda _: None,
+        tool_call_id="call",
+        store=store,
+    )
+
+
+def add_goal(store, key: str, deadline: str, **fields) -> None:
+    store.put(
+        goals_namespace(STATE),
+        key,
+        {
+            "description": key,
+            "deadline": deadline,
+            "status": "in_progress",
+            "notes": None,
+            **fields,
+        },
+    )
+
+
+def test_user_names_keep_distinct_namespaces():
+    first = goals_namespace({"user_name": "a.b"})
+    second = goals_namespace({"user_name": "a_b"})
+    assert first != second
+    assert "." not in first[0]
+
+
+def test_deadline_bounds_include_the_whole_day(store, runtime):
+    add_goal(store, "early", "2025-06-29 09:00:00")
+    add_goal(store, "due", "2025-06-30 18:00:00")
+    add_goal(store, "due_date_only", "2025-06-30")
+    add_goal(store, "late", "2025-07-01 00:00:00")
+
+    before = get_all_goals.func(runtime, deadline_before="2025-06-30")
+    assert {goal["id"] for goal in before["goals"]} == {"early", "due", "due_date_only"}
+
+    after = get_all_goals.func(runtime, deadline_after="2025-06-30")
+    assert {goal["id"] for goal in after["goals"]} == {"due", "due_date_only", "late"}
+
+
+def test_invalid_deadline_bound_is_an_error(runtime):
+    assert get_all_goals.func(runtime, deadline_before="end of June")["status"] == (
+        "error"
+    )
+
+
+def test_malformed_deadline_fails_only_its_goal(store, runtime):
+    add_goal(store, "valid", "2030-01-01", target_amount="1000", saved_amount="100")
+    add_goal(store, "broken", "soon", target_amount="1000", saved_amount="100")
+
+    result = get_goals_progress.func(runtime)
+    assert result["status"] == "success"
+    goals = {goal["id"]: goal for goal in result["goals"]}
+    assert goals["valid"]["remaining_amount"] == "900"
+    assert "error_message" in goals["broken"]
+
+
+def test_goal_reaching_its_target_is_completed(store):
+    add_goal(
+        store,
+        "house",
+        "2030-01-01",
+        target_amount="1000",
+        saved_amount="900",
+        funding_category="savings",
+    )
+    funded = fund_goals(store, goals_namespace(STATE), 200, "savings")
+    assert funded[0]["status"] == "completed"
@@ -0,0 +1,48 @@
+"""
+Token budgets of a thread.
+
+    uv run pytest tests/test_usage.py
+"""
+
+import pytest
+from langchain_core.runnables.config import var_child_runnable_config
+
+import src.config.usage
+from src.config.usage import budget_exhausted, token_budget
+
+USAGE = {"root": {"input_tokens": 900, "output_tokens": 200}}
+
+
+@pytest.fixture
+def configurable():
+    def run_with(**values):
+        token = var_child_runnable_config.set({"configurable": values})
+        tokens.append(token)
+
+    tokens = []
+    yield run_with
+    for token in reversed(tokens):
+        var_child_runnable_config.reset(token)
+
+
+@pytest.fixture(autouse=True)
+def thread_budget(monkeypatch):
+    monkeypatch.setattr(src.config.usage, "THREAD_TOKEN_BUDGET", 1000)
+
+
+def test_thread_budget_is_the_default(configurable):
+    configurable()
+    assert token_budget() == 1000
+    assert budget_exhausted(USAGE)
+
+
+def test_thread_sets_its_own_budget(configurable):
+    configurable(token_budget=5000)
+    assert token_budget() == 5000
+    assert not budget_exhausted(USAGE)
+
+
+def test_zero_budget_is_no_limit(configurable):
+    configurable(token_budget=0)
+    assert token_budget() == 0
+    assert not budget_exhausted(USAGE)